@@ -247,13 +247,15 @@ def Development() :
 #------------------------------------------------------------------
 def Multiprocessing() :
     '''
-    Currently, multiprocessing.pool.Pool.map_async() is used to 
+    Previously, multiprocessing.pool.Pool.map_async() was used to 
     parallelize reading and interpolation of tidal boundary data. 
+    The tide series are now parsed once into the forcing cache 
+    (forcing.py) and read memory mapped, so the pool was removed. 
 
     The Python multiprocessing module uses Pickle to serialize objects
     to/from the mutiprocesses, but some things can't be pickled. 
     Imo, this is a broken part of the OO Python implementation.
-    So there is a kludge to work around this by isolating the objects
+    So there was a kludge to work around this by isolating the objects
     and functions into pool_functions.py. 
 
     See:
@@ -277,8 +279,36 @@ def Multiprocessing() :
     since there are 410 shoals and the loops are not deep enough to 
     CPU-limit across processes.  Process-based parallelism with pools 
     is ill-posed for this application.
+
+    The headless engine (engine.py) holds no Tk objects: model.gui is a
+    console.Console, and tkinter/matplotlib are only imported by gui.py.
+    A headless Model can therefore be built in a worker process, which
+    allows parallelism at the level of whole simulations.
     '''
 
+#------------------------------------------------------------------
+#------------------------------------------------------------------
+def Headless() :
+    '''
+    engine.Engine builds and runs the model without the GUI, for batch
+    runs and scripting. It takes the bam.py command line options:
+
+      from engine import Engine
+      bam = Engine( [ '-S', '2010-1-1', '-E', '2010-2-1' ] )
+      times, results = bam.Run()
+
+    The model calls its interface object model.gui, a gui.GUI or a
+    console.Console (-ng), for Message(), TimeUpdate(), InitPlotVars()
+    and, with the GUI only, MapPlotVariable() and MapUpdate(). The
+    recorded basin variables are held in model.record_variables, set
+    with model.SetRecordVariables() by InitPlotVars() and the GUI
+    record variable selection.
+
+    ensemble.py runs a table of scenarios, each a set of bam.py options,
+    with the engine in a pool of forked processes. See its module doc.
+    '''
+    pass
+
 #------------------------------------------------------------------
 #------------------------------------------------------------------
 def Legacy() :
@@ -286,7 +316,7 @@ def Legacy() :
     FATHOM is not SI, but profusely mixes English and metric units... :-(
     BAM suffers this as well, but only in that dynamic boundary timeseries
     flow data (i.e. S197) are specified in cfs but converted to m^3/s in
-    BoundaryConditions(). 
+    forcing.DailyForcing for BoundaryConditions(). 
     
     Water levels are not geodetic, but are anomalies from the shoal depth.  
     This imposes all shoal depths of 0 are at the the same elevation.
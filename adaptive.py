@@ -0,0 +1,163 @@
+'''Adaptive timestep for the Bay Assessment Model (BAM)
+
+With the adaptiveTimestep option (-at) the timestep of each ModelLoop
+step is chosen from the shoal flows of the previous step by a
+Courant-like limit on each interior basin: the volume leaving a basin
+over its shoals in one timestep is limited to the courantNumber (-cn)
+fraction of the basin volume,
+
+    Δt <= courantNumber * water_volume / Σ outflow,  Σ outflow (m^3/s)
+
+where the outflow Q = velocity * cross_section of each shoal is
+Shoal.Q_total, positive from Basin_A to Basin_B. The timestep is the
+smallest basin limit, within timestepMin (-tn) and the timestep (-t),
+which is the largest step. Calm periods run at -t, high flows are
+subdivided. A basin with a limit below timestepMin, a shallow bank
+draining at low stage, does not limit the step : its volume is held
+at 0 by the lower bound of MassTransport as with a fixed timestep.
+
+The step is shortened to end exactly on the next output record
+(-oi), day of the daily forcing data, checkpoint (-ci) and end_time,
+and the steps before a boundary are evened out rather than leaving a
+short remainder step. The per-timestep volumes of the model (rain, ET,
+boundary flow, shoal transport) are computed with the model.timestep of
+the step, the records divide them by it into rates.'''
+
+# Python distribution modules
+from datetime import datetime, timedelta
+from math     import ceil
+
+# Community modules
+from numpy import array as nparray
+from numpy import bincount, maximum
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class AdaptiveTimestep:
+    '''Timestep of each ModelLoop step (-at). The shoal flows are read
+    from the Shoals of the model.network.'''
+
+    def __init__( self, model ):
+
+        self.model = model
+        self.Reset()
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Reset( self ) :
+        '''Clear the timestep statistics at the start of ModelLoop'''
+
+        self.steps        = 0
+        self.min_timestep = None
+        self.max_timestep = None
+        self.total_time   = 0
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Next( self ) :
+        '''Return the timestep (s) of the step from model.current_time'''
+
+        model = self.model
+        args  = model.args
+
+        timestep = min( args.timestep,
+                        max( args.timestepMin, self.StableTimestep() ) )
+
+        # Seconds to the next output, forcing or checkpoint boundary
+        remaining = min( ( boundary - model.current_time ).total_seconds()
+                         for boundary in self.Boundaries() )
+
+        # Whole seconds, even steps up to a boundary
+        if remaining < 2 * timestep :
+            steps    = ceil( remaining / timestep )
+            timestep = min( remaining, ceil( remaining / steps ) )
+        else :
+            timestep = max( 1, int( timestep ) )
+
+        self.steps      += 1
+        self.total_time += timestep
+        if self.min_timestep is None or timestep < self.min_timestep :
+            self.min_timestep = timestep
+        if self.max_timestep is None or timestep > self.max_timestep :
+            self.max_timestep = timestep
+
+        return timestep
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def StableTimestep( self ) :
+        '''Smallest Courant limit (s) of the interior basins, the
+        timestep (-t) if no basin has an outflow'''
+
+        model   = self.model
+        network = model.network
+        model.basin_scratch.Gather( [ 'water_volume' ] )
+
+        volume  = model.basin_scratch.water_volume
+
+        Q_total = nparray( [ Shoal.Q_total for Shoal in network.Shoals ],
+                           dtype = float ) # A -> B
+
+        outflow = bincount( network.basin_A, weights = maximum( Q_total, 0 ),
+                            minlength = network.n_basins ) +\
+                  bincount( network.basin_B, weights = maximum(-Q_total, 0 ),
+                            minlength = network.n_basins )
+
+        limited = network.interior & ( outflow > 0 )
+
+        limits = model.args.courantNumber * \
+                 volume[ limited ] / outflow[ limited ]
+
+        # Basins drained within timestepMin, shallow banks at low stage,
+        # are left to the volume lower bound of MassTransport
+        limits = limits[ limits >= model.args.timestepMin ]
+
+        if not len( limits ) :
+            return model.args.timestep
+
+        return limits.min()
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Boundaries( self ) :
+        '''Times the next step must not pass: the next output record,
+        day, checkpoint and end_time'''
+
+        model        = self.model
+        current_time = model.current_time
+
+        def NextMultiple( interval ) :
+            elapsed = current_time - model.start_time
+            return model.start_time + ( elapsed // interval + 1 ) * interval
+
+        next_day = datetime( current_time.year, current_time.month,
+                             current_time.day ) + timedelta( days = 1 )
+
+        boundaries = [ next_day, NextMultiple( model.outputInterval ) ]
+
+        if current_time < model.end_time :
+            boundaries.append( model.end_time )
+
+        if model.args.checkpoint and model.args.checkpointInterval :
+            boundaries.append( NextMultiple( model.checkpointInterval ) )
+
+        return boundaries
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Summary( self ) :
+        '''Timestep statistics of the run for the run_info'''
+
+        if not self.steps :
+            return 'Adaptive timestep: no steps.\n'
+
+        return 'Adaptive timestep: ' + str( self.steps ) + ' steps, Δt ' +\
+               str( round( self.min_timestep, 1 ) ) + ' to ' +\
+               str( round( self.max_timestep, 1 ) ) + ' mean ' +\
+               str( round( self.total_time / self.steps, 1 ) ) + ' (s).\n'
@@ -7,18 +7,23 @@
 #----------------------------------------------------------------------------
 
 # Python distribution modules
+from   time     import perf_counter
+import_time = perf_counter() # Startup report (-sr)
+
 import sys
 from   argparse import ArgumentParser
 from   os       import getenv, getcwd
 from   os.path  import join as path_join
-import tkinter as Tk
 
 # Community modules
 from numpy import linspace
 
 # Local modules
+# tkinter and gui are imported in main() only if the GUI is used,
+# scipy and numba by the functions that use them: see profiling.py
 import model as bam_model
-import gui
+import console
+import profiling
 from init import InitTimeBasins
 
 #----------------------------------------------------------------------------
@@ -27,8 +32,12 @@ from init import InitTimeBasins
 def main():
     '''See Notes.py and model.py'''
 
+    times = [ ( 'start', import_time ), ( 'import', perf_counter() ) ]
+
     args = ParseCmdLine()
 
+    times.append( ( 'ParseCmdLine', perf_counter() ) )
+
     if args.DEBUG or args.DEBUG_ALL:
         import faulthandler
         faulthandler.enable()
@@ -36,26 +45,40 @@ def main():
     # Initialize the root Tk object if gui is used 
     root = None
     if not args.noGUI :
+        import tkinter as Tk
         root = Tk.Tk()
         root.title( 'Bay Assessment Model' )
 
     # Instantiate and initialize the main Model class and its
     # Basins and Shoals maps
     model = bam_model.Model( args )
+
+    times.append( ( 'Model', perf_counter() ) )
     
-    # Create GUI object & model interface objects
-    model.gui = gui.GUI( root, model )
-    if not args.noGUI :
+    # Create GUI object & model interface objects, or the console
+    # interface of the headless (-ng) model
+    if args.noGUI :
+        model.gui = console.Console( model )
+    else :
+        import gui
+        model.gui = gui.GUI( root, model )
         model.gui.FloridaBayModel_Tk()
         
         if not args.noThread :
             # Call DrawCanvas() after mainloop for modelThread events
             root.after( 500, model.DrawCanvas )
 
+    times.append( ( 'Interface', perf_counter() ) )
+
     InitTimeBasins( model )
 
     model.gui.InitPlotVars() # Set default outputs
 
+    times.append( ( 'InitTimeBasins', perf_counter() ) )
+
+    if args.startupReport : # -sr
+        profiling.StartupReport( model, times )
+
     if args.noGUI :
         model.gui.Message( model.Version )
         model.gui.Message( model.args.commandLine + '\n' )
@@ -66,7 +89,8 @@ def main():
 #--------------------------------------------------------------
 # 
 #--------------------------------------------------------------
-def ParseCmdLine():
+def ParseCmdLine( argv = None ):
+    '''Parse the command line, or the list of arguments argv'''
 
     home_dir = getenv( 'HOME', default = getcwd() )
 
@@ -84,6 +108,19 @@ def ParseCmdLine():
                         default = 360,
                         help    = 'timestep (s): -t 360')
 
+    parser.add_argument('-tn', '--timestepMin',
+                        dest    = 'timestepMin', type = int, 
+                        action  = 'store', 
+                        default = 10,
+                        help    = 'Adaptive timestep minimum (s): -tn 10')
+
+    parser.add_argument('-cn', '--courantNumber',
+                        dest    = 'courantNumber', type = float, 
+                        action  = 'store', 
+                        default = 0.5,
+                        help    = 'Adaptive timestep basin volume fraction ' +\
+                                  'per step: -cn 0.5')
+
     parser.add_argument('-S', '--start',
                         dest    = 'start', type = str, 
                         action  = 'store', 
@@ -109,6 +146,48 @@ def ParseCmdLine():
                         default = 3000,
                         help    = 'velocity iteration limit: -it 3000')
 
+    parser.add_argument('-ss', '--shoalSolver',
+                        dest    = 'shoalSolver', type = str, 
+                        action  = 'store', 
+                        default = 'python',
+                        choices = [ 'python', 'numpy', 'numba' ],
+                        help    = 'Shoal velocity solver: -ss python' )
+
+    parser.add_argument('-mt', '--massTransport',
+                        dest    = 'massTransport', type = str, 
+                        action  = 'store', 
+                        default = 'python',
+                        choices = [ 'python', 'sparse' ],
+                        help    = 'Shoal mass transport: -mt python' )
+
+    parser.add_argument('-hs', '--stageSolver',
+                        dest    = 'stageSolver', type = str, 
+                        action  = 'store', 
+                        default = 'explicit',
+                        choices = [ 'explicit', 'implicit' ],
+                        help    = 'Shoal flow and basin stage: -hs explicit' )
+
+    parser.add_argument('-ht', '--implicitTheta',
+                        dest    = 'implicitTheta', type = float, 
+                        action  = 'store', 
+                        default = 1.,
+                        help    = 'Implicit weight of -hs implicit: -ht 1' )
+
+    parser.add_argument('-hh', '--implicitHead',
+                        dest    = 'implicitHead', type = float, 
+                        action  = 'store', 
+                        default = 0.001,
+                        help    = 'Minimum shoal level difference (m) of ' +\
+                                  '-hs implicit: -hh 0.001' )
+
+    parser.add_argument('-vs', '--volumeStage',
+                        dest    = 'volumeStage', type = str, 
+                        action  = 'store', 
+                        default = 'linear',
+                        choices = [ 'linear', 'exact' ],
+                        help    = 'Basin stage from volume change: ' +\
+                                  'linear dV/A or exact hypsometry: -vs linear')
+
     basins_ = path_join('data','GIS','FLBayBasins')
     parser.add_argument('-bn', '--basins',
                         dest    = 'basinShapeFile', type = str, 
@@ -116,6 +195,13 @@ def ParseCmdLine():
                         default = basins_,
                         help    = 'Basins shape file: -bn ' + basins_)
 
+    parser.add_argument('-gt', '--geometryTolerance',
+                        dest    = 'geometryTolerance', type = float, 
+                        action  = 'store', 
+                        default = 10.,
+                        help    = 'Basin and shoal map drawing ' +\
+                                  'simplification (m), 0 for none: -gt 10')
+
     basinDepth_ = path_join('data','init','Basin_Area_Depth.csv')
     parser.add_argument('-bd', '--basinDepth',
                         dest    = 'basinDepth', type = str, 
@@ -155,6 +241,21 @@ def ParseCmdLine():
                         default = basinRain_,
                         help    = 'Daily rain data file: -br ' + basinRain_)
 
+    forcingCache_ = path_join('data','Cache','')
+    parser.add_argument('-fc', '--forcingCache',
+                        dest    = 'forcingCache', type = str, 
+                        action  = 'store', 
+                        default = forcingCache_,
+                        help    = 'Cache directory of the daily forcing ' +\
+                                  'data and GIS files: -fc ' + forcingCache_)
+
+    parser.add_argument('-iw', '--initWorkers',
+                        dest    = 'initWorkers', type = int, 
+                        action  = 'store', 
+                        default = 4,
+                        help    = 'Processes and threads of the forcing ' +\
+                                  'data loaders at init, 1 in order: -iw 4')
+
     basinBCFile_ = path_join('data','Boundary','Basin_Boundary_Condition.csv')
     parser.add_argument('-bc', '--basinBCFile',
                         dest    = 'basinBCFile', type = str, 
@@ -304,6 +405,50 @@ def ParseCmdLine():
                         default = '',
                         help    = 'Run ID for output files: -r RunID')
 
+    parser.add_argument('-of', '--outputFormat',
+                        dest    = 'outputFormat', type = str, 
+                        action  = 'store', 
+                        default = 'csv',
+                        choices = [ 'csv', 'npz', 'both' ],
+                        help    = 'Basin output files: csv per basin, ' +\
+                                  'npz archive of all basins: -of csv')
+
+    parser.add_argument('-cp', '--checkpoint',
+                        dest    = 'checkpoint', type = str, 
+                        action  = 'store', 
+                        default = None,
+                        help    = 'Checkpoint file of the model state in ' +\
+                                  'basinOutputDir at the end of the run: ' +\
+                                  '-cp Checkpoint.npz')
+
+    parser.add_argument('-ci', '--checkpointInterval',
+                        dest    = 'checkpointInterval', type = int, 
+                        action  = 'store', 
+                        default = 0,
+                        help    = 'Time interval (hr) of checkpoints ' +\
+                                  'during the run, 0 at the end: -ci 0')
+
+    parser.add_argument('-rs', '--restart',
+                        dest    = 'restart', type = str, 
+                        action  = 'store', 
+                        default = None,
+                        help    = 'Restart from a checkpoint file: ' +\
+                                  '-rs Checkpoint.npz')
+
+    parser.add_argument('-pf', '--profile',
+                        dest    = 'profile', type = str, 
+                        action  = 'store', 
+                        default = None,
+                        help    = 'Phase timing and Manning iteration ' +\
+                                  'profile JSON file in basinOutputDir: ' +\
+                                  '-pf Profile.json')
+
+    parser.add_argument('-sr', '--startupReport',
+                        dest    = 'startupReport', # type = bool,
+                        action  = 'store_true', default = False,
+                        help    = 'Report the startup time by phase ' +\
+                                  'and the modules imported.')
+
     parser.add_argument('-rf', '--runInfoFile',
                         dest    = 'runInfoFile', type = str, 
                         action  = 'store', 
@@ -318,6 +463,20 @@ def ParseCmdLine():
                         help    = 'Time interval (hr) of output data: ' +\
                                   '-oi 1' )
 
+    parser.add_argument('-oc', '--outputChunkDays',
+                        dest    = 'outputChunkDays', type = int, 
+                        action  = 'store', 
+                        default = 0,
+                        help    = 'Write output every chunk of simulated ' +\
+                                  'days during the run, 0 at the end: -oc 0')
+
+    parser.add_argument('-or', '--outputChunkRows',
+                        dest    = 'outputChunkRows', type = int, 
+                        action  = 'store', 
+                        default = 0,
+                        help    = 'Write output every chunk of output ' +\
+                                  'records during the run, 0 at the end: -or 0')
+
     parser.add_argument('-mi', '--mapInterval',
                         dest    = 'mapInterval', type = int, nargs = '*',
                         action  = 'store', 
@@ -362,6 +521,30 @@ def ParseCmdLine():
                         action = 'store_true', default = False,
                         help   = 'Disable EDEN stage runoff inputs.')
 
+    parser.add_argument('-at', '--adaptiveTimestep',
+                        dest   = 'adaptiveTimestep', # type = bool, 
+                        action = 'store_true', default = False,
+                        help   = 'Adaptive timestep up to -t from the ' +\
+                                 'shoal flows.')
+
+    parser.add_argument('-tm', '--tideMatrix',
+                        dest   = 'tideMatrix', # type = bool, 
+                        action = 'store_true', default = False,
+                        help   = 'Precompute boundary tide levels for all ' +\
+                                 'timesteps at init.')
+
+    parser.add_argument('-gm', '--geometry',
+                        dest   = 'geometry', # type = bool, 
+                        action = 'store_true', default = False,
+                        help   = 'Read the basin and shoal map geometry ' +\
+                                 'with -ng.')
+
+    parser.add_argument('-nc', '--noForcingCache',
+                        dest   = 'noForcingCache', # type = bool, 
+                        action = 'store_true', default = False,
+                        help   = 'Do not cache the daily forcing data ' +\
+                                 'and GIS files.')
+
     parser.add_argument('-nt', '--noTide',
                         dest   = 'noTide', # type = bool, 
                         action = 'store_true', default = False,
@@ -390,7 +573,7 @@ def ParseCmdLine():
                         dest   = 'DEBUG_ALL', # type = bool, 
                         action = 'store_true', default = False )
 
-    args = parser.parse_args()
+    args = parser.parse_args( argv )
 
     # Ensure path has terminator
     args.path = path_join( args.path, '' )
@@ -400,7 +583,7 @@ def ParseCmdLine():
 
     # Add the original command line
     command_line = ''
-    for cmd in sys.argv :
+    for cmd in ( sys.argv if argv is None else [ sys.argv[0] ] + argv ) :
         command_line = command_line + cmd + ' '
     args.commandLine = command_line
 
@@ -1,11 +1,11 @@
 '''Basin class for the Bay Assessment Model (BAM)'''
 
 # Python distribution modules
-from collections import OrderedDict as odict
 from os.path import join as path_join
 
 # Local modules
 import constants
+from records import RecordMap
 
 #---------------------------------------------------------------
 # 
@@ -15,15 +15,20 @@ class Basin:
     solute concentrations in each basin are calculated from the volumes 
     and fluxes. Note that Bay basins are numbered 5 - 58. Basins 1 - 4
     do not exist.  Basins 59 - 68 are tidal boundary basins, 69 - 82 are
-    Everglades runoff boundary basins."""
+    Everglades runoff boundary basins.
+
+    The array code copies the physical variables to and from the
+    model.basin_scratch arrays at element self.index, see scratch.py."""
 
     def __init__( self, model, name, number, total_area, perimeter, xy, 
                   boundary = False ):
 
         self.model = model
+        self.index = model.basin_scratch.Add( self ) # index in scratch arrays
 
         # Figure Canvas variables
         self.basin_xy   = xy    # Read from shapefile
+        self.render_xy  = xy    # Simplified for drawing, geometry.py
         self.Axes_fill  = None  # Created by matplotlib fill() :
                                 # a matplotlib.lines.Line2D class
         self.color      = ( 1, 1, 1 )
@@ -68,8 +73,9 @@ class Basin:
         self.salinity_station   = None
         self.salinity_from_data = False
 
-        # Map of data accumulated over the simulation
-        self.plot_variables = odict() # { variable : [ values ] }
+        # Map of data accumulated over the simulation, a view of the
+        # model.records array : { variable : [ values ] }
+        self.plot_variables = RecordMap( model.records, self.index )
 
         # Solute
         # self.dissolved_oxygen         = None
@@ -94,6 +100,9 @@ class Basin:
 
         self.Area()
 
+        # Reset, InitTimeBasins can be called again on the same basins
+        self.water_volume = 0.
+
         for depth_ft, wet_area in self.wet_area.items() :
 
             h = self.water_level + depth_ft * 0.3048
@@ -114,90 +123,45 @@ class Basin:
     # 
     #-----------------------------------------------------------
     def Area( self ) :
-        '''Compute surface area at current water_level'''
-
-        self.area = 0
-
-        for depth_ft, wet_area in self.wet_area.items() :
-
-            h = self.water_level + depth_ft * 0.3048
+        '''Compute surface area at current water_level: the sum of the
+        wet_area bins with water_level + depth >= 0, from model.hypsometry'''
 
-            if h >= 0 :
-                self.area += wet_area
+        self.area = self.model.hypsometry.BasinArea( self.index,
+                                                     self.water_level )
 
     #-----------------------------------------------------------
     # 
     #-----------------------------------------------------------
-    def CopyDataRecord( self ) :
-        '''Transfer data values from a basin object to the 
-        basin.plot_variables dictionary. Values are selected from 
-        the GetRecordVariables() pop-up checkboxes. '''
-
-        if self.model.args.DEBUG_ALL :
-            print( '->CopyDataRecord : ', self.name )
-
-        for plotVariable, intVar in self.model.gui.plotVar_IntVars.items() :
-
-            if intVar.get() :
-                if plotVariable not in self.plot_variables.keys() :
-                    self.plot_variables[ plotVariable ] = []
-
-                if plotVariable == 'Stage' :
-                    data_value = self.water_level
-                elif plotVariable == 'Salinity' :
-                    data_value = self.salinity
-                elif plotVariable == 'Volume' :
-                    data_value = self.water_volume
-                elif plotVariable == 'Flow' :
-                    data_value = self.shoal_transport / self.model.timestep
-                elif plotVariable == 'Rain' :
-                    data_value = self.rainfall / self.model.timestep
-                elif plotVariable == 'Evaporation' :
-                    data_value = self.evaporation / self.model.timestep
-                elif plotVariable == 'Runoff' :
-                    if self.runoff_EVER and self.runoff_BC :
-                        runoff = self.runoff_EVER + self.runoff_BC
-                    elif self.runoff_EVER :
-                        runoff = self.runoff_EVER
-                    else :
-                        runoff = self.runoff_BC # could be None
-
-                    if runoff :
-                        data_value = runoff / self.model.timestep
-                    else :
-                        data_value = runoff # None
-                elif plotVariable == 'Groundwater' :
-                    if self.groundwater :
-                        data_value = self.groundwater / self.model.timestep
-                    else :
-                        data_value = self.groundwater # None
-                else :
-                    msg = 'CopyDataRecord: ' + self.name + ' ' + plotVariable +\
-                        ' is not supported for plotting.\n'
-                    self.model.gui.Message( msg )
-                    if plotVariable in self.plot_variables.keys() :
-                        del self.plot_variables[ plotVariable ]
-                    return
-
-                # JP Change to preallocated numpy array?
-                self.plot_variables[ plotVariable ].append( data_value )
+    def Runoff( self ) :
+        '''Runoff volume (m^3/timestep) of EDEN stage and flow boundary
+        conditions, None if neither is set. Recorded by
+        records.Records.CopyDataRecord()'''
+
+        if self.runoff_EVER and self.runoff_BC :
+            return self.runoff_EVER + self.runoff_BC
+        elif self.runoff_EVER :
+            return self.runoff_EVER
+        else :
+            return self.runoff_BC # could be None
 
     #-----------------------------------------------------------
     # 
     #-----------------------------------------------------------
-    def WriteData( self ) :
+    def WriteData( self, header = True ) :
         '''Write data values from the basin.plot_variables dictionary
         to a file. Values are selected from the GetRecordVariables()
-        pop-up checkboxes. '''
+        pop-up checkboxes. If header is False the values are appended
+        to the file, see output.FlushOutput(). '''
 
         if self.model.args.DEBUG_ALL :
             print( '-> WriteData : ', self.name )
 
         # Open a file for this basin
         file_name = self.name + self.model.args.runID + '.csv'
+        mode      = 'w' if header else 'a'
 
         try :
-            fd = open(path_join(self.model.args.basinOutputDir,file_name), 'w')
+            fd = open(path_join(self.model.args.basinOutputDir,file_name),mode)
         except OSError :
             msg = 'WriteData: failed to open file ' + file_name + ' in ' +\
                   self.model.args.basinOutputDir + '\n'
@@ -207,16 +171,16 @@ class Basin:
         var_units = constants.PlotVariableUnit # { var : unit }
 
         # Write the header
-        header = 'Time,\t\t\t'
-        for plotVariable in self.plot_variables.keys() :
-            header = header + plotVariable +' '+ var_units[plotVariable] +',\t'
-        header = header.rstrip( ',\t' )
-        fd.write( header + '\n' )
+        if header :
+            header = 'Time,\t\t\t'
+            for plotVariable in self.plot_variables.keys() :
+                header = header + plotVariable + ' ' +\
+                         var_units[ plotVariable ] + ',\t'
+            header = header.rstrip( ',\t' )
+            fd.write( header + '\n' )
 
-        # Write the data
-        dataList = []
-        for data in self.plot_variables.values() :
-            dataList.append( data )
+        # Write the data, rows of python floats from the record views
+        dataList = [ data.tolist() for data in self.plot_variables.values() ]
 
         for i in range( len( self.model.times ) ) :
             dataStr = str( self.model.times[ i ] ) + ',\t'
@@ -224,24 +188,11 @@ class Basin:
             for j in range( len( dataList ) ) :
                 value = dataList[ j ][ i ]
 
-                if value is None :
+                if value != value : # NaN
                     dataStr = dataStr + 'NA,\t'
                     continue
 
-                try :
-                    value = round( value, 3 )
-                except TypeError as err :
-                    if self.args.DEBUG : 
-                        print( 'Basin ', self.name, ' WriteData(): ', err )
-
-                    # This only happens if the basin is a tidal boundary and
-                    # the data has been returned in a numpy array and not cast
-                    # to a python float, since round() doesn't work on numpy
-                    # arrays in the try: above, but there is np.round() 
-                    # Here we cast it to a float:
-                    value = round( float( value ), 3 )
-
-                dataStr = dataStr + str( value ) +',\t'
+                dataStr = dataStr + str( round( value, 3 ) ) +',\t'
                     
             dataStr = dataStr.rstrip( ',\t' )
             fd.write( dataStr + '\n' )
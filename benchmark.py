@@ -0,0 +1,326 @@
+#! /usr/bin/env python3
+
+#----------------------------------------------------------------------------
+# Name:     benchmark.py
+# Purpose:  Benchmark the Bay Assessment Model on reference scenarios
+#----------------------------------------------------------------------------
+
+'''Run reference scenarios of the shipped data with the headless engine
+and report their timing, memory and a numerical fingerprint.
+
+    ./benchmark.py -sc month year -ts 360 720 [bam.py options]
+
+The scenarios (-sc) are time windows of the 2010-2015 tide boundary data:
+
+    month : 2010-01-01 to 2010-02-01
+    year  : 2010-01-01 to 2011-01-01
+    full  : 2010-01-01 to 2015-12-31
+
+each run at every timestep (-ts). The bam.py options on the command line
+apply to all runs, for instance -ss numba -mt sparse to benchmark the
+vectorized solvers. Each run is a fresh process, and reports:
+
+    steps/s    : ModelLoop timesteps per second
+    init (s)   : Model build and InitTimeBasins, and the time of each
+                 init loader (GetBasinTidalData, GetBasinRainData...),
+                 the loaders run concurrently (-iw)
+    output (s) : output writing (profiling.py WriteOutput phase)
+    peak (MB)  : peak resident memory of the process
+    fingerprint: sha256 of the final basin stage and salinity rounded
+                 to 6 decimals, and the values
+
+The fingerprints are compared to those of the reference file (-rr) for
+the same scenario and timestep : identical, within the tolerance (-ft)
+of the largest stage or salinity difference, or changed. The shipped
+reference file etc/Benchmark_Reference.json has the fingerprints of
+the month, year and full scenarios at timesteps 360 and 720 (s) of the
+default options. With -wr the fingerprints of the runs are written to
+the reference file. The
+results are written as JSON to the benchmark directory (-bo).'''
+
+# Python distribution modules
+from argparse        import ArgumentParser
+from datetime        import datetime
+from functools       import wraps
+from hashlib         import sha256
+from json            import dump, load
+from math            import isnan
+from multiprocessing import get_context
+from os              import makedirs
+from os.path         import exists, join as path_join
+from resource        import getrusage, RUSAGE_SELF
+from time            import perf_counter
+
+# Reference scenarios : { name : ( start, end ) }
+scenarios = { 'month' : ( '2010-01-01', '2010-02-01' ),
+              'year'  : ( '2010-01-01', '2011-01-01' ),
+              'full'  : ( '2010-01-01', '2015-12-31' ) }
+
+tide_file = path_join( 'data', 'Boundary', 'Basin_Tide_Boundary_2010_2015.csv' )
+
+# init.py functions timed as loaders
+loaders = [ 'CreateBasinsFromShapefile', 'GetBasinAreaDepths',
+            'GetBasinParameters',        'CreateShoals',
+            'GetShoalParameters',        'GetBasinTidalData',
+            'GetSeasonalMSL',            'GetTideMatrix',
+            'GetBasinRainData',          'GetTemperatureData',
+            'GetETData',                 'GetBasinRunoffStageData',
+            'GetBasinStageData',         'GetBasinDynamicBCData',
+            'GetBasinFixedBoundaryCondition', 'GetBasinSalinityData',
+            'InitialBasinValues' ]
+
+#----------------------------------------------------------------------------
+# Main module
+#----------------------------------------------------------------------------
+def main():
+    '''See module doc'''
+
+    args, bam_argv = ParseBenchmarkCmdLine()
+
+    makedirs( args.benchmarkOutputDir, exist_ok = True )
+
+    runs = [ ( name, timestep, bam_argv, args.benchmarkOutputDir )
+             for name in args.scenarios for timestep in args.timesteps ]
+
+    # A fresh process for each run : peak memory and loader times are
+    # those of the run
+    context = get_context( 'spawn' )
+
+    results = []
+    with context.Pool( processes = 1, maxtasksperchild = 1 ) as pool :
+        for result in pool.imap( RunBenchmark, runs ) :
+            results.append( result )
+            print( Row( result ), flush = True )
+
+    reference = dict()
+    if exists( args.reference ) :
+        with open( args.reference, 'r' ) as fd :
+            reference = load( fd )
+
+    print( '\nFingerprints : ' + args.reference )
+    for result in results :
+        result[ 'fingerprint_check' ] = CheckFingerprint( result, reference,
+                                                          args.tolerance )
+        print( '  ' + result[ 'scenario' ].ljust( 6 ) +
+               str( result[ 'timestep' ] ).rjust( 6 ) + ' (s) : ' +
+               result[ 'fingerprint_check' ] )
+
+    file_name = path_join( args.benchmarkOutputDir, 'Benchmark_' +
+                           datetime.now().strftime( '%Y-%m-%d_%H%M%S' ) +
+                           '.json' )
+    with open( file_name, 'w' ) as fd :
+        dump( results, fd, indent = 1 )
+
+    print( 'Results written to ' + file_name )
+
+    if args.writeReference :
+        for result in results :
+            reference[ Key( result ) ] = {
+                'command_line' : result[ 'command_line' ],
+                'fingerprint'  : result[ 'fingerprint' ],
+                'stage'        : result[ 'stage' ],
+                'salinity'     : result[ 'salinity' ] }
+
+        with open( args.reference, 'w' ) as fd :
+            dump( reference, fd, indent = 1, sort_keys = True )
+
+        print( 'Reference fingerprints written to ' + args.reference )
+
+#----------------------------------------------------------------------------
+#
+#----------------------------------------------------------------------------
+def RunBenchmark( run ) :
+    '''Run one scenario at one timestep in a worker process. Return a
+    dictionary of the timings, peak memory and fingerprint.'''
+
+    name, timestep, bam_argv, benchmark_dir = run
+
+    # Imported in the worker so that their import is not shared
+    import init
+    from bam    import ParseCmdLine
+    from engine import Engine
+
+    loader_seconds = dict()
+
+    def Timed( loader, Function ) :
+        @wraps( Function )
+        def TimedFunction( *args, **kwargs ) :
+            start = perf_counter()
+            try :
+                return Function( *args, **kwargs )
+            finally :
+                loader_seconds[ loader ] = loader_seconds.get( loader, 0 ) +\
+                                           perf_counter() - start
+        return TimedFunction
+
+    for loader in loaders :
+        setattr( init, loader, Timed( loader, getattr( init, loader ) ) )
+
+    start, end = scenarios[ name ]
+    output_dir = path_join( benchmark_dir, name + '_' + str( timestep ), '' )
+
+    argv = [ '-bt', tide_file ] + bam_argv +\
+           [ '-S', start, '-E', end, '-t', str( timestep ),
+             '-bo', output_dir, '-pf', 'Profile.json' ]
+
+    makedirs( output_dir, exist_ok = True )
+
+    init_start = perf_counter()
+    engine     = Engine( args = ParseCmdLine( argv ), quiet = True )
+    init_time  = perf_counter() - init_start
+
+    engine.Run()
+
+    model   = engine.model
+    profile = model.profile.Summary()
+    phases  = profile[ 'phases' ]
+
+    loop_time = profile[ 'run' ][ 'seconds' ] - \
+                phases[ 'WriteOutput' ][ 'seconds' ]
+
+    # Final basin stage and salinity in basin number order
+    Basins   = [ model.Basins[ number ] for number in sorted( model.Basins ) ]
+    # as float : a NumPy float64 (DailyForcing salinity) has another repr
+    stage    = [ round( float( Basin.water_level ), 6 ) for Basin in Basins ]
+    salinity = [ round( float( Basin.salinity ),    6 ) for Basin in Basins ]
+
+    fingerprint = sha256( repr( ( stage, salinity ) ).encode() ).hexdigest()
+
+    return { 'scenario'       : name,
+             'timestep'       : timestep,
+             'command_line'   : ' '.join( argv ),
+             'steps'          : profile[ 'run' ][ 'steps' ],
+             'steps_per_s'    : profile[ 'run' ][ 'steps' ] / loop_time
+                                if loop_time > 0 else 0,
+             'init_s'         : init_time,
+             'loaders_s'      : loader_seconds,
+             'loop_s'         : loop_time,
+             'output_s'       : phases[ 'WriteOutput' ][ 'seconds' ],
+             'phases'         : phases,
+             'iterations'     : profile[ 'iterations' ],
+             'peak_MB'        : getrusage( RUSAGE_SELF ).ru_maxrss / 1024,
+             'fingerprint'    : fingerprint,
+             'stage'          : stage,
+             'salinity'       : salinity }
+
+#----------------------------------------------------------------------------
+#
+#----------------------------------------------------------------------------
+def Key( result ) :
+    '''Reference file key of a result'''
+
+    return result[ 'scenario' ] + '_' + str( result[ 'timestep' ] )
+
+#----------------------------------------------------------------------------
+#
+#----------------------------------------------------------------------------
+def CheckFingerprint( result, reference, tolerance ) :
+    '''Compare the result fingerprint to the reference'''
+
+    if Key( result ) not in reference :
+        return 'no reference'
+
+    expected = reference[ Key( result ) ]
+
+    if result[ 'fingerprint' ] == expected[ 'fingerprint' ] :
+        return 'identical'
+
+    differences = [ abs( a - b ) for variable in [ 'stage', 'salinity' ]
+                    for a, b in zip( result  [ variable ],
+                                     expected[ variable ] ) ]
+
+    # max() skips a NaN that is not first
+    if any( isnan( difference ) for difference in differences ) :
+        return 'changed : NaN'
+
+    max_difference = max( differences, default = 0 )
+
+    status = 'within tolerance' if max_difference <= tolerance else 'CHANGED'
+
+    return status + ' : max difference ' + str( round( max_difference, 6 ) )
+
+#----------------------------------------------------------------------------
+#
+#----------------------------------------------------------------------------
+def Row( result ) :
+    '''One line summary of a result'''
+
+    loaders = sorted( result[ 'loaders_s' ].items(),
+                      key = lambda item : item[ 1 ], reverse = True )[ : 3 ]
+
+    return result[ 'scenario' ].ljust( 6 ) +\
+           str( result[ 'timestep' ] ).rjust( 6 ) + ' (s)  ' +\
+           str( result[ 'steps' ] ) + ' steps  ' +\
+           str( round( result[ 'steps_per_s' ], 1 ) ) + ' steps/s  init ' +\
+           str( round( result[ 'init_s' ], 2 ) ) + ' (s) [ ' +\
+           ', '.join( loader + ' ' + str( round( seconds, 2 ) )
+                      for loader, seconds in loaders ) + ' ]  output ' +\
+           str( round( result[ 'output_s' ], 2 ) ) + ' (s)  peak ' +\
+           str( round( result[ 'peak_MB' ] ) ) + ' (MB)'
+
+#--------------------------------------------------------------
+#
+#--------------------------------------------------------------
+def ParseBenchmarkCmdLine():
+    '''Parse the benchmark options, the remaining arguments are the
+    bam.py options of all runs'''
+
+    # No abbreviations : -s -t... are bam.py options
+    parser = ArgumentParser( description = 'Bay Assessment Model Benchmark',
+                             epilog = 'Other arguments are bam.py options '
+                                      'applied to all runs.',
+                             allow_abbrev = False )
+
+    parser.add_argument('-sc', '--scenarios',
+                        dest    = 'scenarios', type = str, nargs = '+',
+                        action  = 'store',
+                        default = [ 'month' ],
+                        choices = list( scenarios.keys() ),
+                        help    = 'Scenarios: -sc month')
+
+    parser.add_argument('-ts', '--timesteps',
+                        dest    = 'timesteps', type = int, nargs = '+',
+                        action  = 'store',
+                        default = [ 360 ],
+                        help    = 'Timesteps (s) of each scenario: -ts 360')
+
+    parser.add_argument('-rr', '--reference',
+                        dest    = 'reference', type = str,
+                        action  = 'store',
+                        default = path_join( 'etc', 'Benchmark_Reference.json' ),
+                        help    = 'Reference fingerprints: -rr ' +\
+                                  path_join( 'etc', 'Benchmark_Reference.json' ))
+
+    parser.add_argument('-wr', '--writeReference',
+                        dest    = 'writeReference', # type = bool,
+                        action  = 'store_true', default = False,
+                        help    = 'Write the fingerprints of the runs to ' +\
+                                  'the reference file.')
+
+    parser.add_argument('-ft', '--tolerance',
+                        dest    = 'tolerance', type = float,
+                        action  = 'store',
+                        default = 1E-3,
+                        help    = 'Fingerprint stage (m) and salinity ' +\
+                                  'tolerance: -ft 0.001')
+
+    parser.add_argument('-bo', '--benchmarkOutputDir',
+                        dest    = 'benchmarkOutputDir', type = str,
+                        action  = 'store',
+                        default = path_join( '.', 'benchmark', '' ),
+                        help    = 'Benchmark output directory: -bo ' +\
+                                  path_join( '.', 'benchmark', '' ) )
+
+    args, bam_argv = parser.parse_known_args()
+
+    # Headless runs
+    for option in [ '-ng', '-nT' ] :
+        if option not in bam_argv :
+            bam_argv.append( option )
+
+    return args, bam_argv
+
+#----------------------------------------------------------------------------
+# Provide for cmd line invocation and clean module loading
+if __name__ == "__main__":
+    main()
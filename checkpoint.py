@@ -0,0 +1,261 @@
+'''Checkpoint and restart for the Bay Assessment Model (BAM)
+
+A checkpoint is an uncompressed NumPy npz archive of the model state at
+the end of a timestep:
+  basin_<variable> : the scratch.BasinScratch variables of the Basins
+  shoal_<variable> : the per-depth Shoal dictionaries [ shoal, depth ],
+                     NaN where a depth is not a key, shoal_depths
+  basin_<attribute>, shoal_<attribute> : the other Basin and Shoal
+                     dynamic attributes, NaN for None
+  times, records   : model.times and the unwritten model.records
+  metadata         : JSON : version, command line, current_time,
+                     unix_time, record variables...
+
+With -cp file, a checkpoint is written to the basinOutputDir (-bo) every
+checkpointInterval (-ci hours), and when the run ends or is stopped.
+The file is replaced by each checkpoint.
+
+With -rs file, ModelLoop restores the checkpoint before the first
+timestep and continues from its current_time, which must be within the
+-S -E time window. If the checkpoint is from a run with the same start
+time and record variables its records are restored and the output of
+the run continues; otherwise the records start at the checkpoint time,
+for instance a spin-up state used as the initial state of a scenario.'''
+
+# Python distribution modules
+from datetime import datetime
+from json     import dumps, loads
+from os       import replace
+from os.path  import join as path_join
+
+# Community modules
+from numpy import array as nparray
+from numpy import full  as npfull
+from numpy import nan   as npNaN
+from numpy import savez, isnan
+from numpy import load  as npload
+
+# Local modules
+from scratch import BasinScratch
+
+# Dynamic attributes of the Basin and Shoal objects, not in BasinScratch
+basin_attributes = [ 'runoff_EVER', 'runoff_BC', 'groundwater' ]
+shoal_attributes = [ 'level_difference', 'flow_sign',
+                     'volume_residual',  'volume_total',
+                     'Q_total',          'cross_section_total',
+                     'volume_A_B',       'volume_B_A' ]
+
+# Per-depth dictionaries of the Shoals { depth(ft) : value }
+shoal_depth_variables = [ 'velocity',      'wet_length', 'friction_factor',
+                          'h_upstream',    'h_downstream',
+                          'cross_section', 'hydraulic_radius', 'Q' ]
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def WriteCheckpoint( model ) :
+    '''Write the model state to the checkpoint file (-cp)'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> WriteCheckpoint' )
+
+    basin_scratch = model.basin_scratch
+    Shoals        = list( model.Shoals.values() )
+    depths        = ShoalDepths( Shoals )
+    records       = model.records
+
+    # Copy the solution of the vectorized shoal solvers to the Shoals
+    if model.shoal_arrays and not model.shoal_arrays.shared :
+        model.shoal_arrays.Scatter()
+
+    basin_scratch.Gather( list( BasinScratch.variables ) )
+
+    arrays = dict()
+
+    for variable in BasinScratch.variables :
+        arrays[ 'basin_' + variable ] = getattr( basin_scratch, variable )
+
+    # Shoals in model.Shoals order
+    for variable in shoal_depth_variables :
+        values = npfull( ( len( Shoals ), len( depths ) ), npNaN )
+
+        for i, Shoal in enumerate( Shoals ) :
+            for depth, value in getattr( Shoal, variable ).items() :
+                values[ i, depths.index( depth ) ] = value
+
+        arrays[ 'shoal_' + variable ] = values
+
+    arrays[ 'shoal_initial_velocity' ] = nparray(
+        [ Shoal.initial_velocity for Shoal in Shoals ], dtype = bool )
+
+    arrays.update( ObjectArrays( 'basin_', model.Basins.values(),
+                                 basin_attributes ) )
+    arrays.update( ObjectArrays( 'shoal_', Shoals, shoal_attributes ) )
+
+    arrays[ 'basin_number' ] = nparray( [ Basin.number for Basin in
+                                          model.Basins.values() ] )
+    arrays[ 'shoal_depths' ] = nparray( depths, dtype = float )
+
+    arrays[ 'times'   ] = nparray( model.times, dtype = 'datetime64[us]' )
+    arrays[ 'records' ] = records.data[ : records.size ]
+
+    metadata = { 'version'          : model.Version,
+                 'command_line'     : model.args.commandLine,
+                 'start_time'       : model.start_time.isoformat(),
+                 'current_time'     : model.current_time.isoformat(),
+                 'unix_time'        : model.unix_time,
+                 'seasonal_MSL'     : float( model.seasonal_MSL ),
+                 'record_variables' : records.variables,
+                 'record_chunks'    : records.chunks,
+                 'basin_capacity'   : basin_scratch.capacity,
+                 'shoal_count'      : len( Shoals ) }
+
+    arrays[ 'metadata' ] = nparray( dumps( metadata ) )
+
+    file_name = path_join( model.args.basinOutputDir, model.args.checkpoint )
+
+    # Write a temporary file and rename it so that a run killed while
+    # writing keeps the previous checkpoint
+    try :
+        with open( file_name + '.tmp', 'wb' ) as fd :
+            savez( fd, **arrays )
+
+        replace( file_name + '.tmp', file_name )
+
+    except OSError as err :
+        msg = 'WriteCheckpoint: failed to write ' + file_name + ': ' +\
+              str( err ) + '\n'
+        model.gui.Message( msg )
+        return
+
+    msg = 'Checkpoint at ' + str( model.current_time ) +\
+          ' written to ' + file_name + '\n'
+    model.gui.Message( msg )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ReadCheckpoint( model, file_name ) :
+    '''Restore the model state from the checkpoint file_name (-rs).
+    Return True if the records of the checkpoint were restored.'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> ReadCheckpoint' )
+
+    basin_scratch = model.basin_scratch
+    Shoals        = list( model.Shoals.values() )
+    records       = model.records
+
+    try :
+        with npload( file_name ) as npz :
+            arrays = { key : npz[ key ] for key in npz.files }
+
+    except OSError as err :
+        errMsg = 'ReadCheckpoint: failed to read ' + file_name + ': ' +\
+                 str( err ) + '\n'
+        raise Exception( errMsg )
+
+    metadata     = loads( str( arrays[ 'metadata' ] ) )
+    current_time = datetime.fromisoformat( metadata[ 'current_time' ] )
+
+    depths = ShoalDepths( Shoals )
+
+    if metadata[ 'basin_capacity' ] != basin_scratch.capacity or \
+       metadata[ 'shoal_count'    ] != len( Shoals ) or \
+       arrays[ 'shoal_depths' ].tolist() != depths :
+        errMsg = 'ReadCheckpoint: ' + file_name + ' basins and shoals ' +\
+                 'do not match the model.\n'
+        raise Exception( errMsg )
+
+    if current_time < model.start_time or current_time > model.end_time :
+        errMsg = 'ReadCheckpoint: ' + file_name + ' time ' +\
+                 str( current_time ) + ' is not within the start ' +\
+                 str( model.start_time ) + ' and end ' +\
+                 str( model.end_time ) + ' times.\n'
+        raise Exception( errMsg )
+
+    for variable in BasinScratch.variables :
+        getattr( basin_scratch, variable )[:] = arrays[ 'basin_' + variable ]
+
+    basin_scratch.Scatter( list( BasinScratch.variables ) )
+
+    for variable in shoal_depth_variables :
+        rows = arrays[ 'shoal_' + variable ].tolist()
+
+        for Shoal, row in zip( Shoals, rows ) :
+            values = getattr( Shoal, variable )
+            values.clear()
+            values.update( ( depth, value ) for depth, value in
+                           zip( depths, row ) if value == value ) # not NaN
+
+    for Shoal, initial in zip( Shoals,
+                               arrays[ 'shoal_initial_velocity' ].tolist() ) :
+        Shoal.initial_velocity = initial
+
+    # The vectorized shoal solvers continue from the restored Shoals
+    if model.shoal_arrays :
+        model.shoal_arrays.Gather()
+
+    SetObjectAttributes( 'basin_', model.Basins.values(),
+                         basin_attributes, arrays )
+    SetObjectAttributes( 'shoal_', Shoals, shoal_attributes, arrays )
+
+    model.current_time = current_time
+    model.unix_time    = metadata[ 'unix_time' ]
+    model.seasonal_MSL = metadata[ 'seasonal_MSL' ]
+
+    # Restore the records if the checkpoint is of this run
+    restore_records = \
+        metadata[ 'start_time' ] == model.start_time.isoformat() and \
+        metadata[ 'record_variables' ] == records.variables and \
+        len( arrays[ 'records' ] ) <= len( records.data )
+
+    if restore_records :
+        model.times.clear()
+        model.times.extend( arrays[ 'times' ].astype( datetime ).tolist() )
+
+        records.Clear()
+        records.size   = len( arrays[ 'records' ] )
+        records.chunks = metadata[ 'record_chunks' ]
+        records.data[ : records.size ] = arrays[ 'records' ]
+
+    msg = 'Restart from ' + file_name + ' at ' + str( current_time ) +\
+          ( ', records restored.\n' if restore_records else '.\n' )
+    model.gui.Message( msg )
+
+    return restore_records
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ObjectArrays( prefix, Objects, attributes ) :
+    '''{ prefix + attribute : array in Objects order }, NaN for None'''
+
+    arrays = dict()
+
+    for attribute in attributes :
+        arrays[ prefix + attribute ] = nparray(
+            [ getattr( Object, attribute ) for Object in Objects ],
+            dtype = float ) # None is NaN
+
+    return arrays
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def SetObjectAttributes( prefix, Objects, attributes, arrays ) :
+    '''Set the attributes of Objects from ObjectArrays(), None for NaN'''
+
+    for attribute in attributes :
+        values = arrays[ prefix + attribute ].tolist()
+
+        for Object, value in zip( Objects, values ) :
+            setattr( Object, attribute, None if isnan( value ) else value )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ShoalDepths( Shoals ) :
+    '''Sorted depths(ft), the keys of the Shoal wet_length dictionaries'''
+
+    return sorted( set().union( *[ Shoal.wet_length for Shoal in Shoals ] ) )
@@ -0,0 +1,69 @@
+'''Console interface for the Bay Assessment Model (BAM)
+
+Headless counterpart of gui.GUI: the model object model.gui is either a
+gui.GUI (Tk) or a console.Console. The model calls only Message(),
+TimeUpdate() and InitPlotVars() in the compute path, the Console provides
+these without importing tkinter or matplotlib.'''
+
+# Local modules
+import constants
+
+#---------------------------------------------------------------
+# 
+#---------------------------------------------------------------
+class Console:
+    '''Model interface without a GUI (-ng) : messages to the console.'''
+
+    def __init__( self, model, quiet = False ):
+
+        self.model = model
+        self.quiet = quiet # True : log messages to run_info only
+
+    #------------------------------------------------------------------
+    #
+    #------------------------------------------------------------------
+    def Message ( self, msg ) :
+        '''Display message on console, log to run_info.'''
+
+        if not self.quiet :
+            try:
+                print( msg, end = '' )
+            except UnicodeEncodeError:
+                print( msg.encode( 'ascii', 'replace' ).decode( 'ascii' ),
+                       end = '' )
+
+        self.model.run_info.append( msg )
+
+    #------------------------------------------------------------------
+    #
+    #------------------------------------------------------------------
+    def TimeUpdate ( self ) :
+        '''Show the simulation time every model.timeLabelUpdate'''
+
+        if not self.quiet :
+            print( str( self.model.current_time ) )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def InitPlotVars( self ):
+        '''Set the default model.record_variables and initialize the
+        basin.plot_variables'''
+
+        self.model.SetRecordVariables( constants.BasinRecordVariable )
+
+#---------------------------------------------------------------
+# 
+#---------------------------------------------------------------
+class IntVar :
+      '''Surrogate for Tk.IntVar() when non-GUI option invoked.
+    Provides set() and get() methods.'''
+
+      def __init__( self, value = 0 ):
+          self.value = value
+
+      def set( self, value ) :
+          self.value = value
+
+      def get( self ) :
+          return self.value
@@ -25,6 +25,10 @@ BasinPlotVariable = [ 'Salinity',   'Stage',       'Volume', 'Flow',
                       #'Temperature','Phosphate',   'Nitrate','Ammonium',
                       #'Oxygen' ]
 
+# Basin variables recorded by default in basin.plot_variables
+BasinRecordVariable = [ 'Salinity', 'Stage', 'Flow', 'Volume',
+                        'Rain', 'Evaporation', 'Runoff' ]
+
 PlotVariableUnit = { 'Salinity'    : '(ppt)',   'Stage'       : '(m)',
                      'Volume'      : '(m^3)',   'Flow'        : '(m^3/s)',
                      'Rain'        : '(m^3/s)', 'Evaporation' : '(m^3/s)',
@@ -0,0 +1,174 @@
+'''Headless compute engine for the Bay Assessment Model (BAM)
+
+Build, run and query the model without the GUI: tkinter and matplotlib
+are not imported. The model messages go to a console.Console.
+
+    from engine import Engine
+
+    bam = Engine( [ '-S', '2010-1-1', '-E', '2010-2-1', '-bo', 'out/' ] )
+    bam.Run()
+    times, results = bam.Results()
+
+    bam.Run( start = '2010-2-1', end = '2010-3-1' )
+
+The arguments are the bam.py command line options. -ng and -nT are
+implied: the simulation runs in the calling thread.'''
+
+# Python distribution modules
+from datetime import timedelta
+
+# Local modules
+import model as bam_model
+import console
+import profiling
+from bam  import ParseCmdLine
+from init import InitTimeBasins
+
+# Options (args dest) read when the Model, its Basins and Shoals are built
+model_options = [ 'path',           'basinShapeFile', 'basinDepth',
+                  'basinParameters','shoalShapeFile', 'shoalLength',
+                  'shoalParameters','shoalManning',   'timestep',
+                  'max_iteration',  'velocity_tol',   'outputInterval',
+                  'mapInterval',    'shoalSolver',    'massTransport',
+                  'adaptiveTimestep', 'stageSolver', 'geometry',
+                  'geometryTolerance' ]
+
+# Options read by init.InitTimeBasins when the time window changes
+forcing_options = [ 'start',           'end',              'basinTide',
+                    'seasonalMSL',     'basinRain',        'surfaceTemp',
+                    'ET',              'basinStageRunoff', 'basinStageRunoffMap',
+                    'basinStage',      'basinBCFile',      'salinityFile',
+                    'gaugeSalinity',   'noTide',           'noMeanSeaLevel',
+                    'noRain',          'noET_Amplify',     'noET',
+                    'noStageRunoff',   'noDynamicBoundaryConditions' ]
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class Engine:
+    '''Compute-only model. Builds the Model with its Basins and Shoals
+    from the command line options argv, or a parsed args Namespace.'''
+
+    def __init__( self, argv = None, args = None, quiet = False ):
+
+        if args is None :
+            args = ParseCmdLine( [] if argv is None else list( argv ) )
+
+        self.quiet = quiet # Console messages to the model run_info only
+
+        self.Build( args )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Build( self, args ) :
+        '''Create the Model with its Basins and Shoals and initialize it'''
+
+        args.noGUI    = True
+        args.noThread = True
+
+        self.args  = args
+        self.model = bam_model.Model( args )
+
+        self.model.gui = console.Console( self.model, quiet = self.quiet )
+
+        self.Init()
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Init( self ) :
+        '''Reset time and basins to the start time, (re)read the forcing
+        data if the time window changed. See init.InitTimeBasins.'''
+
+        model = self.model
+
+        InitTimeBasins( model )
+
+        model.gui.InitPlotVars() # Set default outputs
+
+        model.previous_start_time = model.start_time
+        model.previous_end_time   = model.end_time
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Configure( self, args ) :
+        '''Set new options args, keeping what does not depend on them:
+        the Model is rebuilt if a model_options value changed, the
+        forcing data are reread if a forcing_options value changed,
+        otherwise only the basins are reinitialized.'''
+
+        args.noGUI    = True
+        args.noThread = True
+
+        def Changed( options ) :
+            return any( getattr( args, option ) != getattr( self.args, option )
+                        for option in options )
+
+        if Changed( model_options ) :
+            self.Build( args )
+            return
+
+        model = self.model
+
+        if Changed( forcing_options ) :
+            model.previous_start_time = None # InitTimeBasins time_changed
+
+        self.args  = args
+        model.args = args
+
+        model.restart_file       = args.restart # -rs
+        model.checkpointInterval = timedelta( hours = args.checkpointInterval )
+
+        model.profile = profiling.Profile( model ) if args.profile else \
+                        profiling.NoProfile() # -pf
+
+        model.GetStartStopTime()
+        self.Init()
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Run( self, start = None, end = None ) :
+        '''Run the simulation from start to end, strings as -S -E.
+        If start or end is given, or a run has finished, the model is
+        reinitialized to the time window. Basin output files are written
+        to -bo as by bam.py.'''
+
+        model = self.model
+
+        if start is not None or end is not None :
+            if start is not None :
+                self.args.start = start
+            if end is not None :
+                self.args.end = end
+
+            model.GetStartStopTime()
+            self.Init()
+
+        elif model.state == model.status.Finished :
+            self.Init()
+
+        model.gui.Message( model.Version )
+        model.gui.Message( self.args.commandLine + '\n' )
+
+        model.Run()
+
+        return self.Results()
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Results( self ) :
+        '''Return the recorded times, and the basin records :
+        [ datetime ], { basin name : { plotVariable : [ values ] } }
+        the values are views of the model.records array, NaN where
+        a value is not available.'''
+
+        model = self.model
+
+        results = { Basin.name : Basin.plot_variables
+                    for Basin in model.Basins.values() }
+
+        return model.times, results
@@ -0,0 +1,202 @@
+#! /usr/bin/env python3
+
+#----------------------------------------------------------------------------
+# Name:     ensemble.py
+# Purpose:  Run an ensemble of Bay Assessment Model scenarios
+#----------------------------------------------------------------------------
+
+'''Run the scenarios of a scenario table with the headless engine in a
+process pool.
+
+    ./ensemble.py -sT scenarios.csv -j 8 -eo ensemble/ [bam.py options]
+
+The scenario table is a csv file with a header row, and one row per
+scenario : the scenario name, then the bam.py options of the scenario:
+
+    Scenario, Options
+    base,
+    manning_low,  -sm 0.02
+    et_high,      -es 1.1
+    bc_2012,      -bc data/BC/Boundary_2012.csv -S 2012-1-1 -E 2012-12-31
+
+The bam.py options on the ensemble.py command line apply to all
+scenarios, the scenario options are added to them. The outputs of each
+scenario are written to the directory ensemble/name/ (-bo), and a
+summary ensemble/ensemble_index.csv lists each scenario with its
+status, elapsed time and output directory.
+
+The base model, with its Basins, Shoals and forcing data for the common
+options, is built once in this process. The workers are forked from it
+(copy-on-write) with a fresh fork for each scenario, so that a scenario
+only rebuilds what its options change, see engine.Engine.Configure().'''
+
+# Python distribution modules
+from   argparse        import ArgumentParser
+from   multiprocessing import get_context
+from   os              import cpu_count, makedirs
+from   os.path         import join as path_join
+from   time            import time
+from   shlex           import split as shlex_split
+
+# Local modules
+from bam    import ParseCmdLine
+from engine import Engine
+
+# Engine of the common options, inherited by the forked workers
+base_engine = None
+base_argv   = None
+
+#----------------------------------------------------------------------------
+# Main module
+#----------------------------------------------------------------------------
+def main():
+    '''See module doc'''
+
+    global base_engine, base_argv
+
+    args, base_argv = ParseEnsembleCmdLine()
+
+    scenarios = ReadScenarios( args.scenarioTable )
+
+    makedirs( args.ensembleOutputDir, exist_ok = True )
+
+    print( 'Ensemble: ' + str( len( scenarios ) ) + ' scenarios from ' +
+           args.scenarioTable + ' on ' + str( args.processes ) +
+           ' processes.', flush = True )
+
+    # Build the shared base model before the pool forks the workers
+    base_engine = Engine( base_argv, quiet = True )
+
+    tasks = [ ( name, options, args.ensembleOutputDir )
+              for name, options in scenarios ]
+
+    # maxtasksperchild = 1 : each scenario starts from the base model
+    context = get_context( 'fork' )
+    with context.Pool( processes = args.processes,
+                       maxtasksperchild = 1 ) as pool :
+
+        results = []
+        for result in pool.imap( RunScenario, tasks ) :
+            print( result[ 0 ] + ' : ' + result[ 1 ] +
+                   ' ' + str( round( result[ 2 ], 1 ) ) + ' (s)', flush = True )
+            results.append( result )
+
+    WriteIndex( args.ensembleOutputDir, results, dict( scenarios ) )
+
+#----------------------------------------------------------------------------
+#
+#----------------------------------------------------------------------------
+def RunScenario( task ) :
+    '''Run one scenario in a worker process. Return a tuple:
+    ( name, status, elapsed time (s), output directory )'''
+
+    name, options, ensemble_dir = task
+
+    output_dir = path_join( ensemble_dir, name, '' )
+    start_time = time()
+
+    try :
+        args = ParseCmdLine( base_argv + shlex_split( options ) +
+                             [ '-bo', output_dir ] )
+
+        engine = base_engine
+        engine.Configure( args )
+        engine.Run()
+
+        status = 'ok'
+
+    except Exception as err :
+        status = 'failed: ' + str( err ).strip().replace( ',', ';' )
+
+    except SystemExit :
+        # argparse exits on an invalid scenario option
+        status = 'failed: invalid options'
+
+    return ( name, status, time() - start_time, output_dir )
+
+#----------------------------------------------------------------------------
+#
+#----------------------------------------------------------------------------
+def ReadScenarios( scenario_file ) :
+    '''Read the scenario table : [ ( name, options ) ]'''
+
+    fd   = open( scenario_file, 'r' )
+    rows = fd.readlines()
+    fd.close()
+
+    scenarios = []
+
+    # Skip the header
+    for row in rows[ 1: ] :
+        if not row.strip() or row.lstrip().startswith( '#' ) :
+            continue
+
+        words   = row.split( ',', 1 )
+        name    = words[ 0 ].strip()
+        options = words[ 1 ].strip() if len( words ) > 1 else ''
+
+        if name in dict( scenarios ) :
+            errMsg = 'ReadScenarios: duplicate scenario ' + name +\
+                     ' in ' + scenario_file
+            raise Exception( errMsg )
+
+        scenarios.append( ( name, options ) )
+
+    return scenarios
+
+#----------------------------------------------------------------------------
+#
+#----------------------------------------------------------------------------
+def WriteIndex( ensemble_dir, results, options ) :
+    '''Write the ensemble summary index ensemble_index.csv'''
+
+    fd = open( path_join( ensemble_dir, 'ensemble_index.csv' ), 'w' )
+
+    fd.write( 'Scenario,\tStatus,\tElapsed (s),\tOutput,\tOptions\n' )
+
+    for name, status, elapsed_time, output_dir in results :
+        fd.write( name + ',\t' + status + ',\t' +
+                  str( round( elapsed_time, 1 ) ) + ',\t' +
+                  output_dir + ',\t' + options[ name ] + '\n' )
+
+    fd.close()
+
+#--------------------------------------------------------------
+#
+#--------------------------------------------------------------
+def ParseEnsembleCmdLine():
+    '''Parse the ensemble options, the remaining arguments are the
+    bam.py options common to all scenarios'''
+
+    # No abbreviations, -sT : -s -st... are bam.py options
+    parser = ArgumentParser( description = 'Bay Assessment Model Ensemble',
+                             epilog = 'Other arguments are bam.py options '
+                                      'applied to all scenarios.',
+                             allow_abbrev = False )
+
+    parser.add_argument('-sT', '--scenarioTable',
+                        dest     = 'scenarioTable', type = str,
+                        action   = 'store',
+                        required = True,
+                        help     = 'Scenario table csv file: -sT scenarios.csv')
+
+    parser.add_argument('-j', '--processes',
+                        dest    = 'processes', type = int,
+                        action  = 'store',
+                        default = cpu_count(),
+                        help    = 'Number of worker processes: -j ' +\
+                                  str( cpu_count() ) )
+
+    parser.add_argument('-eo', '--ensembleOutputDir',
+                        dest    = 'ensembleOutputDir', type = str,
+                        action  = 'store',
+                        default = path_join( '.', 'ensemble', '' ),
+                        help    = 'Ensemble output directory: -eo ' +\
+                                  path_join( '.', 'ensemble', '' ) )
+
+    return parser.parse_known_args()
+
+#----------------------------------------------------------------------------
+# Provide for cmd line invocation and clean module loading
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,644 @@
+'''Daily forcing data files for the Bay Assessment Model (BAM)
+
+The daily forcing csv files (rain, ET, temperature, salinity, stage,
+EDEN runoff stage, dynamic boundary conditions) have a header row, then
+one row per day : YYYY-MM-DD, value, value...  ReadDailyData() parses a
+file into:
+  dates   : [ datetime ]
+  columns : [ header name ] of the value columns
+  values  : float array [ date, column ], NaN for NA
+
+The hourly tide boundary files (-bt) are parsed by ReadTideData() into
+  seconds : float array of unix times (s)
+  levels  : float array of the demeaned water levels (m)
+
+The parsed arrays are cached in the forcingCache directory (-fc) as
+.npy files, with a .json file of the header and the size and mtime of
+the csv file. A later run reads the cache, memory mapped, as long as
+the csv file is unchanged. -nc disables the cache.
+
+The arrays read are kept in read_files for the next time window
+(init.MissingDays), the unchanged files are not read again.
+
+PreloadForcing() parses the files of the init loaders that are not in
+a current cache in a process pool, ReadDailyData() and ReadTideData()
+then take their arrays from preloaded.
+
+Observations holds the loaders of the observation-only daily data,
+gauge stage (-bs) and gauge salinity without -gs or -si, which are
+read the first time they are needed rather than at init.
+
+DailyForcing resolves the daily data dictionaries read by init.py
+(model.rain_data, et_data...) to dense arrays indexed by the day of the
+run and mapped to the basins, built by InitTimeBasins. A missing day or
+NA value in a forcing the run uses raises a ValueError, the gauge
+salinity may be NA. ModelLoop calls DailyForcing.Update() each timestep,
+the rows of the current day are selected when the day changes.'''
+
+# Python distribution modules
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from json     import dump, load
+from hashlib  import sha1
+from multiprocessing import current_process
+from os       import cpu_count, makedirs, replace, stat
+from os.path  import join as path_join
+from os.path  import abspath, basename, dirname
+from os.path  import exists as path_exists
+strptime = datetime.strptime
+
+# Community modules
+from numpy import array as nparray
+from numpy import full  as npfull
+from numpy import nan   as npNaN
+from numpy import load  as npload
+from numpy import save  as npsave
+from numpy import isnan, flatnonzero
+
+# Arrays parsed by PreloadForcing : { abspath : ( arrays, header ) }
+preloaded = dict()
+
+# Arrays read for a previous time window : { abspath : ( source, data ) }
+read_files = dict()
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ReadDailyData( model, file_name ) :
+    '''Return the dates, columns and values of the daily data csv
+    file_name, from the forcing cache if it is current. Raises OSError
+    if file_name can not be read.'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> ReadDailyData ', file_name, flush = True )
+
+    arrays, header = CachedArrays( model, file_name, ParseDailyData )
+
+    return ( arrays[ 'dates' ].astype( datetime ).tolist(),
+             header[ 'columns' ], arrays[ 'values' ] )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ReadTideData( model, file_name ) :
+    '''Return the hourly tide series of file_name from the forcing
+    cache if it is current : times (unix seconds), levels (m). Both are
+    float arrays in file order. Raises OSError if file_name can not
+    be read.'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> ReadTideData ', file_name, flush = True )
+
+    arrays, header = CachedArrays( model, file_name, ParseTideData )
+
+    return arrays[ 'seconds' ], arrays[ 'levels' ]
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def CachedArrays( model, file_name, Parse ) :
+    '''Return the arrays { name : array } and header { name : value }
+    of Parse( file_name ): those read for a previous time window if
+    the file is unchanged, from the cache if it is current, else
+    preloaded or parsed and written to the cache.'''
+
+    source = CacheSource( file_name )
+
+    # Read for a previous time window, the csv file is unchanged
+    if source[ 'file' ] in read_files :
+        read_source, data = read_files[ source[ 'file' ] ]
+
+        if read_source == source :
+            return data
+
+    # Parsed in the process pool of PreloadForcing
+    data = preloaded.pop( source[ 'file' ], None )
+
+    if model.args.noForcingCache :
+        if data is None :
+            data = Parse( file_name )
+
+        read_files[ source[ 'file' ] ] = ( source, data )
+
+        return data
+
+    cache_file = CacheFileName( model, file_name )
+
+    if data is None :
+        data = ReadCache( cache_file, source )
+
+        if data is not None :
+            read_files[ source[ 'file' ] ] = ( source, data )
+            return data
+
+        data = Parse( file_name )
+
+    try :
+        WriteCache( cache_file, source, *data )
+
+    except OSError as err :
+        if model.args.DEBUG :
+            print( 'CachedArrays: failed to write cache ', cache_file,
+                   ' : ', err )
+
+    read_files[ source[ 'file' ] ] = ( source, data )
+
+    return data
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def PreloadForcing( model, files, workers ) :
+    '''Parse the csv files [ ( file_name, Parse ) ] that are not in a
+    current forcing cache in a process pool of up to workers processes
+    (one per cpu), into preloaded. A file that fails to parse is left to
+    its loader, which reports the error. With a single file or cpu, or
+    in a daemonic process (ensemble.py pool worker) that can not have
+    children, the files are parsed by their loaders.'''
+
+    workers = min( workers, cpu_count() or 1 )
+
+    if workers < 2 or current_process().daemon :
+        return
+
+    stale = dict() # { abspath : ( file_name, Parse ) }
+
+    for file_name, Parse in files :
+        try :
+            source = CacheSource( file_name )
+        except OSError :
+            continue
+
+        if source[ 'file' ] in read_files and \
+           read_files[ source[ 'file' ] ][ 0 ] == source :
+            continue
+
+        if not model.args.noForcingCache and \
+           ReadCache( CacheFileName( model, file_name ), source ) is not None :
+            continue
+
+        stale[ source[ 'file' ] ] = ( file_name, Parse )
+
+    if len( stale ) < 2 :
+        return
+
+    if model.args.DEBUG :
+        print( '-> PreloadForcing ', len( stale ), ' files', flush = True )
+
+    # A failed pool or parse leaves the files to their loaders
+    try :
+        with ProcessPoolExecutor( max_workers = min( workers, len( stale ) ) )\
+             as pool :
+            futures = { name : pool.submit( Parse, file_name )
+                        for name, ( file_name, Parse ) in stale.items() }
+
+            for name, future in futures.items() :
+                try :
+                    preloaded[ name ] = future.result()
+                except Exception :
+                    pass
+
+    except Exception as err :
+        if model.args.DEBUG :
+            print( '-> PreloadForcing failed: ', err, flush = True )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def CacheSource( file_name ) :
+    '''The path, size and mtime of file_name that identify its cache.
+    Raises OSError if file_name does not exist.'''
+
+    file_stat = stat( file_name )
+
+    return { 'file'     : abspath( file_name ),
+             'size'     : file_stat.st_size,
+             'mtime_ns' : file_stat.st_mtime_ns }
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ParseDailyData( file_name ) :
+    '''Parse the daily data csv file_name :
+    { dates, values }, { columns }'''
+
+    fd   = open( file_name, 'r' )
+    rows = fd.readlines()
+    fd.close()
+
+    # Header names of the columns after the date column
+    columns = [ word.strip() for word in rows[ 0 ].split( ',' )[ 1: ] ]
+
+    dates  = []
+    values = []
+
+    for row in rows[ 1: ] :  # Skip the header
+        if not row.strip() :
+            continue
+
+        words = row.split( ',' )
+
+        dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
+
+        row_values = []
+        for word in words[ 1: ] :
+            word = word.strip().strip( '"' )
+
+            if word == 'NA' :
+                row_values.append( npNaN )
+            else :
+                row_values.append( float( word ) )
+
+        values.append( row_values )
+
+    arrays = { 'dates'  : nparray( dates, dtype = 'datetime64[s]' ),
+               'values' : nparray( values, dtype = float ) }
+
+    return arrays, { 'columns' : columns }
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ParseTideData( file_name ) :
+    '''Parse the hourly tide csv file_name : { seconds, levels }, {}
+
+    The csv file has 2 columns: 1 = Date-time, 2 = data value
+    Time, WL.(m).demeaned
+    1990-01-01 12:00 AM EST, -0.086
+    1990-01-01 1:00 AM EST, 0.166'''
+
+    fd   = open( file_name, 'r' )
+    rows = fd.readlines()
+    fd.close()
+
+    epoch   = datetime( 1970, 1, 1 )
+    seconds = []
+    levels  = []
+
+    for row in rows[ 1: ] :  # Skip the header
+        if not row.strip() :
+            continue
+
+        words = row.split( ',' )
+
+        # Strip trailing timezone abbreviation (e.g. "EDT", "EST") — %Z is
+        # unreliable on Windows; the tz offset is unused by the model anyway.
+        dt_str    = ' '.join( words[ 0 ].split()[:3] )
+        date_time = strptime( dt_str, '%Y-%m-%d %I:%M %p' )
+
+        seconds.append( ( date_time - epoch ).total_seconds() )
+        levels .append( float( words[ 1 ] ) )
+
+    arrays = { 'seconds' : nparray( seconds, dtype = float ),
+               'levels'  : nparray( levels,  dtype = float ) }
+
+    return arrays, dict()
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def CacheFileName( model, file_name ) :
+    '''Cache file name without extension in the forcingCache (-fc):
+    the file basename and a digest of the file path'''
+
+    digest = sha1( abspath( file_name ).encode() ).hexdigest()[ :12 ]
+
+    return path_join( model.args.path, model.args.forcingCache,
+                      basename( file_name ) + '.' + digest )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ReadCache( cache_file, source ) :
+    '''Return the cached arrays ( memory mapped ) and header if the
+    cache of source is current, else None'''
+
+    if not path_exists( cache_file + '.json' ) :
+        return None
+
+    try :
+        with open( cache_file + '.json', 'r' ) as fd :
+            header = load( fd )
+
+        if header.pop( 'source' ) != source :
+            return None
+
+        arrays = { name : npload( cache_file + '.' + name + '.npy',
+                                  mmap_mode = 'r' )
+                   for name in header.pop( 'arrays' ) }
+
+    except ( OSError, ValueError, KeyError ) :
+        return None
+
+    return arrays, header
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def WriteCache( cache_file, source, arrays, header ) :
+    '''Write the cache of source: a .npy file for each array and the
+    .json header. The .json is written last: it marks the cache as
+    complete. Files are written as temporaries and renamed so that
+    concurrent runs do not read a partial cache.'''
+
+    makedirs( dirname( abspath( cache_file ) ), exist_ok = True )
+
+    for name, array in arrays.items() :
+        npy_file = cache_file + '.' + name + '.npy'
+
+        with open( npy_file + '.tmp', 'wb' ) as fd :
+            npsave( fd, array )
+        replace( npy_file + '.tmp', npy_file )
+
+    header = dict( header, source = source, arrays = list( arrays ) )
+
+    with open( cache_file + '.json.tmp', 'w' ) as fd :
+        dump( header, fd )
+    replace( cache_file + '.json.tmp', cache_file + '.json' )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class Observations:
+    '''Observation data of the time window read on demand. InitTimeBasins
+    registers the init.py loader of each dataset when the time window
+    changes. Load( name ) runs the loader the first time the data of the
+    window are needed: gui.PlotGaugeStageData, PlotGaugeSalinityData,
+    SetInitialBasinSalinity. The loader reads the days missing from the
+    previous window, see init.MissingDays.'''
+
+    def __init__( self, model ):
+
+        self.model   = model
+        self.loaders = dict() # { name : ( Loader, data ) }
+        self.loaded  = dict() # { name : ( start_time, end_time ) }
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Register( self, name, Loader, data ) :
+        '''Loader( model ) reads the data dictionary of name for the
+        time window'''
+
+        self.loaders[ name ] = ( Loader, data )
+        self.loaded.pop( name, None )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Loaded( self, name ) :
+        '''Mark name as loaded for the time window, read as forcing data'''
+
+        self.loaded[ name ] = ( self.model.start_time, self.model.end_time )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Load( self, name ) :
+        '''Read the data of name for the time window if not loaded'''
+
+        model  = self.model
+        window = ( model.start_time, model.end_time )
+
+        if self.loaded.get( name ) == window :
+            return
+
+        if model.args.DEBUG :
+            print( '-> Observations.Load ', name, flush = True )
+
+        Loader, data = self.loaders[ name ]
+        Loader( model )
+
+        self.loaded[ name ] = window
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class DailyForcing:
+    '''Daily forcing arrays [ day, ... ] from the start_time day to the
+    day of the last ModelLoop timestep. NaN where there is no data.
+
+      rain         [ day, Basin.index ] rain (cm/day) : station rain *
+                                        scale summed over Basin.rain_stations
+      temperature  [ day ]              max temperature (C)
+      et           [ day ]              PET (mm/day)
+      runoff_stage [ day, k ]           EDEN stage (m) of runoff_basins[ k ]
+      salinity     [ day, Basin.index ] gauge salinity of salinity_basins
+      bc_flow      [ day, k ]           flow (m^3/s) of
+                                        flow_basins[ k ]
+      bc_head      [ day, k ]           stage (m) of head_basins[ k ]
+
+    An array is None if the data are not used. Only salinity may hold
+    NaN, for NA gauge values, see CheckMissing(). The rows of the
+    current day are held as lists by Update() : temperature_day,
+    et_day... and new_day is True on the first Update() of a day.
+
+    For the vectorized GetRain and GetET, basins are the Basin.index of
+    the non-boundary basins, Update() sets rain_m_day [ Basin.index ]
+    the rain (m/day) of the day and model.GetTemperature sets et_factor
+    [ Basin.index ] the ET amplification of the day.'''
+
+    def __init__( self, model ):
+
+        self.model = model
+
+        args     = model.args
+        capacity = model.basin_scratch.capacity
+
+        self.start_date = datetime( model.start_time.year,
+                                    model.start_time.month,
+                                    model.start_time.day )
+
+        last_time   = model.end_time + timedelta( seconds = model.timestep )
+        self.n_days = ( last_time - self.start_date ).days + 1
+
+        self.keys = [ ( date.year, date.month, date.day ) for date in
+                      [ self.start_date + timedelta( days = day )
+                        for day in range( self.n_days ) ] ]
+
+        Basins = [ Basin for Basin in model.Basins.values()
+                   if not Basin.boundary_basin ]
+
+        self.basins    = nparray( [ Basin.index for Basin in Basins ],
+                                  dtype = int )
+        self.et_factor = npfull( capacity, 1. )
+
+        # Rain : aggregate the scaled station rain to the basins
+        self.rain = None
+        if not args.noRain :
+            self.rain = npfull( ( self.n_days, capacity ), npNaN )
+
+            for day, key in enumerate( self.keys ) :
+                station_rain_map = model.rain_data.get( key )
+                if station_rain_map is None :
+                    continue
+
+                for Basin in Basins :
+                    rain_cm_day = 0
+
+                    for rain_station, scale in zip( Basin.rain_stations, 
+                                                    Basin.rain_scales ) :
+                        rain_cm_day += station_rain_map[ rain_station ] * scale
+
+                    self.rain[ day, Basin.index ] = rain_cm_day
+
+            for Basin in Basins :
+                self.CheckMissing( 'Rain', self.rain[ :, Basin.index ], Basin )
+
+        self.temperature = None
+        if not args.noET_Amplify :
+            self.temperature = self.DayArray( model.temperature_data )
+            self.CheckMissing( 'Temperature', self.temperature )
+
+        self.et = None
+        if not args.noET :
+            self.et = self.DayArray( model.et_data )
+            self.CheckMissing( 'ET', self.et )
+
+        # Runoff : EDEN station stage of the runoff basins
+        self.runoff_basins = list( model.runoff_stage_basins.keys() )
+        self.runoff_stage  = None
+        if not args.noStageRunoff :
+            self.runoff_stage = self.DayArray( model.runoff_stage_data,
+                list( model.runoff_stage_basins.values() ) )
+
+            for k, Basin in enumerate( self.runoff_basins ) :
+                self.CheckMissing( 'Runoff', self.runoff_stage[ :, k ], Basin )
+
+        # Salinity : gauge salinity of the boundary basins with a gauge
+        # and the basins with salinity_from_data
+        self.salinity_basins = [ Basin for Basin in model.Basins.values()
+            if Basin.salinity_station and 
+               ( Basin.boundary_basin or Basin.salinity_from_data ) ]
+        self.salinity = None
+        if model.salinity_data and ( args.gaugeSalinity or 
+                                     args.salinityInit.lower() == 'yes' ) :
+            self.salinity = npfull( ( self.n_days, capacity ), npNaN )
+
+            for day, key in enumerate( self.keys ) :
+                station_salinity_map = model.salinity_data.get( key )
+                if station_salinity_map is None :
+                    raise self.MissingError( 'Salinity', day )
+
+                for Basin in self.salinity_basins :
+                    self.salinity[ day, Basin.index ] = \
+                        station_salinity_map[ Basin.salinity_station ]
+
+        # Dynamic boundary conditions (-bc), flow in cfs converted to
+        # m^3/s, model.BoundaryConditions converts to m^3/timestep
+        self.flow_basins = list( model.dynamic_flow_boundary.keys() )
+        self.head_basins = list( model.dynamic_head_boundary.keys() )
+        self.bc_flow     = None
+        self.bc_head     = None
+        if not args.noDynamicBoundaryConditions :
+            if self.flow_basins :
+                self.bc_flow = npfull( ( self.n_days, len( self.flow_basins ) ),
+                                       npNaN )
+                for k, Basin in enumerate( self.flow_basins ) :
+                    self.bc_flow[ :, k ] = \
+                        self.DayArray( model.dynamic_flow_boundary[ Basin ] ) *\
+                        0.028317
+                    self.CheckMissing( 'BC flow ' + str( Basin.number ),
+                                       self.bc_flow[ :, k ], Basin )
+
+            if self.head_basins :
+                self.bc_head = npfull( ( self.n_days, len( self.head_basins ) ),
+                                       npNaN )
+                for k, Basin in enumerate( self.head_basins ) :
+                    self.bc_head[ :, k ] = \
+                        self.DayArray( model.dynamic_head_boundary[ Basin ] )
+                    self.CheckMissing( 'BC stage ' + str( Basin.number ),
+                                       self.bc_head[ :, k ], Basin )
+
+        self.day      = None  # day index of the current rows
+        self.day_time = None  # start time of the day
+        self.next_day = None  # start time of the next day
+        self.new_day  = False # True on the first Update() of a day
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def CheckMissing( self, name, values, Basin = None ) :
+        '''Raise a ValueError at the first day of values [ day ] of the
+        forcing store name (init.MissingDays) that is NaN : a day
+        missing from the file, or NA'''
+
+        missing = flatnonzero( isnan( values ) )
+
+        if len( missing ) :
+            raise self.MissingError( name, int( missing[ 0 ] ), Basin )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def MissingError( self, name, day, Basin = None ) :
+        '''ValueError naming the file of the forcing store name, the
+        Basin and the date of the day without data'''
+
+        # Files recorded by init.LoadedDays
+        sources = self.model.loaded_days.get( name, ( [], ) )[ 0 ]
+        files   = ', '.join( source[ 'file' ] for source in sources )
+
+        errMsg = 'DailyForcing: no ' + name + ' data in ' + files
+        if Basin is not None :
+            errMsg = errMsg + ' for basin ' + Basin.name
+        errMsg = errMsg + ' on ' +\
+                 str( ( self.start_date + timedelta( days = day ) ).date() ) +\
+                 '\n'
+
+        return ValueError( errMsg )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def DayArray( self, data, columns = None ) :
+        '''Array [ day ] of the { (year,month,day) : value } data, or
+        [ day, column ] of { (year,month,day) : { column : value } }'''
+
+        if columns is None :
+            return nparray( [ data.get( key, npNaN ) for key in self.keys ],
+                            dtype = float )
+
+        array = npfull( ( self.n_days, len( columns ) ), npNaN )
+
+        for day, key in enumerate( self.keys ) :
+            column_values = data.get( key )
+            if column_values is not None :
+                array[ day ] = [ column_values[ column ] for column in columns ]
+
+        return array
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Update( self, current_time ) :
+        '''Select the rows of the day of current_time'''
+
+        if self.day is not None and \
+           self.day_time <= current_time < self.next_day :
+            self.new_day = False
+            return
+
+        day = ( current_time - self.start_date ).days
+
+        if day < 0 or day >= self.n_days :
+            errMsg = 'DailyForcing: no daily forcing data at ' +\
+                     str( current_time ) + '\n'
+            raise Exception( errMsg )
+
+        self.day      = day
+        self.day_time = self.start_date + timedelta( days = day )
+        self.next_day = self.day_time   + timedelta( days = 1 )
+        self.new_day  = True
+
+        def Row( array ) :
+            return None if array is None else array[ day ].tolist()
+
+        self.rain_m_day       = None if self.rain is None else \
+                                self.rain[ day ] / 100
+        self.temperature_day  = Row( self.temperature )
+        self.et_day           = Row( self.et )
+        self.runoff_stage_day = Row( self.runoff_stage )
+        self.salinity_day     = Row( self.salinity )
+        self.bc_flow_day      = Row( self.bc_flow )
+        self.bc_head_day      = Row( self.bc_head )
@@ -0,0 +1,176 @@
+'''GIS geometry of the basins and shoals for the Bay Assessment Model (BAM)
+
+init.CreateBasinsFromShapefile and init.CreateShoals read the records
+and shapes of the basin polygons (-bn) and shoal lines (-s) shapefiles
+with ReadShapefile(). The records (area, perimeter, number, name of a
+basin, number of a shoal) build the model, the points of the shapes are
+only needed to draw the map.
+
+The shapefile is read with pyshp once, then cached in the forcingCache
+directory (-fc) as the forcing data (forcing.py): .npy arrays of the
+points and of a copy simplified for rendering to geometryTolerance (-gt)
+with the Douglas-Peucker algorithm, the records in the .json header.
+A later run reads the cache, memory mapped, as long as the .shp and
+.dbf files and -gt are unchanged. -nc disables the cache.
+
+With -ng the points are not loaded unless -gm: Basin.basin_xy and
+Shoal.line_xy are None. The GUI draws Basin.render_xy, Shoal.render_xy.'''
+
+# Python distribution modules
+from os.path import splitext
+from os.path import exists as path_exists
+
+# Community modules
+from numpy import array as nparray
+from numpy import zeros as npzeros
+from numpy import concatenate, cumsum, hypot
+
+# Local modules
+import forcing
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ReadShapefile( model, shape_file ) :
+    '''Return the records [ [ value ] ] of shape_file, the points
+    [ xy array ] of each shape and the points simplified for rendering.
+    The points are None if the geometry is not needed (-ng without -gm).'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> ReadShapefile ', shape_file, flush = True )
+
+    tolerance = model.args.geometryTolerance
+
+    base_name = splitext( shape_file )[ 0 ] if \
+                shape_file.lower().endswith( '.shp' ) else shape_file
+
+    if model.args.noForcingCache or \
+       not path_exists( base_name + '.shp' ) :
+        arrays, header = ParseShapefile( base_name, tolerance )
+
+    else :
+        # The cache is current for the .shp, .dbf files and -gt
+        source = { 'shp'       : forcing.CacheSource( base_name + '.shp' ),
+                   'dbf'       : forcing.CacheSource( base_name + '.dbf' ),
+                   'tolerance' : tolerance }
+
+        cache_file = forcing.CacheFileName( model, base_name + '.shp' )
+
+        data = forcing.ReadCache( cache_file, source )
+
+        if data is None :
+            data = ParseShapefile( base_name, tolerance )
+
+            try :
+                forcing.WriteCache( cache_file, source, *data )
+
+            except OSError as err :
+                if model.args.DEBUG :
+                    print( 'ReadShapefile: failed to write cache ',
+                           cache_file, ' : ', err )
+
+        arrays, header = data
+
+    records = header[ 'records' ]
+
+    if model.args.noGUI and not model.args.geometry :
+        return records, [ None ] * len( records ), [ None ] * len( records )
+
+    shapes = Split( arrays[ 'points' ], arrays[ 'offsets' ] )
+    render = Split( arrays[ 'render_points' ], arrays[ 'render_offsets' ] )
+
+    return records, shapes, render
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ParseShapefile( base_name, tolerance ) :
+    '''Read the shapefile base_name with pyshp: the points of all shapes
+    and their offsets, the simplified points and offsets, { records }'''
+
+    # Library for reading ArcGIS shapefile see:
+    # https://github.com/GeospatialPython/pyshp
+    import shapefile
+
+    sf = shapefile.Reader( base_name )
+
+    records = [ list( record ) for record in sf.records() ]
+    shapes  = [ nparray( shape.points, dtype = float ).reshape( -1, 2 )
+                for shape in sf.shapes() ]
+    render  = [ Simplify( xy, tolerance ) for xy in shapes ]
+
+    sf.close()
+
+    points,        offsets        = Join( shapes )
+    render_points, render_offsets = Join( render )
+
+    arrays = { 'points'        : points,
+               'offsets'       : offsets,
+               'render_points' : render_points,
+               'render_offsets': render_offsets }
+
+    return arrays, { 'records' : records }
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def Simplify( xy, tolerance ) :
+    '''Douglas-Peucker simplification of the line or polygon xy: the
+    points within tolerance (m) of the simplified line are removed.'''
+
+    if tolerance <= 0 or len( xy ) < 3 :
+        return xy
+
+    keep = npzeros( len( xy ), dtype = bool )
+    keep[ 0 ] = keep[ -1 ] = True
+
+    # Segments ( first, last ) to simplify
+    segments = [ ( 0, len( xy ) - 1 ) ]
+
+    while segments :
+        first, last = segments.pop()
+
+        if last - first < 2 :
+            continue
+
+        dx, dy = xy[ last ] - xy[ first ]
+        points = xy[ first + 1 : last ] - xy[ first ]
+        length = hypot( dx, dy )
+
+        # Distance to the segment line, to the point of a closed polygon
+        if length > 0 :
+            distance = abs( dx * points[ :, 1 ] - dy * points[ :, 0 ] ) / length
+        else :
+            distance = hypot( points[ :, 0 ], points[ :, 1 ] )
+
+        i = distance.argmax()
+
+        if distance[ i ] > tolerance :
+            k = first + 1 + i
+            keep[ k ] = True
+            segments.extend( [ ( first, k ), ( k, last ) ] )
+
+    return xy[ keep ]
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def Join( shapes ) :
+    '''Points of the shapes in one array, and the offsets of each shape'''
+
+    offsets = npzeros( len( shapes ) + 1, dtype = int )
+    offsets[ 1: ] = cumsum( [ len( xy ) for xy in shapes ] )
+
+    if not shapes :
+        return npzeros( ( 0, 2 ) ), offsets
+
+    return concatenate( shapes ), offsets
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def Split( points, offsets ) :
+    '''The shapes [ xy array ] of Join()'''
+
+    return [ points[ offsets[ i ] : offsets[ i + 1 ] ]
+             for i in range( len( offsets ) - 1 ) ]
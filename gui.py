@@ -5,6 +5,7 @@ from subprocess  import Popen
 from datetime    import timedelta, datetime
 from collections import OrderedDict as odict
 from os.path     import exists as path_exists
+from os.path     import join as path_join
 from random      import randint
 
 strptime = datetime.strptime
@@ -49,9 +50,9 @@ except ImportError:
 
 # Local modules 
 from init import InitTimeBasins
-from init import GetBasinSalinityData
-from init import GetBasinStageData
 from init import GetTimeIndex
+from console import IntVar
+import output
 import constants
 
 #---------------------------------------------------------------
@@ -82,6 +83,7 @@ class GUI:
         self.endTimeEntry       = None # simulation end time
 
         self.plotVar_IntVars    = odict() # { plotVariable : Tk.IntVar() }
+        self.run_map_variable   = None    # ( mapPlotVariable, legend_bounds )
 
         if not self.model.args.noGUI :
             # ttk.Style() requires a live Tk root — only create in GUI mode.
@@ -438,6 +440,83 @@ class GUI:
 
         self.model.run_info.append( msg )
 
+    #------------------------------------------------------------------
+    #
+    #------------------------------------------------------------------
+    def TimeUpdate ( self ) :
+        '''Update time on gui currentTimeLabel every model.timeLabelUpdate'''
+
+        if self.model.args.noGUI :
+            print( str( self.model.current_time ) )
+            return
+
+        self.current_time_label.set( str( self.model.current_time ) )
+
+        self.DrawModelCanvas()
+
+    #------------------------------------------------------------------
+    #
+    #------------------------------------------------------------------
+    def MapPlotVariable ( self ) :
+        '''Set appropriate legend and data type for basin.SetBasinMapColor
+        called in MapUpdate() for the simulation.'''
+
+        mapPlotVariable = self.mapPlotVariable.get()
+
+        legend_bounds = None
+
+        if mapPlotVariable not in constants.BasinMapPlotVariable :
+            msg='ModelLoop Error: Invalid map plot variable, using Stage.\n'
+            self.Message( msg )
+            mapPlotVariable = 'Stage'
+            legend_bounds   = self.model.args.stage_legend_bounds
+
+        if mapPlotVariable == 'Salinity' :
+            legend_bounds = self.model.args.salinity_legend_bounds
+
+        elif mapPlotVariable == 'Stage' : 
+            legend_bounds = self.model.args.stage_legend_bounds
+
+        else :
+            msg = 'ModelLoop Error: ', mapPlotVariable, \
+                  'not yet supported for map, showing Stage.\n'
+            self.Message( msg )
+            mapPlotVariable = 'Stage'
+            legend_bounds   = self.model.args.stage_legend_bounds
+
+        self.run_map_variable = ( mapPlotVariable, legend_bounds )
+
+    #------------------------------------------------------------------
+    #
+    #------------------------------------------------------------------
+    def MapUpdate ( self ) :
+        '''Display map update every model.timeMapUpdate interval or at 
+        simulation end'''
+
+        mapPlotVariable, legend_bounds = self.run_map_variable
+
+        for Basin in self.model.Basins.values() :
+            if not Basin.boundary_basin :
+                Basin.SetBasinMapColor( mapPlotVariable, legend_bounds )
+
+        self.current_time_label.set( str( self.model.current_time ) )
+        self.RenderBasins()
+
+        self.DrawModelCanvas()
+
+    #------------------------------------------------------------------
+    #
+    #------------------------------------------------------------------
+    def DrawModelCanvas ( self ) :
+        '''canvas.draw() from the model loop'''
+
+        if self.model.args.noThread :
+            self.canvas.draw() # safe to call from this thread
+        else :
+            # Cannot call canvas.draw() from separate thread!
+            # Signal event to mainloop thread to model.DrawCanvas()
+            self.model.CanvasDrawEvent.set()
+
     #------------------------------------------------------------------
     #
     #------------------------------------------------------------------
@@ -469,26 +548,17 @@ class GUI:
             if not self.model.args.noGUI :
                 self.plotVar_IntVars[ plotVariable ] = Tk.IntVar()
             else :
-                # Use the IntVar() class defined below
+                # Use the console.IntVar() surrogate
                 self.plotVar_IntVars[ plotVariable ] = IntVar()
 
-        # Set Salinity, Stage, Flow, Volume, Rain, ET as defaults
-        self.plotVar_IntVars[ 'Salinity'    ].set( 1 )
-        self.plotVar_IntVars[ 'Stage'       ].set( 1 )
-        self.plotVar_IntVars[ 'Flow'        ].set( 1 )
-        self.plotVar_IntVars[ 'Volume'      ].set( 1 )
-        self.plotVar_IntVars[ 'Rain'        ].set( 1 )
-        self.plotVar_IntVars[ 'Evaporation' ].set( 1 )
-        self.plotVar_IntVars[ 'Runoff'      ].set( 1 )
+        # Set Salinity, Stage, Flow, Volume, Rain, ET, Runoff as defaults
+        for plotVariable in constants.BasinRecordVariable :
+            self.plotVar_IntVars[ plotVariable ].set( 1 )
 
-        # Initialize the basin.plot_variables
-        for plotVariable, intVar in self.plotVar_IntVars.items() :
-
-            for basin in self.model.Basins.values() :
-                basin.plot_variables.clear()
-
-                if intVar.get() :
-                    basin.plot_variables[ plotVariable ] = []
+        # Initialize the model.record_variables and basin.plot_variables
+        self.model.SetRecordVariables( [ plotVariable for plotVariable, intVar
+                                         in self.plotVar_IntVars.items()
+                                         if intVar.get() ] )
 
     #-----------------------------------------------------------
     #
@@ -548,13 +618,9 @@ class GUI:
         msg ='*** All records erased, time reset to start time, basins reset.\n'
         self.Message( msg )
 
-        for plotVariable, intVar in self.plotVar_IntVars.items() :
-
-            for basin in self.model.Basins.values() :
-                basin.plot_variables.clear()
-
-                if intVar.get() :
-                    basin.plot_variables[ plotVariable ] = []
+        self.model.SetRecordVariables( [ plotVariable for plotVariable, intVar
+                                         in self.plotVar_IntVars.items()
+                                         if intVar.get() ] )
 
     #----------------------------------------------------------------
     # 
@@ -624,10 +690,50 @@ class GUI:
         # Get the plotVariable type from the plotOptionMenu
         plotVariable = self.plotVariable.get()
 
+        # An npz archive (-of npz) in plot_dir is read instead of csv
+        archive  = None
+        npz_file = path_join( self.plot_dir,
+                              output.NPZFileName( self.model.args.runID ) )
+
+        if path_exists( npz_file ) :
+            archive = output.ReadNPZ( npz_file )
+
+            if plotVariable not in archive[ 'variable' ].tolist() :
+                msg = "\nPlotArchiveData: " + plotVariable +\
+                      ' is not in ' + npz_file + '\n'
+                self.Message( msg )
+                return
+
+            all_times  = archive[ 'time' ]
+            data_col_i = archive[ 'variable' ].tolist().index( plotVariable )
+            basin_i    = { name : i for i, name in
+                           enumerate( archive[ 'basin_name' ].tolist() ) }
+
+            # Find index in dates for start_time & end_time
+            start_i, end_i = GetTimeIndex( plotVariable, all_times,
+                                           self.model.start_time, 
+                                           self.model.end_time )
+
         for Basin in BasinList :
 
             basinNames.append( Basin.name )
 
+            if archive is not None :
+                times = all_times[ start_i : end_i + 1 ]
+                data  = archive[ 'data' ][ start_i : end_i + 1,
+                                           basin_i[ Basin.name ],
+                                           data_col_i ].tolist()
+
+                # If data is all NA don't plot
+                if npall( isnan( data ) ) :
+                    msg = "\nPlotArchiveData: " + plotVariable +\
+                          ' for basin ' + Basin.name + ' does not exist.\n'
+                    self.Message( msg )
+                else :
+                    dataList.append( data )
+
+                continue
+
             # Read the basin .csv data to get [times] and [data]
             file_name = self.plot_dir + '/' + \
                         Basin.name + self.model.args.runID + '.csv'
@@ -721,8 +827,7 @@ class GUI:
         basin_names = [ Basin.name for Basin in BasinList ]
 
         # Read the salinity .csv gauge data to get [times] and [data]
-        if not self.model.salinity_data :
-            GetBasinSalinityData( self.model )
+        self.model.observations.Load( 'salinity' )
 
         # plotVariables are salinity stations IDs : 'MD', 'GB'...
         plotVariables = []
@@ -778,8 +883,7 @@ class GUI:
         basin_names = [ Basin.name for Basin in BasinList ]
 
         # Read the stage .csv gauge data to get [times] and [data]
-        if not self.model.stage_data :
-            GetBasinStageData( self.model )
+        self.model.observations.Load( 'stage' )
 
         # plotVariables are stations IDs : 'MD', 'GB'...
         # which are the same as the salinity_station
@@ -937,7 +1041,7 @@ class GUI:
             if Basin.boundary_basin :
                 continue
 
-            basin_xy = Basin.basin_xy
+            basin_xy = Basin.render_xy
 
             if basin_xy is None :
                 continue
@@ -971,7 +1075,7 @@ class GUI:
         ''' '''
 
         for Shoal in self.model.Shoals.values():
-            line_xy = Shoal.line_xy
+            line_xy = Shoal.render_xy
 
             if line_xy is None :
                 continue
@@ -1474,19 +1578,3 @@ class GUI:
             print( '   New time: ', str( time ), flush = True ) 
 
         return True
-
-#---------------------------------------------------------------
-# 
-#---------------------------------------------------------------
-class IntVar :
-      '''Surrogate for Tk.IntVar() when non-GUI option invoked.
-    Provides set() and get() methods.'''
-
-      def __init__( self, value = 0 ):
-          self.value = value
-
-      def set( self, value ) :
-          self.value = value
-
-      def get( self ) :
-          return self.value
@@ -120,6 +120,7 @@ def ShoalVelocities( model ) :
             #--------------------------------------------------------
             # Iteration to estimate velocity and hydraulic.radius
             iteration_exceeded = True
+            i = 0 # iterations, none with -it 1
 
             for i in range( 1, model.max_iteration ) :
 
@@ -141,6 +142,11 @@ def ShoalVelocities( model ) :
                 model.gui.Message( msg )
                 Shoal.velocity[ depth_ft ] = 0  # Prevent overflow cascade from unconverged velocity
 
+            # Iteration count (-pf)
+            if model.profile.enabled :
+                model.profile.Iterations( [ i ], [ shoal_number ] if
+                                          iteration_exceeded else [] )
+
             # Physical velocity cap: Florida Bay currents never exceed ~5 m/s.
             # Guards against exponential volume runaway when level differences
             # grow large due to numerical overshoot.
@@ -309,9 +315,9 @@ def MassTransport( model ) :
         # Shallow banks can have no volume at low stage
         # Limit the volume to a lower bound
         if Basin_A.water_volume < 0 :
-            Basin_A.water_volume = 0
+            Basin_A.water_volume = 0.
         if Basin_B.water_volume < 0 :
-            Basin_B.water_volume = 0
+            Basin_B.water_volume = 0.
         if Basin_A.water_volume == 0 or Basin_B.water_volume == 0 :
             continue  # don't transfer salt
 
@@ -335,12 +341,12 @@ def MassTransport( model ) :
             Basin_B.salt_mass += delta_salt_mass
 
         if Basin_A.salt_mass < 0 :
-            Basin_A.salt_mass = 0
+            Basin_A.salt_mass = 0.
         if Basin_B.salt_mass < 0 :
-            Basin_B.salt_mass = 0
+            Basin_B.salt_mass = 0.
 
     #----------------------------------------------------------------
-    # Sum basin flow and compute salinity
+    # Sum basin flow
     #----------------------------------------------------------------
     for Basin in model.Basins.values() :
 
@@ -357,6 +363,21 @@ def MassTransport( model ) :
             else :
                 raise Exception( 'Invalid Basin in Shoal' )
 
+    BasinSalinity( model )
+    StageRunoff  ( model )
+
+#---------------------------------------------------------------
+# 
+#---------------------------------------------------------------
+def BasinSalinity( model ) :
+    '''Compute basin salinity from the salt mass and volume after
+    MassTransport.'''
+
+    for Basin in model.Basins.values() :
+
+        if Basin.boundary_basin :
+            continue
+
         # Salinity adjustment o/oo = g/kg = g / ( m^3 * (kg/m^3) )
         if not Basin.salinity_from_data and Basin.water_volume :
             new_salinity = Basin.salt_mass / ( Basin.water_volume * 997 )
@@ -386,10 +407,13 @@ def MassTransport( model ) :
             else :
                 Basin.salinity = new_salinity
 
-    #----------------------------------------------------------------
-    # If EDEN stage is used to drive EVER runoff, sum the shoal transport
-    # for reporting the total runoff in output data. 
-    #----------------------------------------------------------------
+#---------------------------------------------------------------
+# 
+#---------------------------------------------------------------
+def StageRunoff( model ) :
+    '''If EDEN stage is used to drive EVER runoff, sum the shoal transport
+    for reporting the total runoff in output data.'''
+
     if not model.args.noStageRunoff :
 
         for Basin, Shoals in model.runoff_stage_shoals.items() :
@@ -403,61 +427,76 @@ def MassTransport( model ) :
                     Basin.runoff_EVER -= Shoal.volume_A_B
                 else :
                     raise Exception( 'Invalid Basin in Shoal (Runoff)' )
-            
+
 #---------------------------------------------------------------
 # 
 #---------------------------------------------------------------
 def Depths( model ) :
-    '''Update basin depths from volume changes.'''
+    '''Update basin depths from volume changes.
 
-    for Basin in model.Basins.values() :
+    Evaluated over all basins with the model.hypsometry lookup tables.
+    The water level change is dV/A at the area of the current level
+    (-vs linear), or the exact inversion of the hypsometric volume
+    (-vs exact) which follows the area change over depth bins.
+    The Basin variables are gathered into model.basin_scratch and
+    scattered back to the Basins.'''
 
-        if not Basin.area :  # Boundary basins or stale-zero from a prior clamp
-            if Basin.wet_area :
-                # Non-boundary basin with stale area=0: reset water_level to
-                # floor and recompute area so the normal path runs next timestep.
-                # Do NOT zero water_volume — MassTransport's own zero-clamp
-                # (lines 311-314) is authoritative for volume; overriding a
-                # positive volume here would cause MassTransport's salt-skip
-                # guard to fire and break salt conservation.
-                min_depth_ft      = min( Basin.wet_area.keys() )
-                Basin.water_level = -( min_depth_ft * 0.3048 )
-                Basin.Area()       # now returns positive area at floor
-            Basin.previous_volume = Basin.water_volume
-            continue
+    basins      = model.basin_scratch
+    hyps        = model.hypsometry
+    wet         = hyps.wet         # Basins with wet_area depth bins
+    floor_level = hyps.floor_level # (m) -min( Basin.wet_area.keys() )
 
-        Basin.Area() # Update area at current water levels
+    basins.Gather( [ 'area', 'water_level', 'water_volume',
+                     'previous_volume' ] )
 
-        if not Basin.area :  # Water level dropped below all depth bins
-            if Basin.wet_area :
-                # Clamp water_level to floor; do NOT zero water_volume (see above).
-                min_depth_ft      = min( Basin.wet_area.keys() )
-                Basin.water_level = -( min_depth_ft * 0.3048 )
-                Basin.Area()
-            Basin.previous_volume = Basin.water_volume
-            continue
+    # Boundary basins or stale-zero from a prior clamp
+    stale = basins.area == 0
 
-        volume_difference = Basin.water_volume - Basin.previous_volume
-
-        h_difference = volume_difference / Basin.area
-
-        Basin.water_level += h_difference
-
-        # Clamp water_level to the bathymetric floor.
-        # The h_diff = dV/A formula is a first-order area approximation; for
-        # large volume changes it can overshoot below the bathymetric floor.
-        # Correct the geometry (water_level) but do NOT zero water_volume —
-        # if MassTransport left a positive volume, zeroing it here would
-        # trigger MassTransport's salt-skip guard next timestep and cause
-        # progressive salinity loss over multi-year runs.
-        # The minor volume/level inconsistency at floor self-corrects within
-        # a few timesteps via tidal inflow.
-        if Basin.wet_area :
-            min_depth_ft = min( Basin.wet_area.keys() )
-            floor_level  = -( min_depth_ft * 0.3048 )
-            if Basin.water_level < floor_level :
-                Basin.water_level = floor_level
-                Basin.Area()       # update area at floor_level for next timestep
-
-        # Update previous_volume for next iteration
-        Basin.previous_volume = Basin.water_volume
+    # Non-boundary basin with stale area=0: reset water_level to floor
+    # and recompute area so the normal path runs next timestep.
+    # Do NOT zero water_volume — MassTransport's own zero-clamp is
+    # authoritative for volume; overriding a positive volume here would
+    # cause MassTransport's salt-skip guard to fire and break salt
+    # conservation.
+    reset = stale & wet
+
+    # Update area at current water levels
+    area = hyps.Area( basins.water_level )
+
+    # Water level dropped below all depth bins: clamp water_level to
+    # floor; do NOT zero water_volume (see above).
+    reset |= ~stale & ( area == 0 ) & wet
+
+    update = ~stale & ( area != 0 )
+
+    basins.area[ ~stale ] = area[ ~stale ]
+
+    volume_difference = basins.water_volume - basins.previous_volume
+
+    if model.args.volumeStage == 'exact' :
+        volume = hyps.Volume( basins.water_level ) + volume_difference
+        basins.water_level[ update ] = hyps.Stage( volume )[ update ]
+    else :
+        basins.water_level[ update ] += volume_difference[ update ] / \
+                                        area[ update ]
+
+    # Clamp water_level to the bathymetric floor.
+    # The h_diff = dV/A formula is a first-order area approximation; for
+    # large volume changes it can overshoot below the bathymetric floor.
+    # Correct the geometry (water_level) but do NOT zero water_volume —
+    # if MassTransport left a positive volume, zeroing it here would
+    # trigger MassTransport's salt-skip guard next timestep and cause
+    # progressive salinity loss over multi-year runs.
+    # The minor volume/level inconsistency at floor self-corrects within
+    # a few timesteps via tidal inflow.
+    reset |= update & wet & ( basins.water_level < floor_level )
+
+    # Update area at floor_level for next timestep
+    basins.water_level[ reset ] = floor_level[ reset ]
+    basins.area       [ reset ] = hyps.Area( floor_level )[ reset ]
+
+    # Update previous_volume for next iteration
+    basins.previous_volume[:] = basins.water_volume
+
+    # The rows not updated hold the values gathered
+    basins.Scatter( [ 'water_level', 'area', 'previous_volume' ] )
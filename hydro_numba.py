@@ -0,0 +1,208 @@
+'''Compiled shoal velocity solver for the Bay Assessment Model (BAM)
+
+Numba kernel of hydro.ShoalVelocities over the (shoal, depth) pairs of
+hydro_vector.ShoalArrays, selected with the shoalSolver option
+(-ss numba). Each pair runs the sequence of the scalar solver in one
+compiled loop: an initial VelocityHydraulicRadius on the first call,
+the friction_factor update from the previous hydraulic_radius, the
+velocity iteration to velocity_tol (-vt) and the 5 (m/s) velocity cap.
+The arithmetic is that of hydro.py operation by operation, and R^(-4/3)
+uses the C library pow() as the Python float power does, so the basin
+outputs are identical to those of -ss python and -ss numpy.
+
+Numba is optional: if it is not installed -ss numba runs the NumPy
+solver hydro_vector.ShoalVelocities. Numba is imported and the kernel
+compiled on the first call, cached in __pycache__ for later runs : the
+other solvers do not import numba.'''
+
+# Python distribution modules
+from math import sqrt, pow, copysign, isfinite
+
+# Community modules
+from numpy import zeros as npzeros
+
+# Local modules
+import constants
+import hydro_vector
+
+# Message that -ss numba runs -ss numpy is shown once
+fallback_message = True
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ShoalVelocities( model ) :
+    '''Compiled version of hydro.ShoalVelocities. See notes there and
+    in hydro_vector.ShoalVelocities.'''
+
+    global fallback_message
+
+    if not Compile() :
+        if fallback_message :
+            model.gui.Message( 'ShoalVelocities: numba is not installed, '
+                               'using the numpy solver (-ss numpy).\n' )
+            fallback_message = False
+
+        hydro_vector.ShoalVelocities( model )
+        return
+
+    if model.args.DEBUG_ALL :
+        print( '-> ShoalVelocities (numba)' )
+
+    sa = model.shoal_arrays
+
+    if not sa.n_pairs :
+        return
+
+    if sa.shared :
+        sa.Gather()
+
+    hydro_vector.ShoalBasinLevels( model, sa )
+
+    wet     = sa.flow_sign != 0
+    initial = wet & ~sa.initial_velocity
+
+    iterations = npzeros( sa.n_pairs, dtype = int )
+
+    exceeded = Velocities( sa.h_upstream, sa.h_downstream, sa.velocity,
+                           sa.hydraulic_radius, sa.friction_factor,
+                           sa.flow_sign, sa.manning_squared, sa.width,
+                           wet, initial, constants.g,
+                           model.max_iteration, model.velocity_tol,
+                           iterations )
+
+    for k in exceeded.nonzero()[ 0 ] :
+        msg = '\n*** Mannings: iterations exceeded for shoal ' +\
+              str( sa.shoal_list[ k ] ) + ' at depth ' +\
+              str( sa.depth_list[ k ] ) + '\n'
+        model.gui.Message( msg )
+
+    # Iteration counts (-pf)
+    if model.profile.enabled :
+        model.profile.Iterations( iterations[ wet ].tolist(),
+                                  [ sa.shoal_list[ k ] for k in
+                                    exceeded.nonzero()[ 0 ] ] )
+
+    # Set flag that these shoals have been initialized, store the solution
+    sa.initial_velocity[:] = True
+
+    if sa.shared :
+        sa.Scatter()
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def VelocitiesKernel( h_upstream, h_downstream, velocity, hydraulic_radius,
+                      friction_factor, flow_sign, manning_squared, width,
+                      wet, initial, g, max_iteration, velocity_tol,
+                      iterations ) :
+    '''Solve the velocity and hydraulic radius of the wet pairs in
+    place, with the iteration count of each pair in iterations. Return
+    a boolean array of the pairs that did not converge.'''
+
+    n_pairs  = len( velocity )
+    exceeded = npzeros( n_pairs, dtype = wet.dtype )
+
+    for k in range( n_pairs ) :
+
+        if not wet[ k ] :
+            continue
+
+        # Initial estimate of velocity and hydraulic radius
+        if initial[ k ] :
+            VelocityHydraulicRadius( k, h_upstream, h_downstream, velocity,
+                                     hydraulic_radius, friction_factor,
+                                     flow_sign, g )
+
+        previous_velocity = velocity[ k ]
+
+        # Update friction_factor for next iteration or timestep
+        if hydraulic_radius[ k ] > 0 :
+            friction_factor[ k ] = 2 * g * manning_squared[ k ] * width[ k ] *\
+                                   pow( hydraulic_radius[ k ], -4/3 )
+        else :
+            friction_factor[ k ] = 1E9
+
+        # Iteration to estimate velocity and hydraulic.radius
+        exceeded[ k ] = True
+
+        for i in range( 1, max_iteration ) :
+
+            iterations[ k ] = i
+
+            VelocityHydraulicRadius( k, h_upstream, h_downstream, velocity,
+                                     hydraulic_radius, friction_factor,
+                                     flow_sign, g )
+
+            delta_velocity = previous_velocity - velocity[ k ]
+
+            if abs( delta_velocity ) <= velocity_tol :
+                exceeded[ k ] = False
+                break
+
+            previous_velocity = velocity[ k ]
+
+        # Prevent overflow cascade from unconverged velocity
+        if exceeded[ k ] :
+            velocity[ k ] = 0
+
+        # Physical velocity cap, see hydro.ShoalVelocities
+        if not isfinite( velocity[ k ] ) :
+            velocity[ k ] = 0.
+        elif abs( velocity[ k ] ) > 5.0 :
+            velocity[ k ] = copysign( 5.0, velocity[ k ] )
+
+    return exceeded
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def VelocityHydraulicRadiusKernel( k, h_upstream, h_downstream, velocity,
+                                   hydraulic_radius, friction_factor,
+                                   flow_sign, g ) :
+    '''hydro.VelocityHydraulicRadius for pair k'''
+
+    h_critical = ( 2 * h_upstream[ k ] ) / ( 3 + friction_factor[ k ] )
+
+    if h_downstream[ k ] < h_critical :
+        h_downstream[ k ] = h_critical
+
+    level_difference = h_upstream[ k ] - h_downstream[ k ]
+
+    # Velocity head
+    h_velocity = level_difference / ( 1 + friction_factor[ k ] )
+
+    # sqrt[ (m/s^2) * (m) ] = (m/s)
+    velocity[ k ] = flow_sign[ k ] * sqrt( 2 * g * h_velocity )
+
+    # Average depth approximation of the hydraulic radius
+    hydraulic_radius[ k ] = max( 0., ( h_upstream[ k ] - h_velocity +
+                                       h_downstream[ k ] ) ) / 2
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def Compile() :
+    '''Compile the kernels on the first call if numba is installed.
+    Return True if the kernels are compiled.'''
+
+    global Velocities, VelocityHydraulicRadius, compiled
+
+    if not compiled :
+        compiled = True
+
+        try :
+            from numba import njit
+        except ImportError :
+            return False
+
+        VelocityHydraulicRadius = njit( cache = True )( 
+                                      VelocityHydraulicRadiusKernel )
+        Velocities              = njit( cache = True )( VelocitiesKernel )
+
+    return Velocities is not None
+
+# Compiled kernels, see Compile()
+Velocities              = None
+VelocityHydraulicRadius = None
+compiled                = False
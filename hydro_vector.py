@@ -0,0 +1,437 @@
+'''Vectorized hydraulic functions for the Bay Assessment Model (BAM)
+
+NumPy implementations of the shoal solvers in hydro.py, selected with
+the shoalSolver option (-ss numpy), and of the shoal mass transport,
+selected with the massTransport option (-mt sparse). All (shoal, depth)
+pairs that hydro.ShoalVelocities would process are packed into
+contiguous arrays and solved together with masked array operations.
+
+The equations, the order of operations and the iteration/convergence
+logic of hydro.ShoalVelocities are reproduced element by element, so the
+results match the scalar (-ss python) solver to within 1E-12 (m/s) per
+timestep, far below the velocity_tol (-vt) convergence tolerance. With
+the C library pow() used for the friction factor the two solvers give
+identical basin outputs.'''
+
+# Python distribution modules
+from itertools import repeat
+
+# Community modules
+from numpy import array as nparray
+from numpy import zeros as npzeros
+from numpy import abs as npabs
+from numpy import where, sqrt, maximum, isfinite, copysign
+from numpy import flatnonzero, bincount, sign
+
+# Local modules
+import constants
+import hydro
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class ShoalArrays:
+    '''Flat arrays over each (shoal, depth) pair with a wet_length of
+    at least 1 (m) on shoals that are not no_flow. Element k of each
+    array corresponds to Shoal_list[ k ] at depth depth_list[ k ], and
+    to position pair_shoal[ k ] in the model.network shoal arrays.
+
+    The static arrays (depth, width, Manning, basin indices) are built
+    once at Model init. The dynamic arrays (velocity, hydraulic_radius,
+    friction_factor, h_upstream, h_downstream, cross_section, Q) hold
+    the solution between timesteps. If a scalar hydro.py solver also
+    runs (-ss python or -mt python) the Shoal dictionaries are shared:
+    the solvers Gather() the pair values from the Shoals at each
+    timestep and Scatter() their solution back. Otherwise the Shoals
+    are updated by Scatter() for Shoal.Print, checkpoints and at the
+    end of ModelLoop. Basin water levels are gathered into
+    model.basin_scratch.'''
+
+    # Dynamic arrays : Shoal dictionaries { depth(ft) : value }
+    variables = [ 'velocity', 'hydraulic_radius', 'friction_factor',
+                  'h_upstream', 'h_downstream', 'cross_section', 'Q' ]
+
+    def __init__( self, model ):
+
+        self.model = model
+
+        args = model.args
+
+        # The Shoal dictionaries are read or changed by a scalar solver
+        self.shared = args.shoalSolver == 'python' or \
+                      ( args.massTransport == 'python' and
+                        args.stageSolver   != 'implicit' )
+
+        self.Shoal_list  = [] # Shoal object of each pair
+        self.shoal_list  = [] # Shoal number of each pair
+        self.depth_list  = [] # depth(ft) of each pair : keys in Shoal dicts
+
+        pair_shoal       = [] # model.network shoal position of each pair
+        basin_A          = [] # Basin_A.index of each pair
+        basin_B          = [] # Basin_B.index of each pair
+        manning          = []
+        width            = []
+        wet_length       = []
+
+        network = model.network
+
+        for j, Shoal in enumerate( network.Shoals ) :
+
+            for depth_ft, length in Shoal.wet_length.items() :
+
+                if length < 1 :
+                    continue
+
+                self.Shoal_list.append( Shoal )
+                self.shoal_list.append( network.numbers[ j ] )
+                self.depth_list.append( depth_ft )
+
+                pair_shoal.append( j )
+                basin_A   .append( Shoal.Basin_A.index )
+                basin_B   .append( Shoal.Basin_B.index )
+                manning   .append( Shoal.manning_coefficient )
+                width     .append( Shoal.width )
+                wet_length.append( length )
+
+        self.n_pairs = len( self.Shoal_list )
+
+        # Static arrays
+        self.pair_shoal      = nparray( pair_shoal, dtype = int )
+        self.basin_A         = nparray( basin_A,    dtype = int )
+        self.basin_B         = nparray( basin_B,    dtype = int )
+        self.depth           = nparray( self.depth_list, dtype = float )*0.3048
+        self.manning_squared = nparray( [ pow( n, 2 ) for n in manning ],
+                                        dtype = float )
+        self.width           = nparray( width,      dtype = float )
+        self.wet_length      = nparray( wet_length, dtype = float )
+
+        # Index of the last pair of each network shoal, -1 if no pairs.
+        # The scalar MassTransport takes the shoal flow_sign from it.
+        self.last_pair = npzeros( network.n_shoals, dtype = int ) - 1
+        for k, j in enumerate( pair_shoal ) :
+            self.last_pair[ j ] = k
+
+        # Dynamic arrays
+        self.flow_sign = npzeros( self.n_pairs )
+        self.Gather()
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Gather( self ) :
+        '''Copy the pair values and initial_velocity from the Shoals,
+        0 where a depth is not yet a key of the Shoal dictionary'''
+
+        pairs = list( zip( self.Shoal_list, self.depth_list ) )
+
+        for variable in self.variables :
+            setattr( self, variable, nparray(
+                [ getattr( Shoal, variable ).get( depth_ft, 0. )
+                  for Shoal, depth_ft in pairs ], dtype = float ) )
+
+        self.initial_velocity = nparray( [ Shoal.initial_velocity for
+                                           Shoal in self.Shoal_list ],
+                                         dtype = bool )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Scatter( self ) :
+        '''Copy the pair values and initial_velocity into the Shoals'''
+
+        pairs = list( zip( self.Shoal_list, self.depth_list ) )
+
+        for variable in self.variables :
+            for ( Shoal, depth_ft ), value in \
+                zip( pairs, getattr( self, variable ).tolist() ) :
+                getattr( Shoal, variable )[ depth_ft ] = value
+
+        for Shoal, initial in zip( self.Shoal_list,
+                                   self.initial_velocity.tolist() ) :
+            Shoal.initial_velocity = initial
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ShoalVelocities( model ) :
+    '''Array version of hydro.ShoalVelocities. See notes there.
+
+    Each pair is solved with the same sequence as the scalar solver:
+    ShoalBasinLevels, an initial VelocityHydraulicRadius on the first
+    call, the friction_factor update from the previous hydraulic_radius,
+    then the velocity iteration. The iteration runs on the subset of
+    pairs that have not converged: a pair leaves the active mask once
+    its velocity changes by no more than model.velocity_tol.'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> ShoalVelocities (numpy)' )
+
+    sa = model.shoal_arrays
+
+    if not sa.n_pairs :
+        return
+
+    if sa.shared :
+        sa.Gather()
+
+    ShoalBasinLevels( model, sa )
+
+    wet = sa.flow_sign != 0
+
+    # Initial estimate of velocity and hydraulic radius on first call
+    initial = wet & ~sa.initial_velocity
+    if initial.any() :
+        VelocityHydraulicRadius( sa, flatnonzero( initial ) )
+
+    previous_velocity = sa.velocity.copy()
+
+    # Update friction_factor for next iteration or timestep
+    # R^(-4/3) uses the C library pow() of the scalar solver: the SIMD
+    # numpy power can differ in the last bit, and shallow basins amplify
+    # such round-off over a long run.
+    i_wet    = flatnonzero( wet )
+    i_radius = i_wet[ sa.hydraulic_radius[ i_wet ] > 0 ]
+
+    radius_pow = nparray( list( map( pow,
+                                     sa.hydraulic_radius[ i_radius ].tolist(),
+                                     repeat( -4/3 ) ) ), dtype = float )
+
+    sa.friction_factor[ i_wet    ] = 1E9
+    sa.friction_factor[ i_radius ] = 2 * constants.g * \
+                                     sa.manning_squared[ i_radius ] * \
+                                     sa.width[ i_radius ] * radius_pow
+
+    #--------------------------------------------------------
+    # Iteration to estimate velocity and hydraulic.radius
+    active     = i_wet
+    iterations = npzeros( sa.n_pairs, dtype = int )
+
+    for i in range( 1, model.max_iteration ) :
+
+        if not len( active ) :
+            break
+
+        iterations[ active ] = i
+
+        VelocityHydraulicRadius( sa, active )
+
+        velocity       = sa.velocity[ active ]
+        delta_velocity = previous_velocity[ active ] - velocity
+
+        previous_velocity[ active ] = velocity
+
+        active = active[ npabs( delta_velocity ) > model.velocity_tol ]
+
+    for k in active :
+        msg = '\n*** Mannings: iterations exceeded for shoal ' +\
+              str( sa.shoal_list[ k ] ) + ' at depth ' +\
+              str( sa.depth_list[ k ] ) + '\n'
+        model.gui.Message( msg )
+
+    # Iteration counts (-pf)
+    if model.profile.enabled :
+        model.profile.Iterations( iterations[ i_wet ].tolist(),
+                                  [ sa.shoal_list[ k ] for k in active ] )
+
+    # Prevent overflow cascade from unconverged velocity
+    sa.velocity[ active ] = 0
+
+    # Physical velocity cap: Florida Bay currents never exceed ~5 m/s.
+    # See hydro.ShoalVelocities
+    velocity = sa.velocity
+    sa.velocity = where( isfinite( velocity ),
+                         where( npabs( velocity ) > 5.0,
+                                copysign( 5.0, velocity ), velocity ), 0.0 )
+
+    # Set flag that these shoals have been initialized, store the solution
+    sa.initial_velocity[:] = True
+
+    if sa.shared :
+        sa.Scatter()
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ShoalBasinLevels( model, sa ) :
+    '''Array version of hydro.ShoalBasinLevels over all pairs.
+    Sets h_upstream, h_downstream and flow_sign :
+    -1 = Flow B -> A, 1 = Flow A -> B, 0 = No flow'''
+
+    model.basin_scratch.Gather( [ 'water_level' ] )
+
+    water_level = model.basin_scratch.water_level
+
+    h_Basin_A = water_level[ sa.basin_A ] + sa.depth
+    h_Basin_B = water_level[ sa.basin_B ] + sa.depth
+
+    # If water level is below shoal: no flow
+    dry     = ( h_Basin_A < 0 ) & ( h_Basin_B < 0 )
+    A_to_B  = ~dry & ( h_Basin_A > h_Basin_B )
+    A_upper = dry | A_to_B
+
+    sa.h_upstream   = where( A_upper, h_Basin_A, h_Basin_B )
+    sa.h_downstream = where( A_upper, h_Basin_B, h_Basin_A )
+    sa.flow_sign    = where( dry, 0., where( A_to_B, 1., -1. ) )
+
+    sa.friction_factor [ dry ] = 1E9
+    sa.velocity        [ dry ] = 0
+    sa.hydraulic_radius[ dry ] = 0
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def VelocityHydraulicRadius( sa, k ) :
+    '''Array version of hydro.VelocityHydraulicRadius for pairs k.'''
+
+    h_upstream      = sa.h_upstream     [ k ]
+    h_downstream    = sa.h_downstream   [ k ]
+    friction_factor = sa.friction_factor[ k ]
+
+    h_critical = ( 2 * h_upstream ) / ( 3 + friction_factor )
+
+    h_downstream        = where( h_downstream < h_critical,
+                                 h_critical, h_downstream )
+    sa.h_downstream[ k ] = h_downstream
+
+    level_difference = h_upstream - h_downstream
+
+    # Velocity head
+    h_velocity = level_difference / ( 1 + friction_factor )
+
+    # sqrt[ (m/s^2) * (m) ] = (m/s)
+    sa.velocity[ k ] = sa.flow_sign[ k ] * sqrt( 2 * constants.g * h_velocity )
+
+    # Average depth approximation of the hydraulic radius
+    sa.hydraulic_radius[ k ] = \
+        maximum( 0, ( h_upstream - h_velocity + h_downstream ) ) / 2
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def MassTransport( model ) :
+    '''Sparse version of hydro.MassTransport, selected with the
+    massTransport option (-mt sparse). See notes there.
+
+    The shoal flows are computed over all (shoal, depth) pairs, summed
+    per shoal, and the volume and salt transfers of all shoals are
+    accumulated into the basins with one incidence matrix product each
+    (model.network). The salt source is the upstream basin of each
+    shoal from the flow_sign of its last pair, as in the scalar code.
+
+    The scalar code updates the basins shoal by shoal and clamps a
+    negative volume or salt mass to 0 after each shoal. Here the clamps
+    are applied once to the net transfer, and salt is not transferred
+    across a shoal if either basin has no volume after the net volume
+    transfer. Where no clamp is active the results differ from the
+    scalar code only by the round-off of the summation order.
+
+    With the stageSolver option (-hs implicit) the shoal flows are the
+    semi-implicit flows of network.ImplicitFlow().'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> MassTransport (sparse)' )
+
+    sa      = model.shoal_arrays
+    network = model.network
+    basins  = model.basin_scratch
+
+    basins.Gather( [ 'area', 'water_volume', 'previous_volume',
+                     'salt_mass', 'salinity', 'shoal_transport' ] )
+
+    #--------------------------------------------------------------------
+    # Flow over each shoal depth
+    #--------------------------------------------------------------------
+    # This updates flow_sign, h_upstream, h_downstream of all pairs
+    if sa.shared :
+        sa.Gather()
+
+    ShoalBasinLevels( model, sa )
+
+    wet = sa.flow_sign != 0
+
+    # Cross section from the downstream depth, or the hydraulic radius
+    # if the downstream level is below the shoal
+    h_flow        = where( sa.h_downstream > 0,
+                           sa.h_downstream, sa.hydraulic_radius )
+    cross_section = where( wet, h_flow * sa.wet_length, 0. )
+
+    if ( cross_section < 0 ).any() :
+        raise ValueError ( 'Negative Shoal.cross_section' )
+
+    # Q(m^3/s) = v(m/s) * A(m^2)
+    Q = where( wet, sa.velocity * cross_section, 0. )
+
+    sa.cross_section = cross_section
+    sa.Q             = Q
+
+    if sa.shared :
+        sa.Scatter()
+
+    # Sum flow across each shoal (m^3/s)
+    Q_total             = bincount( sa.pair_shoal, weights = Q,
+                                    minlength = network.n_shoals )
+    cross_section_total = bincount( sa.pair_shoal, weights = cross_section,
+                                    minlength = network.n_shoals )
+
+    # Semi-implicit flow of the timestep (-hs implicit)
+    if model.args.stageSolver == 'implicit' :
+        Q_total = network.ImplicitFlow( Q_total, model.timestep )
+
+    # Transfer volumes across shoals into basins
+    # The sign of Q handles the transfer direction
+    delta_volume = Q_total * model.timestep # (m^3/timestep)
+
+    for Shoal, flow, area, volume in zip( network.Shoals, Q_total.tolist(),
+                                          cross_section_total.tolist(),
+                                          delta_volume.tolist() ) :
+        Shoal.Q_total             = flow
+        Shoal.cross_section_total = area
+        Shoal.volume_A_B          =  volume
+        Shoal.volume_B_A          = -volume
+
+    basin_delta_volume = network.Accumulate( delta_volume )
+
+    basins.water_volume += basin_delta_volume
+
+    # Shallow banks can have no volume at low stage
+    # Limit the volume to a lower bound
+    basins.water_volume[ basins.water_volume < 0 ] = 0
+
+    #--------------------------------------------------------------------
+    # Transfer salt from the upstream basin
+    #--------------------------------------------------------------------
+    # Shoal flow_sign is that of the last pair on the shoal, or of the
+    # semi-implicit flow which can reverse the explicit flow
+    if model.args.stageSolver == 'implicit' :
+        flow_sign = sign( Q_total )
+    else :
+        flow_sign = where( sa.last_pair < 0, 0.,
+                           sa.flow_sign[ sa.last_pair ] )
+
+    source_salinity = network.Upwind( flow_sign, basins.salinity )
+
+    # Don't transfer salt if either basin has no volume
+    transfer = ( basins.water_volume[ network.basin_A ] > 0 ) & \
+               ( basins.water_volume[ network.basin_B ] > 0 )
+
+    # delta salt_mass = salinity (g/kg) * Vol (m^3) * rho (kg/m^3)
+    # Water at 25 C rho = 997 kg/m^3
+    delta_salt_mass = where( transfer,
+                             source_salinity * delta_volume * 997, 0. )
+
+    basins.salt_mass += network.Accumulate( delta_salt_mass )
+
+    basins.salt_mass[ basins.salt_mass < 0 ] = 0
+
+    #----------------------------------------------------------------
+    # Sum basin flow and compute salinity
+    #----------------------------------------------------------------
+    # Basin.shoal_transport sums volume_A_B where the Basin is Basin_A
+    # and volume_B_A where it is Basin_B
+    interior = network.interior
+    basins.shoal_transport[ interior ] = -basin_delta_volume[ interior ]
+
+    basins.Scatter( [ 'water_volume', 'salt_mass', 'shoal_transport' ] )
+
+    hydro.BasinSalinity( model )
+    hydro.StageRunoff  ( model )
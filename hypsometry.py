@@ -0,0 +1,155 @@
+'''Basin hypsometry for the Bay Assessment Model (BAM)
+
+Lookup tables of the basin area and volume as a function of stage built
+from the Basin.wet_area depth bins read by init.GetBasinAreaDepths.
+
+A depth bin of depth d (ft) is wet when water_level + d * 0.3048 >= 0,
+the bins wet at a water_level are therefore the bins at and below the
+first depth that is not shallower than -water_level. With the depths
+sorted, the wet area and the volume are suffix sums of the bins, which
+are tabulated once for each basin so that Area, Volume and Stage are
+searchsorted lookups over all basins.'''
+
+# Python distribution modules
+from bisect import bisect_left
+
+# Community modules
+from numpy import array as nparray
+from numpy import zeros as npzeros
+from numpy import searchsorted, where, isnan
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class Hypsometry:
+    '''Area and volume versus stage tables indexed by Basin.index.
+
+    With j the index of the shallowest wet bin (depths ascending):
+      area  [ index, j ] = sum( wet_area[ i ] )            i >= j (m^2)
+      moment[ index, j ] = sum( wet_area[ i ] * depth[ i ] ) i >= j (m^3)
+    and the volume above the wet bin bottoms at water_level is
+      area[ index, j ] * water_level + moment[ index, j ]
+    Column n_depths (no wet bins) is 0.'''
+
+    def __init__( self, model ):
+
+        self.model = model
+
+        basin_scratch = model.basin_scratch
+
+        # Depth bins are the same for all basins
+        depths_ft = set()
+        for Basin in model.Basins.values() :
+            depths_ft.update( Basin.wet_area.keys() )
+
+        self.depths_ft = sorted( depths_ft )
+        self.depths    = [ depth_ft * 0.3048 for depth_ft in self.depths_ft ]
+        self.n_depths  = len( self.depths )
+
+        n_basins = basin_scratch.capacity
+
+        self.area   = npzeros( ( n_basins, self.n_depths + 1 ) )
+        self.moment = npzeros( ( n_basins, self.n_depths + 1 ) )
+
+        # Basins with depth bins, and their floor level (m) : the bottom
+        # of the shallowest bin. Basin water_level is not below it.
+        self.wet         = npzeros( n_basins, dtype = bool )
+        self.floor_level = npzeros( n_basins )
+
+        # Scalar tables for Basin.Area() { Basin.index : [ area ] }
+        self.area_list = dict()
+
+        for Basin in model.Basins.values() :
+
+            if not Basin.wet_area :
+                continue
+
+            wet_area = [ Basin.wet_area.get( depth_ft, 0. )
+                         for depth_ft in self.depths_ft ]
+
+            # Sum in Basin.wet_area order, shallowest first, as Basin.Area
+            area = [ sum( wet_area[ j: ] ) for j in range( self.n_depths ) ]
+            area.append( 0 )
+
+            moment = [ sum( a * d for a, d in zip( wet_area [ j: ],
+                                                   self.depths[ j: ] ) )
+                       for j in range( self.n_depths ) ]
+            moment.append( 0 )
+
+            self.area  [ Basin.index ] = area
+            self.moment[ Basin.index ] = moment
+            self.area_list[ Basin.index ] = area
+
+            self.wet        [ Basin.index ] = True
+            self.floor_level[ Basin.index ] = -( min( Basin.wet_area.keys() )
+                                                 * 0.3048 )
+
+        # Volume at the bottom of each bin, decreasing with the bin depth
+        bottoms = -nparray( self.depths )
+        self.volume = self.area[ :, :-1 ] * bottoms + self.moment[ :, :-1 ]
+
+        self.depth_array = nparray( self.depths )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def BasinArea( self, index, water_level ) :
+        '''Surface area (m^2) of basin index at water_level'''
+
+        area = self.area_list.get( index )
+
+        if area is None or water_level != water_level : # NaN
+            return 0
+
+        # Index of the shallowest wet bin: depth >= -water_level
+        return area[ bisect_left( self.depths, -water_level ) ]
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def WetBin( self, water_level ) :
+        '''Index of the shallowest wet bin of each basin'''
+
+        j = searchsorted( self.depth_array, -water_level, side = 'left' )
+
+        # NaN water_level : no wet bins
+        return where( isnan( water_level ), self.n_depths, j )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Area( self, water_level ) :
+        '''Surface area (m^2) of all basins at water_level'''
+
+        j = self.WetBin( water_level )
+
+        return self.area[ range( len( j ) ), j ]
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Volume( self, water_level ) :
+        '''Volume (m^3) above the wet bin bottoms of all basins'''
+
+        j     = self.WetBin( water_level )
+        basin = range( len( j ) )
+
+        return self.area[ basin, j ] * water_level + self.moment[ basin, j ]
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Stage( self, volume ) :
+        '''Water level (m) of all basins at volume, the inverse of
+        Volume(). A volume of 0 or less is at the deepest bin bottom.'''
+
+        # Shallowest bin with a bottom volume not above volume
+        j     = ( self.volume > volume[ :, None ] ).sum( axis = 1 )
+        basin = range( len( j ) )
+
+        area   = self.area  [ basin, j ]
+        moment = self.moment[ basin, j ]
+
+        return where( area > 0,
+                      ( volume - moment ) / where( area > 0, area, 1 ),
+                      -self.depth_array[ -1 ] )
@@ -1,30 +1,26 @@
 '''Initialization functions for the Bay Assessment Model (BAM)'''
 
 # Python distribution modules
-from os          import cpu_count
 from os.path     import join as path_join
+from os.path     import exists as path_exists
 from datetime    import timedelta, datetime
 from collections import OrderedDict as odict
+from concurrent.futures import ThreadPoolExecutor
 strptime = datetime.strptime
 
 # Community modules
-from scipy import interpolate
-from numpy import array as nparray
+# scipy.interpolate is imported by the tide and MSL functions that use it
 from numpy import zeros as npzeros
-
-# Worker pool to parallelize generation of tide interpolators
-from multiprocessing import Pool
-
-# Library for reading ArcGIS shapefile see:
-# https://github.com/GeospatialPython/pyshp
-import shapefile
+from numpy import searchsorted, arange, column_stack
 
 # Local modules 
 import basins
 import shoals
-
-# Kludge since multiprocessing can't handle embedded Tk
-import pool_functions
+import scratch
+import hypsometry
+import records
+import forcing
+import geometry
 
 #-----------------------------------------------------------
 #
@@ -63,51 +59,75 @@ def InitTimeBasins( model ):
     # Initialize basin volume, area, salt_mass based on intial water levels
     for Basin in model.Basins.values() :
         Basin.InitVolume()
-        Basin.plot_variables.clear()
+
+    # Erase and allocate the basin records for the time window
+    model.records.Init()
 
     # Call additional initialization methods if required
     time_changed = ( model.previous_start_time != model.start_time or \
                      model.previous_end_time   != model.end_time  )
 
+    # Observation data read when first needed, forcing.Observations
+    if time_changed :
+        model.observations.Register( 'stage', GetBasinStageData,
+                                     model.stage_data )    # -bs
+        model.observations.Register( 'salinity', GetBasinSalinityData,
+                                     model.salinity_data ) # -sf
+
+    # The forcing data loaders are independent, see RunLoaders
+    loaders = []
+
     if not model.args.noTide and time_changed : # -nt
-        if not GetBasinTidalData( model ) :     # -bt
-            errMsg = '\nGetBasinTidalData failed. See the console.\n'
-            raise Exception( errMsg )
+        loaders.append( GetBasinTidalData )     # -bt
                 
     if not model.args.noMeanSeaLevel and time_changed : # -nm
-        GetSeasonalMSL( model )                         # -sm
+        loaders.append( GetSeasonalMSL )                # -sm
 
     if not model.args.noRain and time_changed : # -nr
-        GetBasinRainData( model )               # -br
+        loaders.append( GetBasinRainData )      # -br
 
     if not model.args.noET_Amplify and time_changed : # -na
-        GetTemperatureData( model )                   # -st
+        loaders.append( GetTemperatureData )          # -st
 
     if not model.args.noET and time_changed :   # -ne
-        GetETData( model )                      # -et
+        loaders.append( GetETData )             # -et
 
     if not model.args.noStageRunoff and time_changed : # -nR
-        GetBasinRunoffStageData( model )               # -bR
-
-    if time_changed :
-        GetBasinStageData( model ) # -bs
+        loaders.append( GetBasinRunoffStageData )      # -bR
 
     if not model.args.noDynamicBoundaryConditions and time_changed : # -db
-        GetBasinDynamicBCData( model )                               # -bc
+        loaders.append( GetBasinDynamicBCData )                      # -bc
+
+    if model.args.fixedBoundaryConditions :          # -fb
+        loaders.append( GetBasinFixedBoundaryCondition ) # -bf
+
+    # Gauge salinity is forcing data with -gs or -si yes
+    salinity_forcing = model.args.gaugeSalinity or \
+                       model.args.salinityInit.lower() == 'yes'
 
-    if model.args.fixedBoundaryConditions :     # -fb
-        GetBasinFixedBoundaryCondition( model ) # -bf
+    if salinity_forcing and time_changed :     # -gs -si
+        loaders.append( GetBasinSalinityData ) # -sf
 
-    if model.args.gaugeSalinity and time_changed : # -gs
-        GetBasinSalinityData( model )              # -sf
+    RunLoaders( model, loaders )
+
+    if salinity_forcing and time_changed :
+        model.observations.Loaded( 'salinity' )
+
+    if model.args.tideMatrix : # -tm
+        GetTideMatrix( model )
+    else :
+        model.tide_levels = None
 
     # If salinityInit is 'yes' (-si), then override salinity from the
     # basinInit file (-bi) with the closest gauge data as mapped in the 
     # basinParameter (-bp) file. 
     if model.args.salinityInit.lower() == 'yes' :
-        GetBasinSalinityData   ( model ) 
+        model.observations.Load( 'salinity' )
         SetInitialBasinSalinity( model )
 
+    # Daily forcing arrays by day of the run mapped to the basins
+    model.daily_forcing = forcing.DailyForcing( model )
+
     # Report simulation parameters 
     output_hours = model.outputInterval.days * 24 +\
                    model.outputInterval.seconds//3600 
@@ -125,6 +145,180 @@ def InitTimeBasins( model ):
         model.gui.PlotLegend( "InitTimeBasins" )
         model.gui.canvas.draw()
 
+#----------------------------------------------------------------
+#
+#----------------------------------------------------------------
+def RunLoaders( model, loaders ):
+    '''Run the forcing data loaders of InitTimeBasins. Each loader reads
+    its files into its own model dictionaries, they do not depend on
+    each other. With initWorkers (-iw) above 1 the csv files that are
+    not in a current forcing cache are parsed in a process pool 
+    (forcing.PreloadForcing), then the loaders run in a thread pool.
+    With the GUI the loaders run in order, Tk is not thread safe.
+
+    The errors of all loaders are collected and raised together.'''
+
+    if model.args.DEBUG_ALL :
+        print( '\n-> RunLoaders', flush = True )
+
+    workers = model.args.initWorkers if model.args.noGUI else 1
+
+    if workers > 1 :
+        forcing.PreloadForcing( model, ForcingFiles( model, loaders ),
+                                workers )
+
+    def Load( Loader ) :
+        '''Run Loader, return an error message or None'''
+        try :
+            if Loader( model ) is False :
+                return Loader.__name__ + ' failed. See the console.'
+
+        except Exception as err :
+            return Loader.__name__ + ': ' + str( err ).strip()
+
+        return None
+
+    if workers > 1 and len( loaders ) > 1 :
+        with ThreadPoolExecutor( max_workers = workers ) as pool :
+            errors = list( pool.map( Load, loaders ) )
+    else :
+        errors = [ Load( Loader ) for Loader in loaders ]
+
+    errors = [ error for error in errors if error ]
+
+    if errors :
+        errMsg = '\nInitTimeBasins: ' + str( len( errors ) ) +\
+                 ' forcing data loader(s) failed:\n  ' +\
+                 '\n  '.join( errors ) + '\n'
+        raise Exception( errMsg )
+
+#----------------------------------------------------------------
+#
+#----------------------------------------------------------------
+def ForcingFiles( model, loaders ):
+    '''The csv files [ ( file_name, Parse ) ] read by the loaders
+    through forcing.ReadDailyData and forcing.ReadTideData. The tide
+    and boundary condition files are listed in the -bt and -bc files,
+    a file that can not be read is left to its loader.'''
+
+    args  = model.args
+    files = []
+
+    daily_files = { GetBasinRainData        : args.basinRain,
+                    GetTemperatureData      : args.surfaceTemp,
+                    GetETData               : args.ET,
+                    GetBasinRunoffStageData : args.basinStageRunoff,
+                    GetBasinStageData       : args.basinStage,
+                    GetBasinSalinityData    : args.salinityFile }
+
+    for Loader in loaders :
+        if Loader in daily_files :
+            files.append( ( path_join( args.path, daily_files[ Loader ] ),
+                            forcing.ParseDailyData ) )
+
+    # Data files of the -bt ( Basin, Type, File ) and -bc ( Basin,
+    # Name, Type, File ) files : Type and File column index
+    for Loader, file_name, Parse, data_types, type_i, file_i in [ 
+        ( GetBasinTidalData,     args.basinTide,   forcing.ParseTideData,
+          [ 'stage' ], 1, 2 ),
+        ( GetBasinDynamicBCData, args.basinBCFile, forcing.ParseDailyData,
+          [ 'flow', 'stage' ], 2, 3 ) ] :
+
+        if Loader not in loaders :
+            continue
+
+        try :
+            with open( path_join( args.path, file_name ), 'r' ) as fd :
+                rows = fd.readlines()
+        except OSError :
+            continue
+
+        for row in rows[ 1: ] : # Skip the header
+            words = [ word.strip() for word in row.split( ',' ) ]
+
+            if len( words ) > file_i and words[ type_i ] in data_types :
+                files.append( ( path_join( args.path, words[ file_i ] ),
+                                Parse ) )
+
+    return files
+
+#----------------------------------------------------------------
+#
+#----------------------------------------------------------------
+def MissingDays( model, name, file_names, data ):
+    '''Incremental re-initialization of the daily data dictionary
+    { ( year, month, day ) : value } of the forcing store name read from
+    file_names. Return the [ ( first_day, last_day ) ] ranges of the time
+    window that are not loaded: none if the window is within the days
+    loaded for a previous window, the days before and/or after them if
+    the window extends them, else the window. The data are cleared if
+    the files changed or the days do not overlap the window.
+
+    The loader reads the missing days, then calls LoadedDays().'''
+
+    first_day, last_day = WindowDays( model )
+
+    sources = [ forcing.CacheSource( file_name ) for file_name in file_names
+                if path_exists( file_name ) ]
+
+    loaded = model.loaded_days.pop( name, None ) # ( sources, first, last )
+
+    if loaded is None or loaded[ 0 ] != sources or \
+       loaded[ 1 ] > last_day  + timedelta( days = 1 ) or \
+       loaded[ 2 ] < first_day - timedelta( days = 1 ) :
+        data.clear()
+        return [ ( first_day, last_day ) ]
+
+    missing = []
+    if first_day < loaded[ 1 ] :
+        missing.append( ( first_day, loaded[ 1 ] - timedelta( days = 1 ) ) )
+    if last_day > loaded[ 2 ] :
+        missing.append( ( loaded[ 2 ] + timedelta( days = 1 ), last_day ) )
+
+    if model.args.DEBUG :
+        print( '-> MissingDays ', name, ' ', missing, flush = True )
+
+    return missing
+
+#----------------------------------------------------------------
+#
+#----------------------------------------------------------------
+def LoadedDays( model, name, file_names, data ):
+    '''Record the days of the time window as loaded in data for
+    MissingDays(), remove the days outside the window, and order the
+    days of an extended window.'''
+
+    first_day, last_day = WindowDays( model )
+
+    first_key = ( first_day.year, first_day.month, first_day.day )
+    last_key  = ( last_day.year,  last_day.month,  last_day.day  )
+
+    window = sorted( ( key, value ) for key, value in data.items() 
+                     if first_key <= key <= last_key )
+
+    data.clear()
+    data.update( window )
+
+    sources = [ forcing.CacheSource( file_name ) for file_name in file_names
+                if path_exists( file_name ) ]
+
+    model.loaded_days[ name ] = ( sources, first_day, last_day )
+
+#----------------------------------------------------------------
+#
+#----------------------------------------------------------------
+def WindowDays( model ):
+    '''First and last day (datetime at 0:00) of the time window, the
+    last day is that of the last ModelLoop timestep (DailyForcing)'''
+
+    last_time = model.end_time + timedelta( seconds = model.timestep )
+
+    first_day = datetime( model.start_time.year, model.start_time.month,
+                          model.start_time.day )
+    last_day  = datetime( last_time.year, last_time.month, last_time.day )
+
+    return first_day, last_day
+
 #----------------------------------------------------------------
 #
 #----------------------------------------------------------------
@@ -143,23 +337,29 @@ def CreateBasinsFromShapefile( model ):
     # A temporary map to check for duplicate basin names
     basinNameNumMap = {}
 
-    # Read the shapefile (-x)
-    # shapes() method returns a list of the shapefile's geometry
-    # iterRecords() returns an iterator to the shapefile records
-    # Each shape record contains the following attributes:
-    #    bbox  parts  points  shapeType
-    # points are vectors of xy
+    # Read the shapefile (-bn) records, the points of each shape and
+    # the points simplified for rendering, see geometry.py. The points
+    # are None with -ng unless -gm.
+    basin_records, shapes, render = geometry.ReadShapefile( model,
+                                        model.args.basinShapeFile )
+
+    # JP : These boundary basins are Hardcoded... Bogus! See below
+    boundary_basins = [ 59, 60, 61, 62, 63, 64, 65, 66, 67, 68, 69, 70, 
+                        71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82 ]
 
-    sf_basins = shapefile.Reader( model.args.basinShapeFile )
+    # Scratch arrays of the Basin variables for the array code
+    model.basin_scratch = scratch.BasinScratch( len( basin_records ) +
+                                                len( boundary_basins ) )
 
-    # A record from sf_basins.iterRecords() is a list of 4 strings:
+    # Basin output records, the Basin.plot_variables views
+    model.records = records.Records( model )
+
+    # A record of the shapefile is a list of 4 values:
     #       Area                    Perimeter      Number      Name
     # ['8.310187961009e+007', '3.934640784246e+004', '5', 'Barnes Sound']
     # 
     # Dual iteration over the records and shapes
-    for record, shape in zip( sf_basins.iterRecords(), sf_basins.shapes() ):
- 
-        basin_xy = nparray( shape.points )
+    for record, basin_xy, render_xy in zip( basin_records, shapes, render ):
 
         if len( record ) != 4 :
             errMsg = 'Shapefile record has a length of ' + \
@@ -187,6 +387,7 @@ def CreateBasinsFromShapefile( model ):
         model.Basins[ number ] = basins.Basin( model, name, number, 
                                                total_area, 
                                                perimeter, basin_xy )
+        model.Basins[ number ].render_xy = render_xy
 
         basinNameNumMap[ name ] = number
 
@@ -195,8 +396,7 @@ def CreateBasinsFromShapefile( model ):
 
     # Add boundary Basin objects.
     # Ensure boundary basins do not exist
-    for basin in [ 59, 60, 61, 62, 63, 64, 65, 66, 67, 68, 69, 70, 
-                   71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82 ] :
+    for basin in boundary_basins :
         if basin in model.Basins.keys() :
             errMsg = 'Duplicate boundary basin number [' + basin + \
                      '] found in shapefile records.'
@@ -309,6 +509,9 @@ def GetBasinAreaDepths( model ):
         model.Basins[ basinNumber ].land_area = \
             float( words[ len( words ) - 1 ] )
 
+    # Area and volume versus stage lookup tables
+    model.hypsometry = hypsometry.Hypsometry( model )
+
 #----------------------------------------------------------------
 # 
 #----------------------------------------------------------------
@@ -408,8 +611,8 @@ def GetBasinTidalData( model ):
     A scipy interpolate.interp1d function for the tidal anomalies
     is stored in the appropriate basin object.
     
-    Note that this takes a long time, and has been parallelized
-    with multiprocessing Pool (see below and pool_functions.py)."""
+    The tide series are read from the forcing cache, see forcing.py
+    and ReadTideBoundaryData()."""
     
     if model.args.DEBUG_ALL :
         print( '\n-> GetBasinTidalData', flush = True )
@@ -458,70 +661,98 @@ def GetBasinTidalData( model ):
 
         basinList.append( basin )
 
-    # Process each row of data, skip the header
-    # ReadTideBoundaryData returns a tuple with basin number and 
-    # scipy interpolate.interp1d function which can be called with 
-    # a unix time (Epoch seconds) argument to get demeaned tidal elevations.
-    N_processors  = cpu_count()
-    num_processes = None
-    if N_processors > 3 :
-        num_processes = 4
-    elif N_processors == 2 :
-        num_processes = 2
-    else :
-        num_processes = 1
-        
-    pool = Pool( processes = num_processes )
-
-    #------------------------------------------------------------
-    # Kludge since multiprocessing can't serialize the Tk object
-    # embedded in the Model class object. 
-    # Explicitly extract and pass args. (path, start, end):
-    path  = model.args.path
+    # Add extra time to end_time for ReadTideBoundaryData
     start = model.start_time  
-    # Add extra time to end_time for model.ReadTideBoundaryData
     end   = model.end_time + timedelta( hours = 3 )
 
-    # Create an iterable object of args to pass to Pool.map_async()
-    # rows are the list of lines from the basinTide file (-bt)
-    n_row = len( rows ) - 1
-    args  = zip( rows[ 1 : ], [start] * n_row, [end] * n_row, [path] * n_row )
-    
-    # map_async() : A variant of the map() method that returns a result object
-    # of class multiprocessing.pool.AsyncResult
-    results = pool.map_async( pool_functions.ReadTideBoundaryData, args )
-    #------------------------------------------------------------
-
-    # Must call AsyncResult.get() to spawn/wait for map_async() results
-    result = results.get()
-
     msg = 'finished.\n'
     err = True
 
-    # Save the boundary data function to each basin object
-    for tide_boundary_tuple in result :
-        if tide_boundary_tuple == None : # 'None' 
+    # Process each row of data, skip the header. Save the boundary 
+    # data function to each basin object: a scipy interpolate.interp1d 
+    # function which can be called with a unix time (Epoch seconds) 
+    # argument to get demeaned tidal elevations.
+    for i in range( 1, len( rows ) ) :
+        words = rows[ i ].split(',')
+
+        basin     = int ( words[ 0 ] )
+        data_type = words[ 1 ].strip()
+        data_file = words[ 2 ].strip()
+
+        if data_type == 'None' :
             continue
 
-        elif tide_boundary_tuple == False :
+        boundary_function = ReadTideBoundaryData( model, data_type, 
+                                                  data_file, start, end )
+
+        if boundary_function is None :
             msg = '\n\n*** Error in ReadTideBoundaryData. ' +\
                   'Tides not initialized. ***\n\n'
             err = False
             break
 
-        else :
-            Basin      = model.Basins[ tide_boundary_tuple[ 0 ] ]
-            Basin.boundary_function = tide_boundary_tuple[ 1 ]
+        Basin = model.Basins[ basin ]
+        Basin.boundary_function = boundary_function
 
-            if model.args.DEBUG_ALL :
-                print( Basin.name, 
-                       ' [', tide_boundary_tuple[ 0 ], ']: Tide value ',
-                       tide_boundary_tuple[ 1 ]( 1262305800 ) )
+        if model.args.DEBUG_ALL :
+            print( Basin.name, ' [', basin, ']: Tide value ',
+                   boundary_function( 1262305800 ) )
 
     model.gui.Message( msg )
 
     return( err )
 
+#-----------------------------------------------------------
+# 
+#-----------------------------------------------------------
+def ReadTideBoundaryData( model, data_type, data_file, start_time, end_time ):
+    '''Return a scipy interpolate.interp1d function of the demeaned
+    tidal elevations of data_file from start_time to end_time, which
+    can be called with a unix time (Epoch seconds) argument. None if
+    the data can not be read or do not cover the times.
+
+    The tide series is read from the forcing cache (forcing.py) memory
+    mapped, the start_time and end_time rows are found by binary search
+    (the first row of a time repeated at the end of daylight saving).'''
+
+    if data_type not in [ 'stage' ] :
+        msg = 'ReadTideBoundaryData() Invalid data type: ' +\
+              data_type + '\n'
+        model.gui.Message( msg )
+        return None
+
+    try:
+        times, levels = forcing.ReadTideData( model,
+                            path_join( model.args.path, data_file ) )
+    except OSError as err :
+        msg = "ReadTideBoundaryData() OS error: {0}\n".format( err )
+        model.gui.Message( msg )
+        return None
+
+    epoch = datetime( 1970, 1, 1 )
+    index = []
+
+    # Search for times in the data that match the simulation start/end
+    for name, time in [ ( 'start', start_time ), ( 'end', end_time ) ] :
+        seconds = ( time - epoch ).total_seconds()
+        i       = searchsorted( times, seconds )
+
+        if i == len( times ) or times[ i ] != seconds :
+            msg = 'ReadTideBoundaryData() Model ' + name + ' time: ' +\
+                  str( time ) + ' is not in the tide boundary data: ' +\
+                  data_file + '\n'
+            model.gui.Message( msg )
+            return None
+
+        index.append( i )
+
+    start_i, end_i = index
+
+    from scipy import interpolate
+
+    return interpolate.interp1d( times [ start_i : end_i ],
+                                 levels[ start_i : end_i ] )
+
 #----------------------------------------------------------------
 # 
 #----------------------------------------------------------------
@@ -557,8 +788,95 @@ def GetSeasonalMSL( model ):
         values.append( float( words[ 1 ] ) )
 
     # Create the scipy interpolate spline representation
+    from scipy import interpolate
+
     model.seasonal_MSL_splrep = interpolate.splrep( unix_times, values, s=0 )
 
+#----------------------------------------------------------------
+#
+#----------------------------------------------------------------
+def GetTideMatrix( model ):
+    """Precompute the boundary basin water levels of model.GetTides for
+    every timestep of the run (-tm) : tidal value with the seasonal
+    mean sea level anomaly, with one vectorized boundary_function and
+    splev call per basin. GetTides then indexes a row:
+
+      tide_times    [ step ]         unix time (s) of step
+      tide_MSL      [ step ]         seasonal_MSL
+      tide_levels   [ step, column ] water level of the basins
+      tide_columns  { basin number : column }
+
+    step 0 is the start_time. The columns are the boundary basins with a
+    boundary_function, all boundary basins with -nT. The others are the
+    EDEN runoff basins, their water level is set by GetRunoff. If a
+    boundary basin has neither, or on an interpolation error, the matrix
+    is not used and GetTides interpolates at each timestep."""
+
+    if model.args.DEBUG_ALL :
+        print( '\n-> GetTideMatrix', flush = True )
+
+    model.tide_levels = None
+
+    # Boundary basins of GetTides
+    Basins = [ Basin for Basin in model.Basins.values()
+               if Basin.boundary_basin ]
+
+    if not model.args.noTide :
+        # GetTides gives a basin without a boundary_function the water
+        # level of the previous basin, which GetRunoff overwrites
+        runoff_basins = [] if model.args.noStageRunoff else \
+                        model.runoff_stage_basins
+
+        unset = [ Basin.name for Basin in Basins if
+                  not Basin.boundary_function and Basin not in runoff_basins ]
+
+        if unset :
+            msg = 'GetTideMatrix: no tide boundary function or runoff ' +\
+                  'stage for basins ' + ', '.join( unset ) + ', tides ' +\
+                  'are interpolated at each timestep.\n'
+            model.gui.Message( msg )
+            return
+
+        Basins = [ Basin for Basin in Basins if Basin.boundary_function ]
+
+    # Timesteps of ModelLoop, which runs up to one timestep past end_time
+    run_seconds = ( model.end_time - model.start_time ).total_seconds()
+    n_steps     = int( run_seconds // model.timestep ) + 2
+
+    start_unix = ( model.start_time - datetime(1970,1,1) ).total_seconds()
+    unix_times = start_unix + arange( n_steps ) * model.timestep
+
+    try :
+        if model.args.noMeanSeaLevel :
+            MSL = npzeros( n_steps )
+        else :
+            from scipy import interpolate
+
+            MSL = interpolate.splev( unix_times, model.seasonal_MSL_splrep,
+                                     der = 0 ).round( 3 )
+
+        levels = []
+
+        for Basin in Basins :
+            if model.args.noTide :
+                wl = npzeros( n_steps )
+            else :
+                wl = Basin.boundary_function( unix_times )
+
+            levels.append( wl + MSL )
+
+    except ValueError as err :
+        msg = 'GetTideMatrix: interpolation failed, tides are ' +\
+              'interpolated at each timestep: ' + str( err ) + '\n'
+        model.gui.Message( msg )
+        return
+
+    model.tide_times   = unix_times
+    model.tide_MSL     = MSL
+    model.tide_columns = { Basin.number : column
+                           for column, Basin in enumerate( Basins ) }
+    model.tide_levels  = column_stack( levels )
+
 #----------------------------------------------------------------
 #
 #----------------------------------------------------------------
@@ -572,59 +890,48 @@ def GetBasinRainData( model ):
     if model.args.DEBUG_ALL :
         print( '\n-> GetBasinRainData', flush = True )
 
-    # The csv file has 18 columns, 1 = YYYY-MM-DD
-    # 2 - 18 = Daily cumulative rainfall in cm at:
-    # BK_cm_day, BA_cm_day, BN_cm_day, BS_cm_day, DK_cm_day, GB_cm_day,
-    # HC_cm_day, JK_cm_day, LB_cm_day, LM_cm_day, LR_cm_day, LS_cm_day,
-    # MK_cm_day, PK_cm_day, TC_cm_day, TR_cm_day, WB_cm_day
-    # first row is header
-    fd   = open( path_join(model.args.path, model.args.basinRain), 'r' )
-    rows = fd.readlines()
-    fd.close()
+    file_name = path_join( model.args.path, model.args.basinRain )
 
-    # Create list of station names in the order of the header/columns
-    stations = []
-    words = rows[ 0 ].split(',')
+    # Days of the time window not loaded for a previous window
+    missing = MissingDays( model, 'Rain', [ file_name ], model.rain_data )
 
-    for i in range( 1, len( words ) ) :  # Skip the time column
-        stations.append( words[ i ].strip()[0:2] )
+    if missing :
+        # The csv file has 18 columns, 1 = YYYY-MM-DD
+        # 2 - 18 = Daily cumulative rainfall in cm at:
+        # BK_cm_day, BA_cm_day, BN_cm_day, BS_cm_day, DK_cm_day, GB_cm_day,
+        # HC_cm_day, JK_cm_day, LB_cm_day, LM_cm_day, LR_cm_day, LS_cm_day,
+        # MK_cm_day, PK_cm_day, TC_cm_day, TR_cm_day, WB_cm_day
+        # first row is header
+        dates, columns, values = forcing.ReadDailyData( model, file_name )
 
-    # Create list of datetimes
-    dates = []
-    for i in range( 1, len( rows ) ) :  # Skip the header
-        row   = rows[ i ]
-        words = row.split(',')
-        dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
+        # Create list of station names in the order of the header/columns
+        stations = [ column[0:2] for column in columns ]
 
-    # Find index in dates for start_time & end_time
-    start_i, end_i = GetTimeIndex( 'Rain', dates, 
-                                   model.start_time, model.end_time )
+    for first_day, last_day in missing :
+        # Find index in dates for the first & last day
+        start_i, end_i = GetTimeIndex( 'Rain', dates, first_day, last_day )
         
-    if model.args.DEBUG_ALL :
-        print( 'Rain data start: ', str( dates[ start_i ] ),str( start_i ), 
-               ' end: ',            str( dates[ end_i   ] ),str( end_i ) )
-        print( rows[ start_i ] )
-        print( rows[ end_i ] )
-
-    # The rain_data is a nested dictionary intended to minimize
-    # dictionary key lookups to access basin rainfall for a 
-    # specific year month day. The key is an integer 3-tuple of
-    # ( Year, Month, Day ), values are a station_rain dictionary.
-
-    # Populate only data needed for the simulation timeframe
-    for i in range( start_i, end_i + 1 ) :
-        row   = rows[ i+1 ]
-        words = row.split(',')
+        if model.args.DEBUG_ALL :
+            print( 'Rain data start: ', str( dates[ start_i ] ),str( start_i ), 
+                   ' end: ',            str( dates[ end_i   ] ),str( end_i ) )
+            print( values[ start_i ] )
+            print( values[ end_i ] )
 
-        station_rain = dict()
+        # The rain_data is a nested dictionary intended to minimize
+        # dictionary key lookups to access basin rainfall for a 
+        # specific year month day. The key is an integer 3-tuple of
+        # ( Year, Month, Day ), values are a station_rain dictionary.
 
-        for j in range( 1, len( words ) ) :
-            station_rain[ stations[ j-1 ] ] = float( words[ j ] )
+        # Populate only data needed for the simulation timeframe
+        for i in range( start_i, end_i + 1 ) :
+            station_rain = dict( zip( stations, values[ i ].tolist() ) )
                 
-        date = dates[ i ]
-        key = ( date.year, date.month, date.day )
+            date = dates[ i ]
+            key = ( date.year, date.month, date.day )
 
-        model.rain_data[ key ] = station_rain
+            model.rain_data[ key ] = station_rain
+
+    LoadedDays( model, 'Rain', [ file_name ], model.rain_data )
             
     if model.args.DEBUG_ALL :
         print( model.rain_data )
@@ -642,73 +949,67 @@ def GetBasinSalinityData( model ):
     if model.args.DEBUG_ALL :
         print( '\n-> GetBasinSalinityData', flush = True )
 
-    # The csv file has 22 columns, 1 = YYYY-MM-DD
-    # 2 - 23 = Daily mean salinty at:
-    # BA, BK, BN, BS, DK, GB, HC, JK, LB, LM, LR, LS, MK,
-    # PK, TC, TR, WB, MB, MD, TP, Gulf_1, Ocean_1
-    # First row is header
-    try :
-        fd = open( path_join(model.args.path, model.args.salinityFile), 'r' )
-        rows = fd.readlines()
-        fd.close()
+    file_name = path_join( model.args.path, model.args.salinityFile )
 
-    except OSError as err :
-        msg = "\nGetBasinSalinityData: OS error: {0}\n".format( err )
-        model.gui.Message( msg )
-        return
+    # Days of the time window not loaded for a previous window
+    missing = MissingDays( model, 'Salinity', [ file_name ],
+                           model.salinity_data )
 
-    # Create list of station names in the order of the header/columns
-    if len( model.salinity_stations ) == 0 :
-        words = rows[ 0 ].split(',')
+    if missing :
+        # The csv file has 22 columns, 1 = YYYY-MM-DD
+        # 2 - 23 = Daily mean salinty at:
+        # BA, BK, BN, BS, DK, GB, HC, JK, LB, LM, LR, LS, MK,
+        # PK, TC, TR, WB, MB, MD, TP, Gulf_1, Ocean_1
+        # First row is header
+        try :
+            dates, columns, values = forcing.ReadDailyData( model, file_name )
 
-        for i in range( 1, len( words ) ) :  # Skip the time column
-            word = words[ i ].strip()
-            model.salinity_stations.append( word.strip('"') )
+        except OSError as err :
+            msg = "\nGetBasinSalinityData: OS error: {0}\n".format( err )
+            model.gui.Message( msg )
+            return
 
-    # Create list of datetimes
-    dates = []
-    for i in range( 1, len( rows ) ) :
-        row   = rows[ i ]
-        words = row.split(',')
-        dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
+        # Create list of station names in the order of the header/columns
+        if len( model.salinity_stations ) == 0 :
+            for column in columns :
+                model.salinity_stations.append( column.strip('"') )
 
-    # Find index in dates for start_time & end_time
-    start_i, end_i = GetTimeIndex( 'Salinity', dates, 
-                                   model.start_time, model.end_time )        
+    for first_day, last_day in missing :
+        # Find index in dates for the first & last day
+        start_i, end_i = GetTimeIndex( 'Salinity', dates,
+                                       first_day, last_day )
         
-    if model.args.DEBUG_ALL :
-        print( 'Salinity data start: ', 
-                str( dates[ start_i ] ),str( start_i ), 
-                ' end: ', str( dates[ end_i   ] ),str( end_i ) )
-        print( rows[ start_i ] )
-        print( rows[ end_i ] )
-
-    # The salinity_data is a nested dictionary intended to minimize
-    # dictionary key lookups to access salinity for a 
-    # specific year month day. The key is an integer 3-tuple of
-    # ( Year, Month, Day ), values are a station_salinity dictionary.
-    if model.salinity_data :
-        model.salinity_data.clear()
-
-    # Populate only data needed for the simulation timeframe
-    for i in range( start_i, end_i + 1 ) :
-        row   = rows[ i+1 ]
-        words = row.split(',')
+        if model.args.DEBUG_ALL :
+            print( 'Salinity data start: ', 
+                    str( dates[ start_i ] ),str( start_i ), 
+                    ' end: ', str( dates[ end_i   ] ),str( end_i ) )
+            print( values[ start_i ] )
+            print( values[ end_i ] )
+
+        # The salinity_data is a nested dictionary intended to minimize
+        # dictionary key lookups to access salinity for a 
+        # specific year month day. The key is an integer 3-tuple of
+        # ( Year, Month, Day ), values are a station_salinity dictionary.
 
-        station_salinity = dict()
+        # Populate only data needed for the simulation timeframe
+        for i in range( start_i, end_i + 1 ) :
+            station_salinity = dict()
 
-        for j in range( 1, len( words ) ) :
-            if words[ j ] == 'NA' :
-                salinity_value = None
-            else:
-                salinity_value = float( words[ j ] )
+            for j, value in enumerate( values[ i ].tolist() ) :
+                if value != value : # NA
+                    salinity_value = None
+                else:
+                    salinity_value = value
                 
-            station_salinity[ model.salinity_stations[ j-1 ] ] = salinity_value
+                station_salinity[ model.salinity_stations[ j ] ] = \
+                    salinity_value
                 
-        date = dates[ i ]
-        key  = ( date.year, date.month, date.day )
+            date = dates[ i ]
+            key  = ( date.year, date.month, date.day )
 
-        model.salinity_data[ key ] = station_salinity
+            model.salinity_data[ key ] = station_salinity
+
+    LoadedDays( model, 'Salinity', [ file_name ], model.salinity_data )
         
     if model.args.DEBUG_ALL :
         print( model.salinity_data )
@@ -736,7 +1037,7 @@ def SetInitialBasinSalinity( model ) :
                     float( station_salinity_map[ Basin.salinity_station ] )
             except ( TypeError, ValueError ) :
                 # Salinity data can be None if no data available "NA"
-                salinity_gauge = 0
+                salinity_gauge = 0.
 
                 msg = '\nSetInitialBasinSalinity: WARNING:' +\
                       ' Basin ' + Basin.name + ' has no available salinity' +\
@@ -763,39 +1064,35 @@ def GetETData( model ):
     if model.args.DEBUG_ALL :
         print( '\n-> GetETData', flush = True )
 
-    # The csv file has 2 columns, 1 = YYYY-MM-DD, 2 = PET mm/day
-    # first row is header
-    fd   = open( path_join(model.args.path, model.args.ET), 'r' )
-    rows = fd.readlines()
-    fd.close()
+    file_name = path_join( model.args.path, model.args.ET )
 
-    # Create list of datetimes
-    dates = []
-    for i in range( 1, len( rows ) ) :
-        row   = rows[ i ]
-        words = row.split(',')
-        dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
+    # Days of the time window not loaded for a previous window
+    missing = MissingDays( model, 'ET', [ file_name ], model.et_data )
+
+    if missing :
+        # The csv file has 2 columns, 1 = YYYY-MM-DD, 2 = PET mm/day
+        # first row is header
+        dates, columns, values = forcing.ReadDailyData( model, file_name )
 
-    # Find index in dates for start_time & end_time
-    start_i, end_i = GetTimeIndex( 'ET', dates, 
-                                   model.start_time, model.end_time )        
+    for first_day, last_day in missing :
+        # Find index in dates for the first & last day
+        start_i, end_i = GetTimeIndex( 'ET', dates, first_day, last_day )
         
-    if model.args.DEBUG_ALL :
-        print( 'ET data start: ', str( dates[ start_i ] ), str( start_i ), 
-               ' end: ',          str( dates[ end_i   ] ), str( end_i ) )
-        print( rows[ start_i ] )
-        print( rows[ end_i ] )
-
-    # Populate only data needed for the simulation timeframe
-    for i in range( start_i, end_i + 1 ) :
-        row   = rows[ i+1 ]
-        words = row.split(',')
+        if model.args.DEBUG_ALL :
+            print( 'ET data start: ', str( dates[ start_i ] ), str( start_i ), 
+                   ' end: ',          str( dates[ end_i   ] ), str( end_i ) )
+            print( values[ start_i ] )
+            print( values[ end_i ] )
 
-        # The key is an integer 3-tuple of ( Year, Month, Day )
-        # values are PET in mm/day.
-        date = dates[ i ]
-        key = ( date.year, date.month, date.day )
-        model.et_data[ key ] = float( words[1] )
+        # Populate only data needed for the simulation timeframe
+        for i in range( start_i, end_i + 1 ) :
+            # The key is an integer 3-tuple of ( Year, Month, Day )
+            # values are PET in mm/day.
+            date = dates[ i ]
+            key = ( date.year, date.month, date.day )
+            model.et_data[ key ] = float( values[ i, 0 ] )
+
+    LoadedDays( model, 'ET', [ file_name ], model.et_data )
             
     if model.args.DEBUG_ALL :
         print( model.et_data )
@@ -809,40 +1106,38 @@ def GetTemperatureData( model ):
     if model.args.DEBUG_ALL :
         print( '\n-> GetTemperatureData', flush = True )
 
-    # The csv file has 2 columns, 1 = YYYY-MM-DD, 2 = MaxTemp (C)
-    # first row is header
-    fd   = open( path_join(model.args.path, model.args.surfaceTemp), 'r' )
-    rows = fd.readlines()
-    fd.close()
+    file_name = path_join( model.args.path, model.args.surfaceTemp )
 
-    # Create list of datetimes
-    dates = []
-    for i in range( 1, len( rows ) ) :
-        row   = rows[ i ]
-        words = row.split(',')
-        dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
+    # Days of the time window not loaded for a previous window
+    missing = MissingDays( model, 'Temperature', [ file_name ],
+                           model.temperature_data )
+
+    if missing :
+        # The csv file has 2 columns, 1 = YYYY-MM-DD, 2 = MaxTemp (C)
+        # first row is header
+        dates, columns, values = forcing.ReadDailyData( model, file_name )
 
-    # Find index in dates for start_time & end_time
-    start_i, end_i = GetTimeIndex( 'Temperature', dates, 
-                                   model.start_time, model.end_time )        
+    for first_day, last_day in missing :
+        # Find index in dates for the first & last day
+        start_i, end_i = GetTimeIndex( 'Temperature', dates,
+                                       first_day, last_day )
         
-    if model.args.DEBUG_ALL :
-        print( 'Temperature data start: ',
-               str( dates[ start_i ] ), str( start_i ), 
-               ' end: ',          str( dates[ end_i   ] ), str( end_i ) )
-        print( rows[ start_i ] )
-        print( rows[ end_i ] )
-
-    # Populate only data needed for the simulation timeframe
-    for i in range( start_i, end_i + 1 ) :
-        row   = rows[ i+1 ]
-        words = row.split(',')
+        if model.args.DEBUG_ALL :
+            print( 'Temperature data start: ',
+                   str( dates[ start_i ] ), str( start_i ), 
+                   ' end: ',          str( dates[ end_i   ] ), str( end_i ) )
+            print( values[ start_i ] )
+            print( values[ end_i ] )
 
-        # The key is an integer 3-tuple of ( Year, Month, Day )
-        # values are PET in mm/day.
-        date = dates[ i ]
-        key = ( date.year, date.month, date.day )
-        model.temperature_data[ key ] = float( words[1] )
+        # Populate only data needed for the simulation timeframe
+        for i in range( start_i, end_i + 1 ) :
+            # The key is an integer 3-tuple of ( Year, Month, Day )
+            # values are PET in mm/day.
+            date = dates[ i ]
+            key = ( date.year, date.month, date.day )
+            model.temperature_data[ key ] = float( values[ i, 0 ] )
+
+    LoadedDays( model, 'Temperature', [ file_name ], model.temperature_data )
         
     if model.args.DEBUG_ALL :
         print( model.temperature_data )
@@ -928,58 +1223,45 @@ def GetBasinRunoffStageData( model ):
         print( 'GetBasinRunoffStageData: runoff_stage_shoals:\n' )
         print( model.runoff_stage_shoals )
 
-    # Load stage data into the runoff_stage_data dictionary
-    # The csv file has 9 columns, 1 = YYYY-MM-DD
-    # 2 - 9 = Daily EDEN stage in (m) offset to MSL anomaly:
-    # S22, S21, S20, S19, S18, S17, S16, S15
-    # first row is header
-    fd   = open( path_join(model.args.path, model.args.basinStageRunoff), 'r' )
-    rows = fd.readlines()
-    fd.close()
-    
-    # Create list of station names in the order of the header/columns
-    stations = []
-    words = rows[ 0 ].split(',')
+    file_name = path_join( model.args.path, model.args.basinStageRunoff )
 
-    for i in range( 1, len( words ) ) :  # Skip the time column
-        stations.append( words[ i ].strip() )
+    # Days of the time window not loaded for a previous window
+    missing = MissingDays( model, 'Runoff', [ file_name ],
+                           model.runoff_stage_data )
 
-    # Create list of datetimes
-    dates = []
-    for i in range( 1, len( rows ) ) :  # Skip the header
-        row   = rows[ i ]
-        words = row.split(',')
-        dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
+    if missing :
+        # Load stage data into the runoff_stage_data dictionary
+        # The csv file has 9 columns, 1 = YYYY-MM-DD
+        # 2 - 9 = Daily EDEN stage in (m) offset to MSL anomaly:
+        # S22, S21, S20, S19, S18, S17, S16, S15
+        # first row is header
+        dates, stations, values = forcing.ReadDailyData( model, file_name )
 
-    # Find index in dates for start_time & end_time
-    start_i, end_i = GetTimeIndex( 'Runoff', dates, 
-                                   model.start_time, model.end_time )
+    for first_day, last_day in missing :
+        # Find index in dates for the first & last day
+        start_i, end_i = GetTimeIndex( 'Runoff', dates, first_day, last_day )
         
-    if model.args.DEBUG_ALL :
-        print( 'Runoff data start: ',str(dates[ start_i ]),str( start_i ), 
-               ' end: ',             str(dates[ end_i   ]),str( end_i ) )
-        print( rows[ start_i ] )
-        print( rows[ end_i ] )
-
-    # The runoff_stage_data is a nested dictionary intended to minimize
-    # dictionary key lookups to access basin stage for a 
-    # specific year month day. The key is an integer 3-tuple of
-    # ( Year, Month, Day ), values are { station : stage }.
-
-    # Populate only data needed for the simulation timeframe
-    for i in range( start_i, end_i + 1 ) :
-        row   = rows[ i+1 ]
-        words = row.split(',')
+        if model.args.DEBUG_ALL :
+            print( 'Runoff data start: ',str(dates[ start_i ]),str( start_i ), 
+                   ' end: ',             str(dates[ end_i   ]),str( end_i ) )
+            print( values[ start_i ] )
+            print( values[ end_i ] )
 
-        station_stage = dict()
+        # The runoff_stage_data is a nested dictionary intended to minimize
+        # dictionary key lookups to access basin stage for a 
+        # specific year month day. The key is an integer 3-tuple of
+        # ( Year, Month, Day ), values are { station : stage }.
 
-        for j in range( 1, len( words ) ) :
-            station_stage[ stations[ j-1 ] ] = float( words[ j ] )
+        # Populate only data needed for the simulation timeframe
+        for i in range( start_i, end_i + 1 ) :
+            station_stage = dict( zip( stations, values[ i ].tolist() ) )
                 
-        date = dates[ i ]
-        key = ( date.year, date.month, date.day )
+            date = dates[ i ]
+            key = ( date.year, date.month, date.day )
+
+            model.runoff_stage_data[ key ] = station_stage
 
-        model.runoff_stage_data[ key ] = station_stage
+    LoadedDays( model, 'Runoff', [ file_name ], model.runoff_stage_data )
             
     if model.args.DEBUG_ALL :
         print( model.runoff_stage_basins )
@@ -1044,60 +1326,59 @@ def GetBasinDynamicBCData( model ):
                      model.args.basinBCFile + '\n'
             raise Exception( errMsg )
             
-        # Load flow or stage data into the appropriate dictionary
-        # The csv file has 2 columns, 1 = YYYY-MM-DD, 2 = value
-        # first row is header
-        fd   = open( path_join(model.args.path, bc_file), 'r' )
-        rows = fd.readlines()
-        fd.close()
-
-        # Create list of datetimes
-        dates = []
-        for i in range( 1, len( rows ) ) :  # Skip the header
-            row   = rows[ i ]
-            words = row.split(',')
-            dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
-
-        # Find index in dates for start_time & end_time
-        start_i, end_i = GetTimeIndex( 'BC ' + data_type, dates, 
-                                       model.start_time, model.end_time )
-        
-        if model.args.DEBUG_ALL :
-            print( data_type, 
-                   ' BC data start: ', str(dates[start_i]),str(start_i), 
-                   ' end: ',           str(dates[ end_i ]),str( end_i ) )
-            print( rows[ start_i ] )
-            print( rows[ end_i   ] )
-
         # The dynamic_*_boundary is a nested dictionary intended to minimize
         # dictionary key lookups to access basin stage for a 
         # specific year month day. The key is a Basin object,
         # values are { ( Year, Month, Day ), : volume or head }.
-        basin_BC_map = dict() # { ( Year, Month, Day ) : bc_value }
-
-        # Populate only data needed for the simulation timeframe
-        for i in range( start_i, end_i + 1 ) :
-            row   = rows[ i+1 ]
-            words = row.split(',')
-
-            basin_value = dict()
-
-            bc_value = float( words[ 1 ] )
+        if data_type == 'flow' :
+            boundary = model.dynamic_flow_boundary
+        elif data_type == 'stage' :
+            boundary = model.dynamic_head_boundary
+
+        # { ( Year, Month, Day ) : bc_value } of a previous window
+        basin_BC_map = boundary.get( Basin, dict() )
+
+        file_name = path_join( model.args.path, bc_file )
+        name      = 'BC ' + data_type + ' ' + str( basin_num )
+
+        # Days of the time window not loaded for a previous window
+        missing = MissingDays( model, name, [ file_name ], basin_BC_map )
+
+        if missing :
+            # Load flow or stage data into the appropriate dictionary
+            # The csv file has 2 columns, 1 = YYYY-MM-DD, 2 = value
+            # first row is header
+            dates, columns, values = forcing.ReadDailyData( model, file_name )
+
+        for first_day, last_day in missing :
+            # Find index in dates for the first & last day
+            start_i, end_i = GetTimeIndex( 'BC ' + data_type, dates, 
+                                           first_day, last_day )
+        
+            if model.args.DEBUG_ALL :
+                print( data_type, 
+                       ' BC data start: ', str(dates[start_i]),str(start_i), 
+                       ' end: ',           str(dates[ end_i ]),str( end_i ) )
+                print( values[ start_i ] )
+                print( values[ end_i   ] )
+
+            # Populate only data needed for the simulation timeframe
+            for i in range( start_i, end_i + 1 ) :
+                bc_value = float( values[ i, 0 ] )
                 
-            date = dates[ i ]
-            key  = ( date.year, date.month, date.day )
+                date = dates[ i ]
+                key  = ( date.year, date.month, date.day )
 
-            # flow assumed to be cfs, convert to timestep volume
-            if data_type == 'flow' :
-                bc_value = bc_value * model.timestep
+                # flow assumed to be cfs, convert to timestep volume
+                if data_type == 'flow' :
+                    bc_value = bc_value * model.timestep
 
-            basin_BC_map[ key ] = bc_value
+                basin_BC_map[ key ] = bc_value
 
-            if data_type == 'flow' :
-                model.dynamic_flow_boundary[ Basin ] = basin_BC_map
+        LoadedDays( model, name, [ file_name ], basin_BC_map )
 
-            elif data_type == 'stage' :
-                model.dynamic_head_boundary[ Basin ] = basin_BC_map
+        if basin_BC_map :
+            boundary[ Basin ] = basin_BC_map
 
     if model.args.DEBUG_ALL :
         print( model.dynamic_flow_boundary )
@@ -1173,73 +1454,64 @@ def GetBasinStageData( model ):
     if model.args.DEBUG_ALL :
         print( '\n-> GetBasinStageData', flush = True )
 
-    # The csv file has 21 columns, 1 = YYYY-MM-DD
-    # 2 - 21 = Daily mean stage at:
-    # BK, BA, BN, BS, DK, GB, HC, JK, LB, LM, LR, LS,
-    # MK, PK, TC, TR, WB, TP, MD, MB
-    # first row is header
-    try :
-        fd = open( path_join(model.args.path, model.args.basinStage), 'r' )
-        rows = fd.readlines()
-        fd.close()
+    file_name = path_join( model.args.path, model.args.basinStage )
 
-    except OSError as err :
-        msg = "\nGetBasinStageData: OS error: {0}\n".format( err )
-        model.gui.Message( msg )
-        return
+    # Days of the time window not loaded for a previous window
+    missing = MissingDays( model, 'Stage', [ file_name ], model.stage_data )
 
-    # Create list of station names in the order of the header/columns
-    if len( model.stage_stations ) == 0 :
-        words = rows[ 0 ].split(',')
+    if missing :
+        # The csv file has 21 columns, 1 = YYYY-MM-DD
+        # 2 - 21 = Daily mean stage at:
+        # BK, BA, BN, BS, DK, GB, HC, JK, LB, LM, LR, LS,
+        # MK, PK, TC, TR, WB, TP, MD, MB
+        # first row is header
+        try :
+            dates, columns, values = forcing.ReadDailyData( model, file_name )
 
-        for i in range( 1, len( words ) ) :  # Skip the time column
-            word = words[ i ].strip()
-            model.stage_stations.append( word.strip('"') )
+        except OSError as err :
+            msg = "\nGetBasinStageData: OS error: {0}\n".format( err )
+            model.gui.Message( msg )
+            return
 
-    # Create list of datetimes
-    dates = []
-    for i in range( 1, len( rows ) ) :
-        row   = rows[ i ]
-        words = row.split(',')
-        dates.append( strptime( words[ 0 ], '%Y-%m-%d' ) )
+        # Create list of station names in the order of the header/columns
+        if len( model.stage_stations ) == 0 :
+            for column in columns :
+                model.stage_stations.append( column.strip('"') )
 
-    # Find index in dates for start_time & end_time
-    start_i, end_i = GetTimeIndex( 'Stage', dates, 
-                                   model.start_time, model.end_time )        
+    for first_day, last_day in missing :
+        # Find index in dates for the first & last day
+        start_i, end_i = GetTimeIndex( 'Stage', dates, first_day, last_day )
 
-    if model.args.DEBUG_ALL :
-        print( 'Stage data start: ', 
-                str( dates[ start_i ] ),str( start_i ), 
-                ' end: ', str( dates[ end_i   ] ),str( end_i ) )
-        print( rows[ start_i ] )
-        print( rows[ end_i ] )
-
-    # The stage_data is a nested dictionary intended to minimize
-    # dictionary key lookups to access stage for a 
-    # specific year month day. The key is an integer 3-tuple of
-    # ( Year, Month, Day ), values are a stage_salinity dictionary.
-    if model.stage_data :
-        model.stage_data.clear()
-
-    # Populate only data needed for the simulation timeframe
-    for i in range( start_i, end_i + 1 ) :
-        row   = rows[ i+1 ]
-        words = row.split(',')
+        if model.args.DEBUG_ALL :
+            print( 'Stage data start: ', 
+                    str( dates[ start_i ] ),str( start_i ), 
+                    ' end: ', str( dates[ end_i   ] ),str( end_i ) )
+            print( values[ start_i ] )
+            print( values[ end_i ] )
 
-        station_stage = dict()
+        # The stage_data is a nested dictionary intended to minimize
+        # dictionary key lookups to access stage for a 
+        # specific year month day. The key is an integer 3-tuple of
+        # ( Year, Month, Day ), values are a stage_salinity dictionary.
 
-        for j in range( 1, len( words ) ) :
-            if 'NA' in words[ j ].strip() :
-                stage = None
-            else :
-                stage = float( words[ j ] )
+        # Populate only data needed for the simulation timeframe
+        for i in range( start_i, end_i + 1 ) :
+            station_stage = dict()
+
+            for j, value in enumerate( values[ i ].tolist() ) :
+                if value != value : # NA
+                    stage = None
+                else :
+                    stage = value
 
-            station_stage[ model.stage_stations[ j-1 ] ] = stage
+                station_stage[ model.stage_stations[ j ] ] = stage
                 
-        date = dates[ i ]
-        key  = ( date.year, date.month, date.day )
+            date = dates[ i ]
+            key  = ( date.year, date.month, date.day )
+
+            model.stage_data[ key ] = station_stage
 
-        model.stage_data[ key ] = station_stage
+    LoadedDays( model, 'Stage', [ file_name ], model.stage_data )
         
     if model.args.DEBUG_ALL :
         print( model.stage_data )
@@ -1333,11 +1605,13 @@ def CreateShoals( model ):
     # Make a map of shoal numbers/xy points from shapefile records 
     # 'Line_Numbe' field which is the first element of the field field[0]
     # ['Line_Numbe', 'N', 16, 6]
-    # This is used below to assign the line_xy to each Shoal object
-    sf_shoals = shapefile.Reader( model.args.shoalShapeFile )
+    # This is used below to assign the line_xy to each Shoal object.
+    # The points are None with -ng unless -gm, see geometry.py
+    shoal_records, shapes, render = geometry.ReadShapefile( model,
+                                        model.args.shoalShapeFile )
     shoal_xy_map = dict()
-    for record, shape in zip( sf_shoals.records(), sf_shoals.shapes() ) :
-        shoal_xy_map[ int( record[0] ) ] = nparray( shape.points )
+    for record, line_xy, render_xy in zip( shoal_records, shapes, render ) :
+        shoal_xy_map[ int( record[0] ) ] = ( line_xy, render_xy )
 
     # The csv file has 14 columns, 1 = shoal number, 2 = shoal width,
     # 3 - 12 = length at each depth, 13 = land length, 14 = Mannings
@@ -1413,7 +1687,7 @@ def CreateShoals( model ):
         # Save the line_xy from the shapefile map above
         # Note that shoals 1 - 6 are not in the shapefile records above
         if shoalNumber in shoal_xy_map.keys() :
-            shoal.line_xy = shoal_xy_map[ shoalNumber ]
+            shoal.line_xy, shoal.render_xy = shoal_xy_map[ shoalNumber ]
 
         model.Shoals[ shoalNumber ] = shoal
 
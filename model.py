@@ -9,19 +9,22 @@ from datetime    import timedelta, datetime
 from collections import OrderedDict as odict
 from threading   import Thread, Condition, Event
 from math        import exp
-import tkinter as Tk
 
 strptime = datetime.strptime
 
-# Community modules
-from scipy import interpolate
-
 # Local modules 
 import init
 import basins
 import shoals
 import hydro
-import gui
+import hydro_vector
+import hydro_numba
+import network
+import output
+import checkpoint
+import adaptive
+import forcing
+import profiling
 import constants
 
 #---------------------------------------------------------------
@@ -47,12 +50,14 @@ class Model:
         self.unix_time           = None
         self.timestep            = args.timestep      # -t  (s)
         self.timestep_per_day    = 24 * 3600 / self.timestep 
+        self.adaptive_timestep   = None               # -at
         self.max_iteration       = args.max_iteration # -it 
         self.velocity_tol        = args.velocity_tol  # -vt (m/s)
 
         # Data containers and maps
         self.times               = []     # array of datetimes
         self.record_variables    = []     # variables to plot/record
+                                          # set by gui.InitPlotVars
         self.rain_data           = dict() # { (year,month,day) : {station:rain}}
         self.et_data             = dict() # { (year,month,day) : pet }
         self.temperature_data    = dict() # { (year,month,day) : pet }
@@ -65,15 +70,31 @@ class Model:
         self.dynamic_flow_boundary=dict() # { Basin : { (year,month,day):vol  }}
         self.dynamic_head_boundary=dict() # { Basin : { (year,month,day):head }}
         self.seasonal_MSL_splrep = None   # scipy spline representation 
-        self.seasonal_MSL        = 0      # value at current time
+        self.daily_forcing       = None   # forcing.DailyForcing arrays
+        self.seasonal_MSL        = 0.     # value at current time
+        self.tide_levels         = None   # init.GetTideMatrix (-tm)
+        self.tide_times          = None   # 
+        self.tide_MSL            = None   # 
+        self.tide_columns        = None   # { basin number : column }
         self.salinity_stations   = []     # [ gauge IDs ]
         self.stage_stations      = []     # [ gauge IDs ]
+        self.observations        = forcing.Observations( self ) # -bs -sf
+        self.loaded_days         = dict() # init.MissingDays of the stores
 
         # Convert -S -E args into start_time, end_time datetime objects
         self.GetStartStopTime()
 
+        # Scratch arrays of the Basin variables (scratch.py) created
+        # in init.CreateBasinsFromShapefile
+        self.basin_scratch = None
+
+        # Basin output records array (records.py), Basin.plot_variables
+        # are views of it, created with the basin_scratch
+        self.records = None
+
         # Create dictionary of Basin objects from shapefile (-b)
-        self.Basins = dict() # { basin_number : Basin }
+        self.Basins     = dict() # { basin_number : Basin }
+        self.hypsometry = None   # Area, volume vs stage tables (-bd)
         init.CreateBasinsFromShapefile( self ) # and add boundary basins
         init.GetBasinAreaDepths( self )  # -bd
         init.GetBasinParameters( self )  # -bp
@@ -83,6 +104,20 @@ class Model:
         init.CreateShoals( self )
         init.GetShoalParameters( self ) # -sp
 
+        # Shoal network incidence matrix and flat (shoal, depth) arrays
+        # for the vectorized solvers (-ss numpy numba, -mt sparse)
+        self.network      = None
+        self.shoal_arrays = None
+        if args.shoalSolver in [ 'numpy', 'numba' ] or \
+           args.massTransport == 'sparse' or \
+           args.adaptiveTimestep or args.stageSolver == 'implicit' :
+            self.network      = network.ShoalNetwork( self )
+            self.shoal_arrays = hydro_vector.ShoalArrays( self )
+
+        # Timestep of each step from the shoal flows (-at), adaptive.py
+        if args.adaptiveTimestep :
+            self.adaptive_timestep = adaptive.AdaptiveTimestep( self )
+
         # Simulation update intervals for gui and data output
         self.timeLabelUpdate = timedelta( days = 0, hours = 1, 
                                           minutes = 0, seconds = 0 )
@@ -100,8 +135,17 @@ class Model:
         # Event object to signal gui thread to canvas.draw()
         self.CanvasDrawEvent = Event()
 
+        # gui.GUI or console.Console (-ng), see Notes.py
         self.gui = None
 
+        # Checkpoint restored by the next ModelLoop (-rs), see checkpoint.py
+        self.restart_file       = args.restart
+        self.checkpointInterval = timedelta( hours = args.checkpointInterval )
+
+        # Phase timing and Manning iterations of ModelLoop (-pf)
+        self.profile = profiling.Profile( self ) if args.profile else \
+                       profiling.NoProfile()
+
     #-----------------------------------------------------------
     #
     #-----------------------------------------------------------
@@ -169,32 +213,17 @@ class Model:
                 self.gui.Message( msg )
                 return
 
-        #----------------------------------------------------------------
         # Set appropriate legend and data type for basin.SetBasinMapColor 
-        # called for map plot updates below
+        # called for map plot updates
         if not self.args.noGUI :
-            mapPlotVariable = self.gui.mapPlotVariable.get()
-
-            legend_bounds = None
-
-            if mapPlotVariable not in constants.BasinMapPlotVariable :
-                msg='ModelLoop Error: Invalid map plot variable, using Stage.\n'
-                self.gui.Message( msg )
-                mapPlotVariable = 'Stage'
-                legend_bounds   = self.args.stage_legend_bounds
-
-            if mapPlotVariable == 'Salinity' :
-                legend_bounds = self.args.salinity_legend_bounds
-
-            elif mapPlotVariable == 'Stage' : 
-                legend_bounds = self.args.stage_legend_bounds
+            self.gui.MapPlotVariable()
 
-            else :
-                msg = 'ModelLoop Error: ', mapPlotVariable, \
-                      'not yet supported for map, showing Stage.\n'
-                self.gui.Message( msg )
-                mapPlotVariable = 'Stage'
-                legend_bounds   = self.args.stage_legend_bounds
+        # Restore the model state from a checkpoint (-rs)
+        restored_records = False
+        if self.restart_file :
+            restored_records = checkpoint.ReadCheckpoint( self,
+                                                          self.restart_file )
+            self.restart_file = None
 
         #-----------------------------------------------------------
         run_start_time = time()
@@ -204,12 +233,21 @@ class Model:
         self.gui.Message( msg )
 
         # Copy initial values to the data logs
-        self.times.append( self.current_time )
-        for Basin in self.Basins.values() :
-            Basin.CopyDataRecord()
+        if not restored_records :
+            self.times.append( self.current_time )
+            self.records.CopyDataRecord()
+            if self.records.Full() : # -oc -or
+                output.FlushOutput( self )
  
         zero_timedelta = timedelta() # timedelta() = zero delta time
 
+        if self.adaptive_timestep :
+            self.adaptive_timestep.Reset()
+
+        # Phase timing (-pf), see profiling.py
+        profile = self.profile
+        profile.Reset()
+
         #------------------------------------------------------------
         # Simulation loop
         #------------------------------------------------------------
@@ -228,83 +266,111 @@ class Model:
             if self.state == self.status.Halted :
                 break
 
+            # Timestep of this step (-at)
+            if self.adaptive_timestep :
+                self.SetTimestep( self.adaptive_timestep.Next() )
+
             # Advance time
-            self.current_time = self.current_time + \
-                                timedelta( seconds = self.timestep )
+            step = timedelta( seconds = self.timestep )
+
+            self.current_time = self.current_time + step
 
             self.unix_time += self.timestep
 
             timeDelta = ( self.current_time - self.start_time )
 
+            profile.steps += 1
+
             # Update time on gui currentTimeLabel every self.timeLabelUpdate
             quotient, remainder = divmod( timeDelta, self.timeLabelUpdate )
-            if remainder == zero_timedelta :
-                if not self.args.noGUI :
-                    self.gui.current_time_label.set(str(self.current_time))
-                    
-                    if self.args.noThread :
-                        self.gui.canvas.draw() # safe to call from this thread
-                    else :
-                        # Cannot call canvas.draw() from separate thread!
-                        # Signal event to mainloop thread to DrawCanvas()
-                        self.CanvasDrawEvent.set()
-                    
-                else :
-                    print( str( self.current_time ) )
+            if remainder < step :
+                with profile( 'GUI' ) :
+                    self.gui.TimeUpdate()
 
-            # Tuple used as lookup key for daily rain, ET, salinity, runoff
-            key = ( self.current_time.year,
-                    self.current_time.month,
-                    self.current_time.day )
+            # Daily rain, ET, salinity, runoff rows of the current day
+            forcing = self.daily_forcing
+            forcing.Update( self.current_time )
 
             # Setup basins for this timestep
-            self.BoundaryConditions( key )
-            self.GetSalinity       ( key )
-            self.GetTides          ( self.unix_time )
-            self.GetRain           ( key )
-            self.GetTemperature    ( key )
-            self.GetET             ( key )
-            self.GetRunoff         ( key )
+            with profile( 'BoundaryConditions' ) :
+                self.BoundaryConditions( forcing )
+            with profile( 'GetSalinity' ) :
+                self.GetSalinity( forcing )
+            with profile( 'GetTides' ) :
+                self.GetTides( self.unix_time )
+            with profile( 'GetRain' ) :
+                self.GetRain( forcing )
+            with profile( 'GetTemperature' ) :
+                self.GetTemperature( forcing )
+            with profile( 'GetET' ) :
+                self.GetET( forcing )
+            with profile( 'GetRunoff' ) :
+                self.GetRunoff( forcing )
 
             # Solve basin transport/stage
-            hydro.ShoalVelocities( self )
-            hydro.MassTransport  ( self )
-            hydro.Depths         ( self )
+            with profile( 'ShoalVelocities' ) :
+                if self.args.shoalSolver == 'numpy' :
+                    hydro_vector.ShoalVelocities( self )
+                elif self.args.shoalSolver == 'numba' :
+                    hydro_numba.ShoalVelocities( self )
+                else :
+                    hydro.ShoalVelocities( self )
+            with profile( 'MassTransport' ) :
+                if self.args.massTransport == 'sparse' or \
+                   self.args.stageSolver   == 'implicit' :
+                    hydro_vector.MassTransport( self )
+                else :
+                    hydro.MassTransport( self )
+            with profile( 'Depths' ) :
+                hydro.Depths( self )
 
             # Display map update every timeMapUpdate interval or at sim end
             if not self.args.noGUI :
                 quotient, remainder = divmod( timeDelta, self.timeMapUpdate )
-                if remainder == zero_timedelta or \
+                if remainder < step or \
                    self.current_time == self.end_time :
-
-                    for Basin in self.Basins.values() :
-                        if not Basin.boundary_basin :
-                            Basin.SetBasinMapColor( mapPlotVariable, 
-                                                    legend_bounds )
-
-                    self.gui.current_time_label.set( str( self.current_time ) )
-                    self.gui.RenderBasins()
-                    if self.args.noThread :
-                        self.gui.canvas.draw() # safe to call from this thread
-                    else :
-                        # Cannot call canvas.draw() from separate thread!
-                        # Signal event to mainloop thread to DrawCanvas()
-                        self.CanvasDrawEvent.set()
+                    with profile( 'GUI' ) :
+                        self.gui.MapUpdate()
 
             # Transfer data values to records for plots & file output
             quotient, remainder = divmod( timeDelta, self.outputInterval )
             if remainder == zero_timedelta or \
                self.current_time == self.end_time :
                 # Store datetime reference
-                self.times.append( self.current_time )
-
-                for Basin in self.Basins.values() :
-                    Basin.CopyDataRecord()
+                with profile( 'CopyDataRecord' ) :
+                    self.times.append( self.current_time )
+                    self.records.CopyDataRecord()
+
+                # Write the chunk of records
+                if self.records.Full() : # -oc -or
+                    with profile( 'WriteOutput' ) :
+                        output.FlushOutput( self )
+
+            # Write a checkpoint every checkpointInterval (-cp -ci)
+            if self.args.checkpoint and self.args.checkpointInterval :
+                quotient, remainder = divmod( timeDelta,
+                                              self.checkpointInterval )
+                if remainder == zero_timedelta :
+                    with profile( 'Checkpoint' ) :
+                        checkpoint.WriteCheckpoint( self )
 
         #------------------------------------------------------------
         # End Simulation loop
         #------------------------------------------------------------
 
+        # Copy the solution of the vectorized shoal solvers to the Shoals
+        if self.shoal_arrays and not self.shoal_arrays.shared :
+            self.shoal_arrays.Scatter()
+
+        if self.adaptive_timestep :
+            self.gui.Message( self.adaptive_timestep.Summary() )
+            self.SetTimestep( self.args.timestep )
+
+        # Checkpoint at the end of the run or when stopped (-cp)
+        if self.args.checkpoint :
+            with profile( 'Checkpoint' ) :
+                checkpoint.WriteCheckpoint( self )
+
         # Track simulation elapsed time
         self.state = self.status.Finished
 
@@ -321,8 +387,11 @@ class Model:
         self.gui.Message( msg )
 
         # Write output
-        for Basin in self.Basins.values() :
-            Basin.WriteData()
+        with profile( 'WriteOutput' ) :
+            output.WriteOutput( self )
+
+        if profile.enabled :
+            profile.Write()
 
         try :
             fd = open( path_join(self.args.basinOutputDir,
@@ -338,6 +407,15 @@ class Model:
 
         self.gui.Message( ' Finished.\n' )
         
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def SetTimestep( self, timestep ):
+        '''Set the timestep (s) of the next step (-at)'''
+
+        self.timestep         = timestep
+        self.timestep_per_day = 24 * 3600 / self.timestep 
+
     #-----------------------------------------------------------
     #
     #-----------------------------------------------------------
@@ -353,11 +431,27 @@ class Model:
         # from other threads.  Check twice-per-second. 
         self.gui.Tk_root.after( 500, self.DrawCanvas ) # Re-register callback
             
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def SetRecordVariables( self, variables ):
+        '''Set the record_variables copied into the basin.plot_variables
+        by records.CopyDataRecord, and reset the records.
+        Called from gui.InitPlotVars, gui.SetRecordVariables and
+        console.InitPlotVars.'''
+
+        self.record_variables = [ plotVariable for plotVariable in
+                                  constants.BasinPlotVariable
+                                  if plotVariable in variables ]
+
+        self.records.Init()
+
     #----------------------------------------------------------------
     # 
     #----------------------------------------------------------------
-    def GetRain( self, key ):
-        '''Add rain volume to the basin'''
+    def GetRain( self, forcing ):
+        '''Add rain volume to the non-boundary basins. The scaled rain
+        of the basin rain stations is aggregated in forcing.DailyForcing'''
 
         if self.args.DEBUG_ALL :
             print( '\n-> GetRain', flush = True )
@@ -365,43 +459,44 @@ class Model:
         if self.args.noRain :
             return
 
-        station_rain_map = self.rain_data[ key ]
-
-        for Basin in self.Basins.values() :
-            if Basin.boundary_basin :
-                continue
+        basin_scratch = self.basin_scratch
+        basins        = forcing.basins # Basin.index of non-boundary basins
 
-            rain_cm_day = 0
+        basin_scratch.Gather( [ 'area', 'water_volume' ], basins )
 
-            # JP instead of aggregating here, do in init?
-            # Accumulate scaled rain from stations
-            for rain_station, scale in zip( Basin.rain_stations, 
-                                            Basin.rain_scales ) :
-                rain_cm_day += station_rain_map[ rain_station ] * scale
+        rain_volume_day = forcing.rain_m_day[ basins ] * \
+                          basin_scratch.area[ basins ]
 
-            rain_volume_day = ( rain_cm_day / 100 ) * Basin.area
+        rain_volume_t   = rain_volume_day / self.timestep_per_day
 
-            rain_volume_t   = rain_volume_day / self.timestep_per_day
+        basin_scratch.rainfall    [ basins ]  = rain_volume_t
+        basin_scratch.water_volume[ basins ] += rain_volume_t
 
-            Basin.rainfall  = rain_volume_t
-
-            Basin.water_volume += rain_volume_t
+        basin_scratch.Scatter( [ 'rainfall', 'water_volume' ], basins )
 
     #----------------------------------------------------------------
     # 
     #----------------------------------------------------------------
-    def GetTemperature( self, key ):
+    def GetTemperature( self, forcing ):
         '''Get water temperature for basin, but only if the noET_Amplify
            option is not specified (-na) and the basin ET Amplify field 
-           is True in Basin_Parameters.csv'''
+           is True in Basin_Parameters.csv. 
+
+           On the first timestep of a day, set the forcing.et_factor 
+           of the basins from the VaporPressureRatio of the basin 
+           temperature.'''
 
         if self.args.DEBUG_ALL :
             print( '\n-> GetTemperature', flush = True )
 
+        if not forcing.new_day :
+            return
+
         if self.args.noET_Amplify :
+            forcing.et_factor.fill( 1 )
             return
 
-        temperature = self.temperature_data[ key ]
+        temperature = forcing.temperature_day
 
         for Basin in self.Basins.values() :
             if Basin.boundary_basin :
@@ -409,12 +504,21 @@ class Model:
 
             if Basin.ET_amplify :
                 Basin.temperature = temperature
+
+            kinetic_ET_factor = 1
+
+            if Basin.temperature :
+                kinetic_ET_factor = self.VaporPressureRatio( \
+                                         Basin.temperature )
+
+            forcing.et_factor[ Basin.index ] = kinetic_ET_factor
             
     #----------------------------------------------------------------
     # 
     #----------------------------------------------------------------
-    def GetET( self, key ):
-        '''Subtract ET volume from basin'''
+    def GetET( self, forcing ):
+        '''Subtract ET volume from the non-boundary basins, amplified 
+        by forcing.et_factor, see GetTemperature'''
 
         if self.args.DEBUG_ALL :
             print( '\n-> GetET', flush = True )
@@ -422,27 +526,21 @@ class Model:
         if self.args.noET :
             return
 
-        et_mm_day = self.et_data[ key ]
+        basin_scratch = self.basin_scratch
+        basins        = forcing.basins # Basin.index of non-boundary basins
 
-        for Basin in self.Basins.values() :
-            if Basin.boundary_basin :
-                continue
-
-            kinetic_ET_factor = 1
+        basin_scratch.Gather( [ 'area', 'water_volume' ], basins )
 
-            if not self.args.noET_Amplify :
-                if Basin.temperature :
-                    kinetic_ET_factor = self.VaporPressureRatio( \
-                                             Basin.temperature )
+        et_volume_day = ( forcing.et_day / 1000 ) *\
+                        basin_scratch.area[ basins ] * self.args.ET_scale *\
+                        forcing.et_factor[ basins ]
 
-            et_volume_day = ( et_mm_day / 1000 ) * Basin.area * \
-                            self.args.ET_scale * kinetic_ET_factor
+        et_volume_t = et_volume_day / self.timestep_per_day
 
-            et_volume_t = et_volume_day / self.timestep_per_day
+        basin_scratch.evaporation [ basins ]  = et_volume_t
+        basin_scratch.water_volume[ basins ] -= et_volume_t
 
-            Basin.evaporation = et_volume_t
-
-            Basin.water_volume -= et_volume_t
+        basin_scratch.Scatter( [ 'evaporation', 'water_volume' ], basins )
             
     #----------------------------------------------------------------
     # 
@@ -471,17 +569,16 @@ class Model:
     #----------------------------------------------------------------
     # 
     #----------------------------------------------------------------
-    def GetRunoff( self, key ):
+    def GetRunoff( self, forcing ):
         '''Add runoff flow volume from EDEN : Basin stage flow'''
 
         if self.args.DEBUG_ALL :
             print( '\n-> GetRunoff', flush = True )
 
         if not self.args.noStageRunoff :
-            basin_stage_map = self.runoff_stage_data[ key ]
-
-            for Basin, EDEN_station in self.runoff_stage_basins.items() :
-                Basin.water_level = basin_stage_map[ EDEN_station ]
+            for Basin, stage in zip( forcing.runoff_basins,
+                                     forcing.runoff_stage_day ) :
+                Basin.water_level = stage
 
     #-----------------------------------------------------------
     #
@@ -493,11 +590,27 @@ class Model:
         if self.args.DEBUG_ALL :
             print( '-> GetTides' )
 
+        # Row of the precomputed tide matrix (-tm)
+        if self.tide_levels is not None :
+            step = int( round( ( unix_time - self.tide_times[ 0 ] ) /
+                               self.args.timestep ) )
+
+            if 0 <= step < len( self.tide_times ) and \
+               self.tide_times[ step ] == unix_time :
+                self.seasonal_MSL = self.tide_MSL[ step ]
+                levels = self.tide_levels[ step ].tolist()
+                for number, column in self.tide_columns.items() :
+                    self.Basins[ number ].water_level = levels[ column ]
+                return
+
         # Get the seasonal mean sea level anomaly
         try :
             if self.args.noMeanSeaLevel :
-                self.seasonal_MSL = 0
+                self.seasonal_MSL = 0.
             else :
+                # Imported on first use, not by runs without tides
+                from scipy import interpolate
+
                 self.seasonal_MSL = interpolate.splev( unix_time, 
                                                        self.seasonal_MSL_splrep,
                                                        der = 0 ).round( 3 )
@@ -507,14 +620,14 @@ class Model:
                    str( unix_time ) + ']  ' + err
             self.gui.Message( msg )
 
-            self.seasonal_MSL = 0
+            self.seasonal_MSL = 0.
 
         # Get the tidal value for each boundary basin
         for Basin in self.Basins.values() :
             if Basin.boundary_basin :
                 try :
                     if self.args.noTide :
-                        wl = 0
+                        wl = 0.
                     else :
                         # Note this returns a numpy array, but we have 
                         # appended floats to a list for other plot_variable
@@ -529,7 +642,7 @@ class Model:
                            str( unix_time ) + ']  ' + err
                     self.gui.Message( msg )
                     
-                    wl = 0
+                    wl = 0.
 
                 wl += self.seasonal_MSL
                 
@@ -538,30 +651,25 @@ class Model:
     #----------------------------------------------------------------
     # 
     #----------------------------------------------------------------
-    def GetSalinity( self, key ):
-        '''Set basin salinity from data'''
+    def GetSalinity( self, forcing ):
+        '''Set basin salinity from data : boundary basins with a
+        salinity station and basins with salinity_from_data'''
 
         if self.args.DEBUG_ALL :
             print( '\n-> GetSalinity', flush = True )
 
-        if not self.salinity_data :
+        if forcing.salinity is None :
             return
 
-        station_salinity_map = self.salinity_data[ key ]
-
-        for Basin in self.Basins.values() :
-            if Basin.boundary_basin :
-                if Basin.salinity_station :
-                    Basin.salinity = \
-                        station_salinity_map[ Basin.salinity_station ]
+        salinity_day = forcing.salinity_day # [ Basin.index ]
 
-            elif Basin.salinity_from_data :
-                Basin.salinity = station_salinity_map[ Basin.salinity_station ]
+        for Basin in forcing.salinity_basins :
+            Basin.salinity = salinity_day[ Basin.index ]
 
     #-----------------------------------------------------------
     #
     #-----------------------------------------------------------
-    def BoundaryConditions( self, key ):
+    def BoundaryConditions( self, forcing ):
         '''Set additional basin flow, or stage value'''
 
         if self.args.DEBUG_ALL :
@@ -584,22 +692,21 @@ class Model:
         # Dynamic timeseries flow or head (-db) from the -bc file
         if not self.args.noDynamicBoundaryConditions :
 
-            # Flow (volume) BC's
-            if self.dynamic_flow_boundary :
-                for Basin, basin_BC_map in self.dynamic_flow_boundary.items() :
-                    # Convert from cfs to m^3/s
-                    cubic_feet_second  = basin_BC_map[ key ]
-                    cubic_meter_second = cubic_feet_second * 0.028317
-                    # Convert to volume per timestep
+            # Flow (volume) BC's : cfs converted to m^3/s in 
+            # forcing.DailyForcing, convert to volume per timestep
+            if forcing.bc_flow is not None :
+                for Basin, cubic_meter_second in zip( forcing.flow_basins,
+                                                      forcing.bc_flow_day ) :
                     volume_t = cubic_meter_second * self.timestep
 
                     Basin.runoff_BC     = volume_t
                     Basin.water_volume += volume_t
 
             # Stage BC's
-            if self.dynamic_head_boundary :
-                for Basin, basin_BC_map in self.dynamic_head_boundary.items() :
-                    Basin.water_level = basin_BC_map[ key ]
+            if forcing.bc_head is not None :
+                for Basin, head in zip( forcing.head_basins,
+                                        forcing.bc_head_day ) :
+                    Basin.water_level = head
 
     #-----------------------------------------------------------
     #
@@ -0,0 +1,169 @@
+'''Shoal network topology for the Bay Assessment Model (BAM)
+
+The basins and shoals form a graph: basins are nodes, each flowing shoal
+is an edge from Basin_A to Basin_B. The graph is held as a signed sparse
+incidence matrix so that per-shoal transfers can be accumulated into the
+basins with a single matrix-vector product.
+
+With the stageSolver option (-hs implicit) the shoal flows of a timestep
+are corrected by ImplicitFlow() for the stage changes of the timestep:
+the flow of each shoal is linearized in the stage difference of its
+basins and the basin stage changes are solved as a sparse linear system
+over the network.'''
+
+# Community modules
+from numpy import array as nparray
+from numpy import ones  as npones
+from numpy import zeros as npzeros
+from numpy import abs   as npabs
+from numpy import maximum, where
+# scipy.sparse is imported by the ShoalNetwork of the solvers that use it
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class ShoalNetwork:
+    '''Shoals that are not no_flow and connect two basins. Element j of
+    the shoal arrays corresponds to Shoals[ j ].
+
+    incidence is the ( basin, shoal ) matrix with -1 at ( Basin_A, j )
+    and +1 at ( Basin_B, j ), rows are indexed by Basin.index. For a
+    vector of volumes transferred A -> B on each shoal, incidence @
+    volume is the volume change of each basin.'''
+
+    def __init__( self, model ):
+
+        self.model = model
+
+        basin_scratch = model.basin_scratch
+
+        self.Shoals  = [] # Shoal objects of the network
+        self.numbers = [] # shoal numbers, keys of model.Shoals
+        basin_A      = [] # Basin_A.index
+        basin_B      = [] # Basin_B.index
+
+        for shoal_number, Shoal in model.Shoals.items() :
+
+            # If shoal boundary is land (width zero) no flow
+            if Shoal.no_flow :
+                continue
+
+            if Shoal.Basin_A is None or Shoal.Basin_B is None :
+                continue
+
+            self.Shoals.append( Shoal )
+            self.numbers.append( shoal_number )
+            basin_A.append( Shoal.Basin_A.index )
+            basin_B.append( Shoal.Basin_B.index )
+
+        self.n_shoals = len( self.Shoals )
+        self.n_basins = basin_scratch.capacity
+
+        self.basin_A = nparray( basin_A, dtype = int )
+        self.basin_B = nparray( basin_B, dtype = int )
+
+        # { Shoal : position in the shoal arrays }
+        self.shoal_index = { Shoal : j for j, Shoal in enumerate(self.Shoals) }
+
+        from scipy.sparse import csr_matrix
+
+        # Signed incidence matrix ( basin x shoal )
+        columns = list( range( self.n_shoals ) )
+
+        self.incidence = csr_matrix(
+            ( [ -1. ] * self.n_shoals + [ 1. ] * self.n_shoals,
+              ( basin_A + basin_B, columns + columns ) ),
+            shape = ( self.n_basins, self.n_shoals ) )
+
+        # Boundary basins are not updated by shoal transport
+        self.interior = npones( self.n_basins, dtype = bool )
+        for Basin in model.Basins.values() :
+            if Basin.boundary_basin :
+                self.interior[ Basin.index ] = False
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Accumulate( self, shoal_values ) :
+        '''Return the per-basin sum of shoal_values transferred A -> B:
+        the Basin_A value is reduced, the Basin_B value increased.
+        Boundary basins are 0.'''
+
+        basin_values = self.incidence.dot( shoal_values )
+
+        basin_values[ ~self.interior ] = 0
+
+        return basin_values
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Upwind( self, flow_sign, basin_values ) :
+        '''Return the value of the upstream basin of each shoal:
+        Basin_A where flow_sign is 1, Basin_B where -1, 0 where no flow'''
+
+        upwind = npzeros( self.n_shoals )
+
+        A_to_B = flow_sign > 0
+        B_to_A = flow_sign < 0
+
+        upwind[ A_to_B ] = basin_values[ self.basin_A[ A_to_B ] ]
+        upwind[ B_to_A ] = basin_values[ self.basin_B[ B_to_A ] ]
+
+        return upwind
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def ImplicitFlow( self, Q_total, timestep ) :
+        '''Return the semi-implicit shoal flows (m^3/s, A -> B) of the
+        timestep from the explicit flows Q_total of the basin levels at
+        the start of the timestep (-hs implicit).
+
+        The flow of shoal j is linearized in the level difference of its
+        basins, Q = Q_total + θ K ( Δh_A - Δh_B ) with the Manning flow
+        Q ∝ sqrt( h_A - h_B ) : K = |Q_total| / 2|h_A - h_B|, the level
+        difference bounded below by implicitHead (-hh). The level
+        changes Δh of the interior basins over the timestep Δt solve
+
+            ( area + θ Δt D K Dᵀ ) Δh = Δt D Q_total + ΔV
+
+        with D the incidence matrix and ΔV the rain, ET, runoff and
+        boundary volumes of the timestep. Boundary basin levels are
+        imposed : their Δh is 0. θ is the implicitTheta (-ht) weight,
+        1 is backward Euler.'''
+
+        model         = self.model
+        basin_scratch = model.basin_scratch
+        theta         = model.args.implicitTheta
+
+        from scipy.sparse import diags
+        from scipy.sparse.linalg import spsolve
+
+        # Basin variables gathered by hydro_vector.MassTransport
+        level = basin_scratch.water_level
+        area  = basin_scratch.area
+
+        head = maximum( npabs( level[ self.basin_A ] - level[ self.basin_B ] ),
+                        model.args.implicitHead )
+        K    = npabs( Q_total ) / ( 2 * head )
+
+        interior = self.interior.nonzero()[ 0 ]
+        D        = self.incidence[ interior ]
+
+        # Volume of the timestep other than the shoal transport
+        other_volume = basin_scratch.water_volume[ interior ] - \
+                       basin_scratch.previous_volume[ interior ]
+
+        rhs = timestep * D.dot( Q_total ) + other_volume
+
+        M = ( D.multiply( theta * timestep * K ) ).dot( D.T ).tocsr()
+
+        # Dry basins unconnected to a flowing shoal keep their level
+        diagonal = area[ interior ] + M.diagonal()
+        M = M + diags( where( diagonal > 0, area[ interior ], 1. ) )
+
+        delta_level = npzeros( self.n_basins )
+        delta_level[ interior ] = spsolve( M.tocsc(), rhs )
+
+        return Q_total - theta * K * self.incidence.T.dot( delta_level )
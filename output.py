@@ -0,0 +1,299 @@
+'''Output files for the Bay Assessment Model (BAM)
+
+Basin records (model.records over model.times) are written as
+one csv file per basin (Basin.WriteData), and/or a single compressed
+NumPy npz archive of all basins, selected with the outputFormat option
+(-of csv, npz, both).
+
+The npz archive holds the arrays:
+  time         : datetime64[s] [ n_times ]
+  basin_name   : str           [ n_basins ]
+  basin_number : int           [ n_basins ]
+  variable     : str           [ n_variables ] (constants.BasinPlotVariable)
+  unit         : str           [ n_variables ] (constants.PlotVariableUnit)
+  data         : float         [ n_times, n_basins, n_variables ]
+                 NaN where a value is not available (NA in the csv)
+  metadata     : str           JSON : version, command line, timestep...
+
+ReadNPZ() returns these, ExportCSV() writes the per-basin csv files
+from an archive.
+
+With an output chunk (-oc days, -or rows) the records are written by
+FlushOutput() each time model.records is full: rows are appended to the
+csv files, and each chunk is written to an npz archive Basins<runID>_<n>.npz
+that WriteOutput() consolidates into Basins<runID>.npz at the end of
+the run, streaming the time and data arrays of the chunks one at a time
+into the archive. The memory held is one chunk, and the output written
+is available if the run is stopped.'''
+
+# Python distribution modules
+from datetime import datetime
+from json     import dumps, loads
+from os       import remove
+from os.path  import join as path_join
+from zipfile  import ZipFile, ZIP_DEFLATED
+
+# Community modules
+from numpy import array as nparray
+from numpy import savez_compressed, isnan
+from numpy import load  as npload
+from numpy.lib.format import read_magic, read_array_header_1_0, \
+                             read_array_header_2_0, write_array, \
+                             write_array_header_1_0, dtype_to_descr
+
+# Local modules
+import constants
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def WriteOutput( model ) :
+    '''Write the basin records in the outputFormat (-of)'''
+
+    if model.records.ChunkLength() : # -oc -or
+        # Write the last chunk, keep it in the records for plotting
+        FlushOutput( model, clear = False )
+
+        if model.args.outputFormat in [ 'npz', 'both' ] :
+            ConsolidateNPZ( model )
+
+        return
+
+    if model.args.outputFormat in [ 'csv', 'both' ] :
+        for Basin in model.Basins.values() :
+            Basin.WriteData()
+
+    if model.args.outputFormat in [ 'npz', 'both' ] :
+        WriteNPZ( model )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def FlushOutput( model, clear = True ) :
+    '''Write the chunk of records in model.records in the outputFormat
+    (-of): append to the csv files, write a chunk npz archive. Then
+    erase the records and times if clear.'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> FlushOutput' )
+
+    records = model.records
+
+    if records.size :
+        if model.args.outputFormat in [ 'csv', 'both' ] :
+            for Basin in model.Basins.values() :
+                Basin.WriteData( header = records.chunks == 0 )
+
+        if model.args.outputFormat in [ 'npz', 'both' ] :
+            WriteNPZ( model, ChunkFileName( model.args.runID, records.chunks ))
+
+        records.chunks += 1
+
+    if clear :
+        model.times.clear()
+        records.Clear()
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def NPZFileName( runID ) :
+    '''File name of the npz archive in the basinOutputDir (-bo)'''
+
+    return 'Basins' + runID + '.npz'
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ChunkFileName( runID, chunk ) :
+    '''File name of the npz archive of output chunk number chunk'''
+
+    return 'Basins' + runID + '_' + str( chunk ) + '.npz'
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def WriteNPZ( model, file_name = None ) :
+    '''Write all basin records into the compressed npz archive
+    file_name in the basinOutputDir, by default NPZFileName()'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> WriteNPZ' )
+
+    records   = model.records
+    variables = records.variables
+
+    # Basins in record array order, the array is written without a copy
+    # when the basin indices are 0 ... n_basins - 1
+    Basins  = sorted( model.Basins.values(), key = lambda Basin: Basin.index )
+    indices = [ Basin.index for Basin in Basins ]
+
+    if indices == list( range( len( Basins ) ) ) :
+        data = records.data[ : records.size, : len( Basins ) ]
+    else :
+        data = records.data[ : records.size, indices ]
+
+    metadata = { 'version'        : constants.Version,
+                 'command_line'   : model.args.commandLine,
+                 'start'          : str( model.start_time ),
+                 'end'            : str( model.end_time ),
+                 'timestep'       : model.timestep,
+                 'outputInterval' : model.args.outputInterval,
+                 'runID'          : model.args.runID }
+
+    if file_name is None :
+        file_name = NPZFileName( model.args.runID )
+
+    file_name = path_join( model.args.basinOutputDir, file_name )
+
+    try :
+        savez_compressed(
+            file_name,
+            time         = nparray( model.times, dtype = 'datetime64[s]' ),
+            basin_name   = nparray( [ Basin.name   for Basin in Basins ] ),
+            basin_number = nparray( [ Basin.number for Basin in Basins ] ),
+            variable     = nparray( variables, dtype = str ),
+            unit         = nparray( [ constants.PlotVariableUnit[ variable ]
+                                      for variable in variables ], dtype=str),
+            data         = data,
+            metadata     = nparray( dumps( metadata ) ) )
+
+    except OSError as err :
+        msg = 'WriteNPZ: failed to write ' + file_name + ': ' +\
+              str( err ) + '\n'
+        model.gui.Message( msg )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ConsolidateNPZ( model ) :
+    '''Stream the chunk npz archives of FlushOutput() into the archive
+    NPZFileName(), and remove them. The time and data arrays are sized
+    from the chunk array headers and written one chunk at a time, the
+    other arrays are those of the last chunk.'''
+
+    if model.args.DEBUG_ALL :
+        print( '-> ConsolidateNPZ' )
+
+    output_dir = model.args.basinOutputDir
+    runID      = model.args.runID
+
+    chunk_files = [ path_join( output_dir, ChunkFileName( runID, chunk ) )
+                    for chunk in range( model.records.chunks ) ]
+
+    if not chunk_files :
+        return
+
+    file_name = path_join( output_dir, NPZFileName( runID ) )
+
+    try :
+        # The compressed zip of .npy files written by savez_compressed
+        with ZipFile( file_name, 'w', compression = ZIP_DEFLATED,
+                      allowZip64 = True ) as zip_file :
+
+            for key in [ 'time', 'data' ] :
+                WriteChunkArray( zip_file, key, chunk_files )
+
+            with npload( chunk_files[ -1 ] ) as npz :
+                for key in npz.files :
+                    if key in [ 'time', 'data' ] :
+                        continue
+
+                    with zip_file.open( key + '.npy', 'w',
+                                        force_zip64 = True ) as fd :
+                        write_array( fd, npz[ key ] )
+
+        for chunk_file in chunk_files :
+            remove( chunk_file )
+
+    except OSError as err :
+        msg = 'ConsolidateNPZ: failed to write ' +\
+              NPZFileName( runID ) + ': ' + str( err ) + '\n'
+        model.gui.Message( msg )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def WriteChunkArray( zip_file, key, chunk_files ) :
+    '''Write the array key of the chunk npz archives chunk_files,
+    concatenated along the time axis, as key.npy into zip_file'''
+
+    # Shape and dtype from the .npy headers, the chunks are not loaded
+    rows = 0
+    for chunk_file in chunk_files :
+        with ZipFile( chunk_file ) as chunk_zip :
+            with chunk_zip.open( key + '.npy' ) as fd :
+                if read_magic( fd ) == ( 1, 0 ) :
+                    shape, fortran_order, dtype = read_array_header_1_0( fd )
+                else :
+                    shape, fortran_order, dtype = read_array_header_2_0( fd )
+
+        rows = rows + shape[ 0 ]
+
+    header = { 'descr'         : dtype_to_descr( dtype ),
+               'fortran_order' : False,
+               'shape'         : ( rows, ) + shape[ 1: ] }
+
+    with zip_file.open( key + '.npy', 'w', force_zip64 = True ) as fd :
+        write_array_header_1_0( fd, header )
+
+        for chunk_file in chunk_files :
+            with npload( chunk_file ) as npz :
+                fd.write( npz[ key ].tobytes( 'C' ) )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ReadNPZ( file_name ) :
+    '''Read an npz archive written by WriteNPZ. Return a dictionary of
+    the archive arrays, with time as a list of datetime and metadata as
+    a dictionary.'''
+
+    archive = dict()
+
+    with npload( file_name ) as npz :
+        for key in npz.files :
+            archive[ key ] = npz[ key ]
+
+    archive[ 'time' ] = archive[ 'time' ].astype( datetime ).tolist()
+    archive[ 'metadata' ] = loads( str( archive[ 'metadata' ] ) )
+
+    return archive
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def ExportCSV( file_name, output_dir, runID = '' ) :
+    '''Write the per-basin csv files of Basin.WriteData from the npz
+    archive file_name into output_dir'''
+
+    archive   = ReadNPZ( file_name )
+    variables = archive[ 'variable' ].tolist()
+    units     = archive[ 'unit'     ].tolist()
+    times     = [ str( time ) for time in archive[ 'time' ] ]
+
+    header = 'Time,\t\t\t'
+    for variable, unit in zip( variables, units ) :
+        header = header + variable + ' ' + unit + ',\t'
+    header = header.rstrip( ',\t' )
+
+    for i, basin_name in enumerate( archive[ 'basin_name' ].tolist() ) :
+
+        data = archive[ 'data' ][ :, i, : ]
+
+        fd = open( path_join( output_dir, basin_name + runID + '.csv' ), 'w')
+
+        fd.write( header + '\n' )
+
+        for time, values in zip( times, data.tolist() ) :
+            dataStr = time + ',\t'
+
+            for value in values :
+                if isnan( value ) :
+                    dataStr = dataStr + 'NA,\t'
+                else :
+                    dataStr = dataStr + str( round( value, 3 ) ) + ',\t'
+
+            dataStr = dataStr.rstrip( ',\t' )
+            fd.write( dataStr + '\n' )
+
+        fd.close()
@@ -0,0 +1,218 @@
+'''Run profile of the Bay Assessment Model (BAM)
+
+With the profile option (-pf Profile.json) ModelLoop records the wall
+time and number of calls of each phase of the timestep, and the shoal
+solvers record the Manning velocity iterations of each (shoal, depth)
+solution. At the end of the run a table is added to the runInfo file
+(-rf) and the profile is written as JSON to the basinOutputDir (-bo):
+
+  phases     : { phase : { calls, seconds } } in the order of ModelLoop
+  iterations : { solutions, mean, max, failures }
+  failures   : { shoal number : iterations exceeded count }
+  run        : { command_line, start, end, timestep, steps, seconds }
+
+Without -pf, model.profile is a NoProfile whose phases are empty
+contexts and the solvers do not count iterations.
+
+With the startupReport option (-sr) bam.py reports the time from its
+import to the first timestep by startup phase, and the heavy modules
+imported: a headless run imports scipy for the tides and MSL, numba
+for -ss numba, matplotlib and tkinter only with the GUI.'''
+
+# Python distribution modules
+import sys
+from contextlib import nullcontext
+from json       import dump
+from os.path    import join as path_join
+from time       import perf_counter
+
+# Phases of ModelLoop in the order of the profile table
+phases = [ 'BoundaryConditions', 'GetSalinity', 'GetTides', 'GetRain',
+           'GetTemperature', 'GetET', 'GetRunoff', 'ShoalVelocities',
+           'MassTransport', 'Depths', 'CopyDataRecord', 'GUI',
+           'Checkpoint', 'WriteOutput' ]
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class Profile:
+    '''Phase timing and Manning iteration counts of a run (-pf).
+    with model.profile( phase ) : times the block as phase.'''
+
+    enabled = True
+
+    def __init__( self, model ):
+
+        self.model = model
+        self.Reset()
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Reset( self ) :
+        '''Clear the profile at the start of ModelLoop'''
+
+        self.calls      = { phase : 0  for phase in phases }
+        self.seconds    = { phase : 0. for phase in phases }
+        self.phase      = None
+        self.start      = None
+        self.run_start  = perf_counter()
+        self.steps      = 0
+        self.solutions  = 0 # (shoal, depth) velocity solutions
+        self.iterations = 0 # total Manning iterations
+        self.max_iterations = 0
+        self.failures   = dict() # { shoal_number : count }
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def __call__( self, phase ) :
+        self.phase = phase
+        return self
+
+    def __enter__( self ) :
+        self.start = perf_counter()
+        return self
+
+    def __exit__( self, *exception ) :
+        self.seconds[ self.phase ] += perf_counter() - self.start
+        self.calls  [ self.phase ] += 1
+        return False
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Iterations( self, iterations, shoal_numbers = () ) :
+        '''Add the iteration counts of velocity solutions, and a failure
+        for each shoal number in shoal_numbers (iterations exceeded)'''
+
+        iterations = list( iterations )
+
+        if iterations :
+            self.solutions  += len( iterations )
+            self.iterations += sum( iterations )
+            self.max_iterations = max( self.max_iterations,
+                                       max( iterations ) )
+
+        for shoal_number in shoal_numbers :
+            self.failures[ shoal_number ] = \
+                self.failures.get( shoal_number, 0 ) + 1
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Summary( self ) :
+        '''Dictionary of the profile written to the JSON file'''
+
+        model = self.model
+
+        mean_iterations = self.iterations / self.solutions \
+                          if self.solutions else 0
+
+        return { 'phases'     : { phase : { 'calls'   : self.calls[ phase ],
+                                            'seconds' : self.seconds[ phase ] }
+                                  for phase in phases },
+                 'iterations' : { 'solutions' : self.solutions,
+                                  'mean'      : mean_iterations,
+                                  'max'       : self.max_iterations,
+                                  'failures'  : sum( self.failures.values() ) },
+                 'failures'   : { str( shoal_number ) : count for
+                                  shoal_number, count in
+                                  sorted( self.failures.items() ) },
+                 'run'        : { 'command_line' : model.args.commandLine,
+                                  'start'        : str( model.start_time ),
+                                  'end'          : str( model.end_time ),
+                                  'timestep'     : model.args.timestep,
+                                  'steps'        : self.steps,
+                                  'seconds'      : perf_counter() -
+                                                   self.run_start } }
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Write( self ) :
+        '''Add the profile table to the run_info, write the JSON file'''
+
+        model   = self.model
+        summary = self.Summary()
+        total   = summary[ 'run' ][ 'seconds' ]
+
+        file_name = path_join( model.args.basinOutputDir, model.args.profile )
+
+        lines = [ '\nProfile: ' + str( self.steps ) + ' steps in ' +
+                  str( round( total, 2 ) ) + ' (s), ' + file_name + '\n',
+                  '  Phase                Calls     Time (s)    %\n' ]
+
+        for phase, values in summary[ 'phases' ].items() :
+            percent = 100 * values[ 'seconds' ] / total if total else 0
+            lines.append( '  ' + phase.ljust( 18 ) +
+                          str( values[ 'calls' ] ).rjust( 8 ) +
+                          str( round( values[ 'seconds' ], 3 ) ).rjust( 13 ) +
+                          str( round( percent, 1 ) ).rjust( 7 ) + '\n' )
+
+        iterations = summary[ 'iterations' ]
+        lines.append( '  Manning iterations: ' + str( iterations['solutions'] )+
+                      ' solutions, mean ' +
+                      str( round( iterations[ 'mean' ], 2 ) ) + ' max ' +
+                      str( iterations[ 'max' ] ) + ', ' +
+                      str( iterations[ 'failures' ] ) + ' failures\n' )
+
+        for shoal_number, count in summary[ 'failures' ].items() :
+            lines.append( '    shoal ' + shoal_number + ' : ' +
+                          str( count ) + ' failures\n' )
+
+        model.run_info.extend( lines )
+
+        try :
+            with open( file_name, 'w' ) as fd :
+                dump( summary, fd, indent = 1 )
+
+        except OSError as err :
+            msg = 'Profile: failed to write ' + file_name + ': ' +\
+                  str( err ) + '\n'
+            model.gui.Message( msg )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+def StartupReport( model, times ) :
+    '''Message of the startup time (-sr) from times [ ( phase, end ) ]
+    the perf_counter() at the end of each phase, the first is the start.'''
+
+    start = times[ 0 ][ 1 ]
+    total = times[ -1 ][ 1 ] - start
+
+    lines = [ '\nStartup: ' + str( round( total, 3 ) ) +
+              ' (s) from the import of bam.py\n' ]
+
+    for ( previous, begin ), ( phase, end ) in zip( times[ :-1 ], times[ 1: ] ):
+        lines.append( '  ' + phase.ljust( 18 ) +
+                      str( round( end - begin, 3 ) ).rjust( 8 ) + '\n' )
+
+    modules = []
+    for module in [ 'numpy', 'scipy', 'numba', 'matplotlib', 'tkinter' ] :
+        if module in sys.modules :
+            modules.append( module + ' ' +
+                            getattr( sys.modules[ module ], '__version__',
+                                     '' ) )
+        else :
+            modules.append( module + ' not imported' )
+
+    lines.append( '  Modules: ' + ', '.join( modules ) + '\n' )
+
+    model.gui.Message( ''.join( lines ) )
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class NoProfile:
+    '''model.profile without -pf : phases are not timed'''
+
+    enabled = False
+    steps   = 0
+
+    def __call__( self, phase ) :
+        return nullcontext()
+
+    def Reset( self ) :
+        pass
@@ -0,0 +1,235 @@
+'''Basin output records for the Bay Assessment Model (BAM)
+
+The values recorded every outputInterval (-oi) are held in one array
+[ time, Basin.index, variable ] preallocated by Records.Init() for the
+simulation time window, NaN where a value is not available. The basin
+records Basin.plot_variables are RecordMap views onto the array, the
+record times are model.times.
+
+With an output chunk (-oc days, -or rows) the array holds one chunk:
+when it is full ModelLoop writes it with output.FlushOutput() and the
+records restart from the next record time.'''
+
+# Community modules
+from numpy import full  as npfull
+from numpy import nan   as npNaN
+from numpy import concatenate
+
+# Local modules
+import constants
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class Records:
+    '''Record array of the model.record_variables of all basins.
+    size is the number of records copied, chunks the number of chunks
+    written by output.FlushOutput().'''
+
+    # { plotVariable : Basin attribute } copied as is
+    attributes = { 'Stage'    : 'water_level',
+                   'Salinity' : 'salinity',
+                   'Volume'   : 'water_volume' }
+
+    # { plotVariable : Basin attribute } copied per second of timestep
+    transports = { 'Flow'        : 'shoal_transport',
+                   'Rain'        : 'rainfall',
+                   'Evaporation' : 'evaporation' }
+
+    def __init__( self, model ):
+
+        self.model     = model
+        self.size      = 0
+        self.chunks    = 0
+        self.variables = [] # model.record_variables
+        self.column    = dict() # { plotVariable : column in data }
+        self.data      = npfull( ( 0, model.basin_scratch.capacity, 0 ),
+                                 npNaN )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Init( self ) :
+        '''Allocate the record array for model.record_variables from
+        model.start_time to model.end_time, erasing the records.
+        Called by init.InitTimeBasins and model.SetRecordVariables.'''
+
+        model = self.model
+
+        for plotVariable in model.record_variables :
+            if plotVariable not in constants.PlotVariableUnit :
+                msg = 'Records: ' + plotVariable +\
+                      ' is not supported for plotting.\n'
+                model.gui.Message( msg )
+
+        self.variables = [ plotVariable for plotVariable in
+                           model.record_variables
+                           if plotVariable in constants.PlotVariableUnit ]
+        self.column    = { plotVariable : j for j, plotVariable in
+                           enumerate( self.variables ) }
+        self.size      = 0
+        self.chunks    = 0
+
+        length = self.Length()
+        if self.ChunkLength() :
+            length = min( length, self.ChunkLength() )
+
+        self.data = npfull( ( length, model.basin_scratch.capacity,
+                              len( self.variables ) ), npNaN )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Clear( self ) :
+        '''Erase the records after a chunk is written'''
+
+        self.data.fill( npNaN )
+        self.size = 0
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Length( self ) :
+        '''Number of records of a run from start_time to end_time: the
+        start time, every outputInterval up to the last timestep of
+        ModelLoop (which may pass end_time), and the end_time.'''
+
+        model = self.model
+
+        if model.start_time is None or model.end_time is None or \
+           model.end_time < model.start_time :
+            return 0
+
+        # The -t timestep, the largest step of an adaptive timestep (-at)
+        timestep    = model.args.timestep
+        run_seconds = ( model.end_time - model.start_time ).total_seconds()
+        timesteps   = int( run_seconds // timestep ) + 1
+
+        return int( timesteps * timestep //
+                    model.outputInterval.total_seconds() ) + 2
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def ChunkLength( self ) :
+        '''Number of records in an output chunk, the smaller of the
+        -oc days and -or rows, 0 if output is not chunked'''
+
+        args = self.model.args
+
+        lengths = []
+
+        if args.outputChunkDays > 0 :
+            interval = self.model.outputInterval.total_seconds()
+            lengths.append( max( 1, int( args.outputChunkDays * 86400 //
+                                         interval ) ) )
+
+        if args.outputChunkRows > 0 :
+            lengths.append( args.outputChunkRows )
+
+        return min( lengths ) if lengths else 0
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Full( self ) :
+        '''True if the output is chunked and the chunk is full'''
+
+        return self.size == len( self.data ) and self.ChunkLength() > 0
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def CopyDataRecord( self ) :
+        '''Copy the record_variables of all basins at the current time
+        into the next record.'''
+
+        model = self.model
+
+        if model.args.DEBUG_ALL :
+            print( '->CopyDataRecord' )
+
+        if self.size == len( self.data ) :
+            # Time window changed without Init(), extend by 50%
+            self.data = concatenate(
+                ( self.data, npfull( ( len( self.data ) // 2 + 1, ) +
+                                     self.data.shape[ 1: ], npNaN ) ) )
+
+        record        = self.data[ self.size ] # [ Basin.index, variable ]
+        basin_scratch = model.basin_scratch
+        timestep      = model.timestep
+
+        # One pass over the Basins for the attributes and transports
+        variables = [ self.attributes.get( plotVariable ) or
+                      self.transports.get( plotVariable )
+                      for plotVariable in self.column
+                      if plotVariable in self.attributes or
+                         plotVariable in self.transports ]
+        if variables :
+            basin_scratch.Gather( variables )
+
+        for plotVariable, j in self.column.items() :
+
+            if plotVariable in self.attributes :
+                variable = self.attributes[ plotVariable ]
+                record[ : basin_scratch.size, j ] = \
+                    getattr( basin_scratch, variable )[ : basin_scratch.size ]
+
+            elif plotVariable in self.transports :
+                variable = self.transports[ plotVariable ]
+                record[ :, j ] = getattr( basin_scratch, variable ) / timestep
+
+            elif plotVariable == 'Runoff' :
+                for Basin in model.Basins.values() :
+                    runoff = Basin.Runoff()
+                    if runoff is not None :
+                        record[ Basin.index, j ] = runoff / timestep
+            elif plotVariable == 'Groundwater' :
+                for Basin in model.Basins.values() :
+                    if Basin.groundwater is not None :
+                        record[ Basin.index, j ] = Basin.groundwater / timestep
+
+        self.size += 1
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class RecordMap:
+    '''Dictionary view { plotVariable : values } of the records of the
+    basin at index: values is a view of the record array over the
+    records copied so far. Replaces the Basin.plot_variables lists.'''
+
+    __slots__ = ( 'records', 'index' )
+
+    def __init__( self, records, index ):
+
+        self.records = records
+        self.index   = index
+
+    def __getitem__( self, plotVariable ) :
+        records = self.records
+        return records.data[ : records.size, self.index,
+                             records.column[ plotVariable ] ]
+
+    def get( self, plotVariable, default = None ) :
+        if plotVariable in self.records.column :
+            return self[ plotVariable ]
+        return default
+
+    def __contains__( self, plotVariable ) :
+        return plotVariable in self.records.column
+
+    def __iter__( self ) :
+        return iter( self.records.variables )
+
+    def __len__( self ) :
+        return len( self.records.variables )
+
+    def keys( self ) :
+        return list( self.records.variables )
+
+    def values( self ) :
+        return [ self[ plotVariable ] for plotVariable in self ]
+
+    def items( self ) :
+        return [ ( plotVariable, self[ plotVariable ] ) for plotVariable in self ]
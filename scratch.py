@@ -0,0 +1,110 @@
+'''Scratch arrays of the Basin variables for the Bay Assessment Model (BAM)
+
+The model state is held by the Basin and Shoal objects as plain
+attributes, read and written by the scalar code in hydro.py and
+model.py. BasinScratch is a gather/scatter cache of the Basin variables
+for the array code (hydro.Depths, hydro_vector.MassTransport,
+network.py, model.GetRain, records.py...) : one NumPy array per
+variable, indexed by Basin.index. Code using the arrays copies the
+variables it reads from the Basins with Gather(), and the variables it
+changes back to them with Scatter(). The arrays are only current between
+these calls. Unset values (None) are NaN in the arrays.
+
+The per-depth Shoal dictionaries are not cached, the vectorized shoal
+solvers keep their own (shoal, depth) pair arrays, see
+hydro_vector.ShoalArrays.'''
+
+# Python distribution modules
+from operator import attrgetter
+
+# Community modules
+from numpy import array as nparray
+from numpy import full  as npfull
+from numpy import nan   as npNaN
+
+#---------------------------------------------------------------
+#
+#---------------------------------------------------------------
+class BasinScratch:
+    '''Arrays of the Basin variables indexed by Basin.index.'''
+
+    # { variable : unset value }
+    variables = { 'area'            : 0.,    # (m^2)
+                  'water_level'     : npNaN, # (m)
+                  'water_volume'    : 0.,    # (m^3)
+                  'previous_volume' : 0.,    # (m^3)
+                  'salt_mass'       : npNaN, # (kg)
+                  'salinity'        : npNaN, # (g/kg)
+                  'shoal_transport' : 0.,    # (m^3/timestep)
+                  'rainfall'        : 0.,    # (m^3/timestep)
+                  'evaporation'     : 0.   } # (m^3/timestep)
+
+    def __init__( self, capacity ):
+
+        self.size     = 0
+        self.capacity = capacity
+        self.Objects  = [] # Basin of each index
+
+        for variable, value in self.variables.items() :
+            setattr( self, variable, npfull( capacity, value ) )
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Add( self, Basin ) :
+        '''Allocate an element for a new Basin, return its index'''
+
+        if self.size == self.capacity :
+            errMsg = 'BasinScratch: capacity ' + str( self.capacity ) +\
+                     ' exceeded.'
+            raise Exception( errMsg )
+
+        self.Objects.append( Basin )
+        self.size += 1
+
+        return self.size - 1
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Gather( self, variables, rows = None ) :
+        '''Copy the variables of the Basins at rows (Basin.index,
+        all Basins if None) into the arrays, NaN for None'''
+
+        if rows is None :
+            Basins = self.Objects
+            rows   = slice( 0, self.size )
+        else :
+            Basins = [ self.Objects[ index ] for index in rows ]
+
+        # One pass over the Basins : [ ( value, value... ) ]
+        Values = attrgetter( *variables )
+        values = nparray( [ Values( Basin ) for Basin in Basins ],
+                          dtype = float ).reshape( len( Basins ),
+                                                     len( variables ) )
+
+        for k, variable in enumerate( variables ) :
+            getattr( self, variable )[ rows ] = values[ :, k ]
+
+    #-----------------------------------------------------------
+    #
+    #-----------------------------------------------------------
+    def Scatter( self, variables, rows = None ) :
+        '''Copy the variables at rows (Basin.index, all Basins if None)
+        from the arrays into the Basins. An unset (None) variable
+        gathered as NaN is left None, a computed NaN is kept.'''
+
+        if rows is None :
+            Basins = self.Objects
+            rows   = slice( 0, self.size )
+        else :
+            Basins = [ self.Objects[ index ] for index in rows ]
+
+        for variable in variables :
+            values = getattr( self, variable )[ rows ].tolist()
+
+            for Basin, value in zip( Basins, values ) :
+                if value != value and getattr( Basin, variable ) is None :
+                    continue
+
+                setattr( Basin, variable, value )
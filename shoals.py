@@ -8,7 +8,10 @@ class Shoal:
     Fluxes across the shoal are signed, identifying the 'upstream'
     basin (A or B). Water level and concentration differences are gradients 
     between the adjacent basins. Velocities are given for each depth 
-    on a shoal."""
+    on a shoal.
+
+    The vectorized solvers copy the physical variables to and from
+    the model.shoal_arrays, see hydro_vector.ShoalArrays."""
 
     def __init__( self, model ):
 
@@ -16,6 +19,7 @@ class Shoal:
 
         # matplotlib Figure variables
         self.line_xy    = None  # Read from shapefile
+        self.render_xy  = None  # Simplified for drawing, geometry.py
         self.Axes_plot  = None  # Created by matplotlib plot() (Line2D)
 
         # Basins for this shoal
@@ -63,6 +67,11 @@ class Shoal:
     #-----------------------------------------------------------
     def Print( self, shoal_number = None, print_all = False ) :
         '''Display shoal info on the gui msgText box.'''
+
+        # Copy the solution of the vectorized shoal solvers to the Shoals
+        shoal_arrays = self.model.shoal_arrays
+        if shoal_arrays and not shoal_arrays.shared :
+            shoal_arrays.Scatter()
         
         Basin_A = self.Basin_A
         Basin_B = self.Basin_B